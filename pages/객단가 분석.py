@@ -1,6 +1,19 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
+from functools import reduce
+from utils.sketches import TDigest
+from utils.upload_cache import arrow_table
+from utils.schema import SchemaError
+from utils import guardrails
+from utils.jobs import input_key, get_runner, run_with_progress, wait
+from utils.order_metrics import (PRICE_RANGE, ORDER_COLUMNS, load_orders, merge_order_partials, order_facts,
+                                 order_period, order_preview, summarize_partition, summarize_upload)
+from utils.exports import download_bundle, download_buttons
+from utils.parsing import warn_rejected
+from utils import partitioned
+from utils.progressive import SAMPLE_ORDERS, mean_ci, proportion_ci
+from utils.engine import compare_engines, select_engine, run as run_engine
 
 
 st.set_page_config(
@@ -30,34 +43,91 @@ st.title('Order Price and Items Distribution Analysis v1.31')
 uploaded_file = st.file_uploader("Upload CSV file.", type="csv")
 
 if uploaded_file is not None:
-    # Read raw data (assumes columns like '주문번호', '총 주문 금액', '주문자 아이디', '일반/업셀 구분', etc.)
-    raw_data = pd.read_csv(uploaded_file)
-    
-    # Preprocessing: Convert '총 주문 금액' to numeric and remove orders with 0 (e.g., cancelled/refunded orders)
-    raw_data['총 주문 금액'] = pd.to_numeric(raw_data['총 주문 금액'], errors='coerce')
-    raw_data = raw_data[raw_data['총 주문 금액'] > 0]
-    
-    # Prepare data for existing analyses: Deduplicate by '주문번호' while preserving upsell orders preferentially
-    data = raw_data.copy()
-    data = data.sort_values(by=['일반/업셀 구분'], ascending=False)
-    data = data.drop_duplicates(subset=['주문번호'], keep='last')
+    # Read raw data: 헤더로 컬럼 매핑 프로필을 판별한 뒤 필요한 컬럼만 로드
+    try:
+        plan = guardrails.plan_upload(uploaded_file, ['주문번호', '주문일', '총 주문 금액', '주문자 아이디', '일반/업셀 구분'])
+    except SchemaError as e:
+        st.error(str(e))
+        st.stop()
+    guardrails.show_plan(plan)
+    # 무거운 분석은 동시 실행 수를 제한 (파싱·집계가 끝날 때까지 슬롯 점유)
+    with guardrails.admit(plan, "객단가 분석"):
+        upload_key = guardrails.open_planned(uploaded_file, plan)
 
-    # ----------------------------------------------------------------
-    # 0-1. 분석 기간 계산 (원본 raw_data의 '주문일' 기준)
-    raw_data['주문일'] = pd.to_datetime(raw_data['주문일'], errors='coerce')
-    start_date_dt = raw_data['주문일'].min()
-    end_date_dt   = raw_data['주문일'].max()
-    start_date    = start_date_dt.strftime('%Y-%m-%d')
-    end_date      = end_date_dt.strftime('%Y-%m-%d')
-    period_days   = (end_date_dt - start_date_dt).days + 1  # 포함 일수
+        # 금액·주문일 변환과 집계는 모두 공유 프로세스 풀 워커가 캐시 키로 직접 읽어 실행 (세션 스레드는 결과만 표시)
+        parse_notice = st.empty()
+        period_key = input_key('order_period', upload_key)
+        get_runner().submit(period_key, order_period, upload_key)
 
-    # 0-2. 전체 매출 계산 및 표시
-    total_revenue = data['총 주문 금액'].sum()
-    st.metric(label="전체 매출", value=f"{total_revenue:,.0f} KRW")
+        engine_name, compare_engine = select_engine("aov")
+        progressive = st.checkbox("대용량 파일 빠른 미리보기 (표본 추정 → 정확한 값으로 교체)", value=True)
+        headline = st.empty()
+        preview = st.empty()
+        if engine_name == "pandas":
+            # pandas 집계는 공유 프로세스 풀에서 실행. 아직 끝나지 않았으면 표본 미리보기를 먼저 표시
+            if arrow_table(upload_key).num_rows >= partitioned.PARALLEL_MIN_ROWS:
+                # 큰 업로드는 주문번호 해시 파티션별로 여러 코어에서 부분 집계 후 합침 (단일 패스와 같은 결과)
+                summary_job = partitioned.submit('order_summary', summarize_partition, merge_order_partials,
+                                                 upload_key, ORDER_COLUMNS)
+            else:
+                summary_job = get_runner().submit(input_key('order_summary', upload_key), summarize_upload, upload_key)
+            if progressive and not summary_job.done():
+                sampled = run_with_progress(input_key('order_preview', upload_key, SAMPLE_ORDERS), order_preview,
+                                            upload_key, SAMPLE_ORDERS, label="미리보기 표본 추출 중...")
+                approx, n_sampled, n_orders = sampled['approx'], sampled['n_sampled'], sampled['n_orders']
+                if n_sampled < n_orders:
+                    aov_est, aov_ci = mean_ci(sampled['amounts'], n_orders)
+                    with headline.container():
+                        st.metric(label="전체 매출 (추정)", value=f"{aov_est * n_orders:,.0f} KRW",
+                                  delta=f"± {aov_ci * n_orders:,.0f}", delta_color="off")
+                        st.metric(label="평균 객단가 (추정)", value=f"{aov_est:,.0f} KRW",
+                                  delta=f"± {aov_ci:,.0f}", delta_color="off")
+                    with preview.container():
+                        st.caption(f"⏳ 표본 {n_sampled:,} / 전체 {n_orders:,} 주문 기준 미리보기 (오차막대: 95% 신뢰구간). "
+                                   "정확한 계산이 끝나면 자동으로 교체됩니다.")
+                        share, share_ci = proportion_ci(approx['order_counts'].values, n_sampled, n_orders)
+                        fig_p, ax_p = plt.subplots(figsize=(10, 4))
+                        ax_p.bar(PRICE_RANGE, share * 100, yerr=share_ci * 100, color='lightgray', width=8000, capsize=3)
+                        ax_p.set_xticks(PRICE_RANGE, [f">{i // 10000}.0" if i == 200000 else f"{i // 10000}.0" for i in PRICE_RANGE],
+                                        rotation=45)
+                        ax_p.set_xlabel('Order Amount Range (KRW)')
+                        ax_p.set_ylabel('Percentage (%)')
+                        ax_p.set_title('Order Price Distribution (Sample Preview)')
+                        st.pyplot(fig_p)
 
+            summary = wait(summary_job, label="정확한 값 계산 중...")
+        else:
+            # DuckDB는 앱 프로세스에서 멀티스레드로 바로 정확한 값을 계산
+            summary = run_engine(engine_name, 'order_summary', upload_key, label="정확한 값 계산 중...")
+        preview.empty()
+        if compare_engine:
+            compare_engines('order_summary', upload_key)
+
+        # 0-1. 분석 기간 (취소 제외 라인의 '주문일' 기준)
+        period = run_with_progress(period_key, order_period, upload_key, label="분석 기간 계산 중...")
+        with parse_notice.container():
+            warn_rejected(period['report'])
+        if not summary['n_orders']:
+            # 전부 취소(0원 이하)이거나 금액을 읽지 못한 업로드: 그릴 분포가 없음
+            st.warning("분석할 주문이 없습니다 (총 주문 금액이 0원 이하이거나 읽지 못한 주문만 있음).")
+            st.stop()
+        start_date_dt = period['start']
+        end_date_dt   = period['end']
+        start_date    = start_date_dt.strftime('%Y-%m-%d')
+        end_date      = end_date_dt.strftime('%Y-%m-%d')
+        period_days   = (end_date_dt - start_date_dt).days + 1  # 포함 일수
+
+    # 0-2. 전체 매출 계산 및 표시
+    total_revenue = summary['total_revenue']
     # 0-3. 평균 객단가 계산 및 표시
-    avg_order_value = data['총 주문 금액'].mean()
-    st.metric(label="평균 객단가", value=f"{avg_order_value:,.0f} KRW")
+    avg_order_value = summary['avg_order_value']
+    with headline.container():
+        if plan['rate'] < 1:
+            # 표본 모드: 주문 표본 비율로 전체 매출 환산
+            st.metric(label="전체 매출 (추정)", value=f"{total_revenue / plan['rate']:,.0f} KRW")
+        else:
+            st.metric(label="전체 매출", value=f"{total_revenue:,.0f} KRW")
+        st.metric(label="평균 객단가", value=f"{avg_order_value:,.0f} KRW")
 
     # 0-4. 분석 기간 및 총 일수 표시
     st.write(f"**분석 기간:** {start_date} ~ {end_date} ({period_days}일)")
@@ -68,9 +138,7 @@ if uploaded_file is not None:
     # 1. Member vs Guest Order Share
     st.write("### 1. Member vs Guest Order Share")
     
-    # Create membership indicator column
-    data['회원여부'] = data['주문자 아이디'].apply(lambda x: 'Guest' if pd.isna(x) or str(x).strip() == '' else 'Member')
-    member_counts = data['회원여부'].value_counts()
+    member_counts = summary['member_counts']
     total_orders_member = member_counts.sum()
     member_percentages = (member_counts / total_orders_member) * 100
     
@@ -90,10 +158,8 @@ if uploaded_file is not None:
     st.write("### 2. Distribution of Order Prices (All Orders)")
     
     # Group orders by price range (in 10,000 KRW intervals)
-    data['금액 범주'] = (data['총 주문 금액'] // 10000) * 10000
-    data['금액 범주'] = data['금액 범주'].apply(lambda x: 200000 if x > 200000 else x)
-    full_range = pd.Series([i * 10000 for i in range(21)])  # 0, 10000, ..., 200000
-    order_counts = data['금액 범주'].value_counts().reindex(full_range, fill_value=0).sort_index()
+    full_range = PRICE_RANGE  # 0, 10000, ..., 200000
+    order_counts = summary['order_counts']
     
     st.write("**Order Counts (by price range):**", order_counts)
     
@@ -132,14 +198,11 @@ if uploaded_file is not None:
     # 4. Distribution of Order Prices (Upsell Orders)
     st.write("### 4. Distribution of Order Prices (Upsell Orders)")
     
-    upsell_data = data[data['일반/업셀 구분'] == '업셀 상품']
+    upsell_order_counts = summary['upsell_order_counts']
     
-    if upsell_data.empty:
+    if upsell_order_counts is None:
         st.write("Warning: No Upsell Order Data available.")
     else:
-        upsell_data['금액 범주'] = (upsell_data['총 주문 금액'] // 10000) * 10000
-        upsell_data['금액 범주'] = upsell_data['금액 범주'].apply(lambda x: 200000 if x > 200000 else x)
-        upsell_order_counts = upsell_data['금액 범주'].value_counts().reindex(full_range, fill_value=0).sort_index()
         st.write("**Upsell Order Counts (by price range):**", upsell_order_counts)
         
         plt.figure(figsize=(10, 6))
@@ -168,16 +231,55 @@ if uploaded_file is not None:
         plt.title('Order Price Distribution by Percentage (Upsell Orders)')
         st.pyplot(plt)
     
+    # ----------------------------------------------------------------
+    # 4-1. AOV Percentiles (quantile sketch)
+    st.write("### 4-1. AOV Percentiles & Adaptive Distribution")
+
+    # 세그먼트(회원여부 × 일반/업셀)별 t-digest → 병합해 전체/업셀 분포 산출
+    segment_digests = summary['segment_digests']
+    digest_all = reduce(TDigest.merge, segment_digests.values(), TDigest())
+    upsell_digests = [d for (member, kind), d in segment_digests.items() if kind == '업셀 상품']
+    digest_rows = {'All Orders': digest_all}
+    if upsell_digests:
+        digest_rows['Upsell Orders'] = reduce(TDigest.merge, upsell_digests)
+    digest_rows.update({f"{member} / {kind}": d for (member, kind), d in segment_digests.items()})
+
+    percentile_table = pd.DataFrame({
+        name: {'Orders': int(d.count), 'p50': d.quantile(0.5), 'p90': d.quantile(0.9), 'p99': d.quantile(0.99)}
+        for name, d in digest_rows.items()
+    }).T
+    p1, p2, p3 = st.columns(3)
+    p1.metric("p50 AOV", f"{digest_all.quantile(0.5):,.0f} KRW")
+    p2.metric("p90 AOV", f"{digest_all.quantile(0.9):,.0f} KRW")
+    p3.metric("p99 AOV", f"{digest_all.quantile(0.99):,.0f} KRW")
+    st.write("**AOV Percentiles by Segment (KRW):**")
+    st.dataframe(percentile_table.style.format('{:,.0f}'))
+
+    # 분위수 기반 적응형 구간: 가격대와 무관하게 구간마다 비슷한 주문 수
+    adaptive_edges = digest_all.bin_edges(n_bins=10)
+    adaptive_labels = [f"{adaptive_edges[i]:,.0f}~{adaptive_edges[i + 1]:,.0f}" for i in range(len(adaptive_edges) - 1)]
+    fig_q, ax_q = plt.subplots(figsize=(10, 6))
+    ax_q.bar(adaptive_labels, digest_all.histogram(adaptive_edges), color='skyblue', label='All Orders')
+    if 'Upsell Orders' in digest_rows:
+        ax_q.bar(adaptive_labels, digest_rows['Upsell Orders'].histogram(adaptive_edges), color='orange',
+                 width=0.5, label='Upsell Orders')
+    ax_q.set_xlabel('Order Amount Range (KRW, quantile-based)')
+    ax_q.set_ylabel('Number of Orders (estimated)')
+    ax_q.set_title('Adaptive Distribution of Order Prices')
+    ax_q.legend()
+    plt.setp(ax_q.get_xticklabels(), rotation=45, ha='right')
+    st.pyplot(fig_q)
+
     # ----------------------------------------------------------------
     # 5. Distribution of Items per Order (All Orders)
     st.write("### 5. Distribution of Items per Order (All Orders)")
     
     # Group raw_data by '주문번호' to count the number of items per order
-    order_items = raw_data.groupby('주문번호').size().reset_index(name='ItemCount')
+    order_items = summary['order_items']
     st.write("**Example of Items per Order (Top 5):**")
     st.write(order_items.head())
     
-    product_count_distribution = order_items['ItemCount'].value_counts().sort_index()
+    product_count_distribution = summary['item_count_distribution']
     st.write("**Order Counts by Number of Items:**")
     st.write(product_count_distribution)
     
@@ -241,6 +343,21 @@ if uploaded_file is not None:
         yval = bar.get_height()
         ax_items_bar.text(bar.get_x() + bar.get_width() / 2, yval, int(yval), ha='center', va='bottom')
     st.pyplot(fig_items_bar)
+
+    # ----------------------------------------------------------------
+    # 6. Downloads (파일은 버튼을 누를 때만 생성)
+    st.write("### 6. Downloads")
+    download_buttons("Order table", lambda: order_facts(load_orders(upload_key)), "order_facts")
+    download_bundle("Report bundle", {
+        "order_facts": lambda: order_facts(load_orders(upload_key)),
+        "price_distribution": lambda: pd.DataFrame({
+            'Order Amount Range (KRW)': order_counts.index,
+            'All Orders': order_counts.to_numpy(),
+            'Upsell Orders': upsell_order_counts.to_numpy() if upsell_order_counts is not None else 0,
+        }),
+        "member_counts": member_counts.reset_index(),
+        "items_per_order": product_count_distribution.reset_index(),
+    }, "order_report")
     
 else:
     st.write("Please use the CSV file downloaded by clicking the 'Export' button in the order list.")
@@ -5,31 +5,55 @@ import numpy as np
 import textwrap
 import streamlit.components.v1 as components
 import matplotlib.pyplot as plt
-from datetime import timedelta
 from io import StringIO
+from utils.jobs import input_key, run_with_progress, wait
+from utils.upload_cache import arrow_table
+from utils.schema import SchemaError, open_upload
+from utils.upsell_report import (order_period, summarize_upload, summarize_partition, merge_summaries,
+                                 recent_window, daily_order_sketches, attribute_upload)
+from utils import partitioned
+from utils.exports import download_bundle
+from utils import benchmarks
+from utils.parsing import warn_rejected
+from utils.sketches import estimate, relative_error
 
 # =========================================
 # 0) 페이지/스타일 & 상수(벤치마크, 컬럼 매핑)
 # =========================================
 st.set_page_config(page_title="알파업셀 보고서 생성기", layout="wide")
 
-# ---- 벤치마크(필요시 조정) ----
+# ---- 벤치마크 기본값 (벤치마크 저장소에 쌓인 보고서가 부족할 때 사용, 필요시 조정) ----
 BM_UPSELL_CONV_RATIO = 7.14     # 전체주문금액 중 [업셀]전환주문 비율 (%)
 BM_UPSELL_TOGETHER_RATIO = 3.17 # 전체주문금액 중 [업셀]함께구매주문금액 비율 (%)
 BM_AOV_LIFT = 34.0              # 업셀 AOV가 전체 AOV 대비 평균 상승률 (%)
 BM_ITEMS_LIFT = 0.7             # 주문당 평균 상품수 상승(개)
+BM_FALLBACKS = {
+    "upsell_conv_ratio": BM_UPSELL_CONV_RATIO, "upsell_together_ratio": BM_UPSELL_TOGETHER_RATIO,
+    "aov_lift": BM_AOV_LIFT, "items_lift": BM_ITEMS_LIFT,
+}
 
-# ---- 컬럼명 매핑(너희 CSV에 맞춰 1회만 수정) ----
+# ---- 표준 컬럼명 (플랫폼별 원본 헤더는 utils.schema 프로필로 자동 매핑) ----
 COL_ORDER_ID = "주문번호"
 COL_ORDER_TOTAL = "총 주문 금액"     # 주문 총액(주문별 동일 값)
 COL_BUYER_ID = "주문자 아이디"
 COL_UPSELL_FLAG = "일반/업셀 구분"   # 값 예: "업셀 상품" / "일반 상품"
 VAL_UPSELL = "업셀 상품"
 COL_ORDER_DATE = "주문일"             # YYYY-MM-DD 혹은 날짜 포맷
-# 라인금액 관련(없으면 자동계산 시도)
-COL_LINE_PRICE = None                 # 라인단가(판매가)
-COL_LINE_QTY = None                   # 수량
-COL_LINE_AMOUNT = None                # 라인금액(=단가*수량)
+# 라인금액 관련(라인금액이 없으면 단가*수량으로 자동계산 시도)
+COL_LINE_PRICE = "상품 단가"          # 라인단가(판매가)
+COL_LINE_QTY = "구매 수량"            # 수량
+COL_LINE_AMOUNT = "상품 구매 금액"    # 라인금액(=단가*수량)
+# 위젯별 성과 CSV와 조인할 키(위젯 CSV에 같은 이름의 컬럼이 있으면 사용)
+COL_WIDGET_NAME = "위젯명"
+COL_PRODUCT_CODE = "상품 코드"
+COL_PRODUCT_NAME = "상품명"
+
+REPORT_COLUMNS = {
+    "order_id": COL_ORDER_ID, "order_total": COL_ORDER_TOTAL, "buyer_id": COL_BUYER_ID,
+    "upsell_flag": COL_UPSELL_FLAG, "upsell_value": VAL_UPSELL, "order_date": COL_ORDER_DATE,
+    "line_price": COL_LINE_PRICE, "line_qty": COL_LINE_QTY, "line_amount": COL_LINE_AMOUNT,
+    "product_code": COL_PRODUCT_CODE, "product_name": COL_PRODUCT_NAME,
+}
 
 # =========================================
 # 1) 사이드바 / 업로드
@@ -42,14 +66,24 @@ with st.sidebar:
     st.divider()
     st.subheader("분석 기간 설정")
     custom_range = st.checkbox("분석 기간 직접 설정", value=False)
+    approx_distinct = st.checkbox("주문 수 근사 집계(HyperLogLog)", value=False,
+                                  help="일별 스케치를 병합해 고유 주문 수를 추정합니다.")
     start_date = None
     end_date = None
 
+    # 벤치마크: 쇼핑몰 ID를 넣으면 비교에서 그 쇼핑몰을 빼고, 버튼을 누를 때만 이 보고서를 저장소에 반영
+    st.divider()
+    st.subheader("벤치마크")
+    bm_shop = st.text_input("쇼핑몰 ID (비교에서 제외, 반영 버튼으로 저장)").strip()
+    bm_segment = st.selectbox("업종(선택)", benchmarks.segments(), index=None, accept_new_options=True,
+                              placeholder="업종을 고르면 같은 업종 평균과 비교")
+
     # 선택 입력(있으면 섹션 확장)
     st.divider()
     st.subheader("선택 입력(있으면 표시)")
     widget_perf_file = st.file_uploader("위젯별 성과 CSV(선택)", type=["csv"])
     # 기대 컬럼: [순위, 전환주문금액, 함께구매주문금액, 위젯명] 등 자유형. 아래에서 유연 표시
+    # 위젯명 + 상품 코드/상품명(+주문번호) 컬럼이 있으면 주문 CSV의 업셀 라인과 조인해 위젯별 성과 산출
 
     st.divider()
     st.subheader("구독료 안내 설정")
@@ -90,66 +124,50 @@ if up_file is None:
 # =========================================
 # 3) 로딩/전처리
 # =========================================
-df = pd.read_csv(up_file)
-
-# 타입 보정
-df[COL_ORDER_TOTAL] = pd.to_numeric(df[COL_ORDER_TOTAL], errors="coerce")
-df[COL_ORDER_DATE] = pd.to_datetime(df[COL_ORDER_DATE], errors="coerce")
-df = df[(df[COL_ORDER_TOTAL] > 0) & df[COL_ORDER_DATE].notna()].copy()
-
-# 라인금액 확보
-if COL_LINE_AMOUNT and (COL_LINE_AMOUNT in df.columns):
-    df["_라인금액"] = pd.to_numeric(df[COL_LINE_AMOUNT], errors="coerce")
-elif (COL_LINE_PRICE in df.columns) and (COL_LINE_QTY in df.columns):
-    df["_라인금액"] = pd.to_numeric(df[COL_LINE_PRICE], errors="coerce") * pd.to_numeric(df[COL_LINE_QTY], errors="coerce")
-else:
-    # 라인금액이 없으면 업셀 금액은 추정이 불가 → 업셀 라인 금액 표시는 스킵하되 전환주문 금액은 가능
-    df["_라인금액"] = np.nan
+# 업로드는 내용 해시 기준 Arrow 캐시로 한 번만 파싱, 금액·날짜 변환과 집계는 공유 프로세스 풀 워커가
+# 캐시 키로 직접 읽어 실행 (세션 스레드는 작업 결과만 표시)
+try:
+    upload_key, _, _ = open_upload(
+        up_file, [COL_ORDER_ID, COL_ORDER_TOTAL, COL_UPSELL_FLAG, COL_ORDER_DATE])
+except SchemaError as e:
+    st.error(str(e))
+    st.stop()
+period = run_with_progress(input_key("order_period", upload_key, REPORT_COLUMNS), order_period,
+                           upload_key, REPORT_COLUMNS, label="주문일 확인 중...")
+warn_rejected(period["report"])
 
 # 분석 기간
-min_dt, max_dt = df[COL_ORDER_DATE].min(), df[COL_ORDER_DATE].max()
+min_dt, max_dt = period["start"], period["end"]
 if custom_range:
     c1, c2 = st.columns(2)
     with c1: start_date = st.date_input("시작일", value=min_dt.date())
     with c2: end_date = st.date_input("종료일", value=max_dt.date())
-    mask = (df[COL_ORDER_DATE] >= pd.to_datetime(start_date)) & (df[COL_ORDER_DATE] <= pd.to_datetime(end_date))
-    df = df[mask].copy()
 else:
     start_date, end_date = min_dt.date(), max_dt.date()
 
 period_days = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days + 1
 
-# 업셀 전환주문 판별
-df["_is_upsell_line"] = (df[COL_UPSELL_FLAG].astype(str).str.strip() == VAL_UPSELL)
-upsell_orders = df.groupby(COL_ORDER_ID)["_is_upsell_line"].any()  # 주문단위 True/False
-upsell_order_ids = upsell_orders[upsell_orders].index
-
-# 주문 단위 집계(중복 주문번호→1행)
-orders = df.sort_values([COL_UPSELL_FLAG], ascending=False).drop_duplicates(subset=[COL_ORDER_ID], keep="last")
-orders_total_sum = float(orders[COL_ORDER_TOTAL].sum())
-orders_cnt = int(orders.shape[0])
-
-# 업셀 전환주문 금액 & AOV
-upsell_orders_only = orders[orders[COL_ORDER_ID].isin(upsell_order_ids)].copy()
-upsell_conv_amount = float(upsell_orders_only[COL_ORDER_TOTAL].sum())
-upsell_orders_cnt = int(upsell_orders_only.shape[0])
-aov_all = float(orders[COL_ORDER_TOTAL].mean()) if orders_cnt else 0.0
-aov_upsell_orders = float(upsell_orders_only[COL_ORDER_TOTAL].mean()) if upsell_orders_cnt else 0.0
-
-# 함께구매주문금액(라인합계)
-if df["_라인금액"].notna().any():
-    upsell_together_amount = float(df.loc[df["_is_upsell_line"], "_라인금액"].sum())
+period_args = (start_date, end_date) if custom_range else ()
+if arrow_table(upload_key).num_rows >= partitioned.PARALLEL_MIN_ROWS:
+    # 큰 업로드는 주문번호 해시 파티션별로 여러 코어에서 부분 집계 후 합침 (단일 패스와 같은 결과)
+    summary = wait(
+        partitioned.submit("summarize_upload", summarize_partition, merge_summaries, upload_key,
+                           None, REPORT_COLUMNS, *period_args,
+                           column=COL_ORDER_ID),
+        label="업셀 성과 집계 중..."
+    )
 else:
-    upsell_together_amount = None  # 표시 불가
-
-# 주문당 평균 상품 수(전체 vs 업셀전환주문)
-items_per_order = df.groupby(COL_ORDER_ID).size()
-items_all_avg = float(items_per_order.mean()) if len(items_per_order) else 0.0
-items_upsell_avg = float(items_per_order.loc[items_per_order.index.isin(upsell_order_ids)].mean()) if len(upsell_order_ids) else 0.0
-
-# 비율계산
-ratio_upsell_conv = (upsell_conv_amount / orders_total_sum * 100.0) if orders_total_sum else 0.0
-ratio_upsell_together = (upsell_together_amount / orders_total_sum * 100.0) if (orders_total_sum and upsell_together_amount is not None) else None
+    summary = run_with_progress(
+        input_key("summarize_upload", upload_key, REPORT_COLUMNS, custom_range and (start_date, end_date)),
+        summarize_upload, upload_key, REPORT_COLUMNS, *period_args,
+        label="업셀 성과 집계 중..."
+    )
+orders_total_sum, orders_cnt = summary["orders_total_sum"], summary["orders_cnt"]
+upsell_conv_amount, upsell_orders_cnt = summary["upsell_conv_amount"], summary["upsell_orders_cnt"]
+aov_all, aov_upsell_orders = summary["aov_all"], summary["aov_upsell_orders"]
+upsell_together_amount = summary["upsell_together_amount"]
+items_all_avg, items_upsell_avg = summary["items_all_avg"], summary["items_upsell_avg"]
+ratio_upsell_conv, ratio_upsell_together = summary["ratio_upsell_conv"], summary["ratio_upsell_together"]
 
 # =========================================
 # 4) 0. 복사용
@@ -162,9 +180,12 @@ def build_notion_md(
     aov_all, aov_upsell_orders, aov_lift_pct, aov_diff,
     items_all_avg, items_upsell_avg, items_diff,
     recent_one_pct=None, recent_bins_all=None, recent_bins_up=None,
-    recent_month_orders=None
+    recent_month_orders=None, recent_aov_pcts=None, bm=None
 ) -> str:
-    """보고서 섹션을 노션 친화적 마크다운으로 변환."""
+    """보고서 섹션을 노션 친화적 마크다운으로 변환. bm: {지표: 벤치마크 값} (없으면 기본값)."""
+    bm = {**BM_FALLBACKS, **(bm or {})}
+    bm_conv, bm_together = bm["upsell_conv_ratio"], bm["upsell_together_ratio"]
+    bm_aov, bm_items = bm["aov_lift"], bm["items_lift"]
     # 금액/비율 표
     tbl1 = [
         "|  | 주문금액(원) | 비율(%) |",
@@ -202,6 +223,13 @@ def build_notion_md(
             lines.append(f"  - {label}: {cnt}건")
         return "\n".join(lines)
 
+    def pcts_to_md(pcts):
+        if not pcts: return ""
+        lines = ["- 객단가 분위수(최근 30일):"]
+        for name, (p50, p90, p99) in pcts.items():
+            lines.append(f"  - {name}: p50 {round(p50):,}원 / p90 {round(p90):,}원 / p99 {round(p99):,}원")
+        return "\n".join(lines)
+
     # 구독료 안내
     sub_fee = ""
     if recent_month_orders is not None:
@@ -231,10 +259,10 @@ def build_notion_md(
 {chr(10).join(tbl3)}
 
 - 벤치마크 지표
-  - 전체주문금액 중 [업셀]전환주문 비율 : 전체평균 7.14% **대비 {'높음' if ratio_upsell_conv>=7.14 else '낮음' if ratio_upsell_conv<=7.14 else '비슷'}** `{ratio_upsell_conv:.2f}%`
-  - 전체주문금액 중 [업셀]함께구매주문금액 비율 : 전체평균 3.17% **대비 {"N/A" if ratio_upsell_together is None else ("높음" if ratio_upsell_together>=3.17 else "낮음")}** {"" if ratio_upsell_together is None else f"`{ratio_upsell_together:.2f}%`"}
-  - [전체주문 vs 업셀주문] 객단가 : 전체평균 34%⤴️ **대비 {'높음' if aov_lift_pct>=34 else '낮음'} `{aov_lift_pct:.2f}%` 🆙**
-  - 주문 당 평균 상품수 : 전체평균 0.7개 대비 **{'높음' if items_diff>=0.7 else '낮음'}  `+{items_diff:.1f}개`** ⤴️
+  - 전체주문금액 중 [업셀]전환주문 비율 : 전체평균 {bm_conv:.2f}% **대비 {'높음' if ratio_upsell_conv>=bm_conv else '낮음' if ratio_upsell_conv<=bm_conv else '비슷'}** `{ratio_upsell_conv:.2f}%`
+  - 전체주문금액 중 [업셀]함께구매주문금액 비율 : 전체평균 {bm_together:.2f}% **대비 {"N/A" if ratio_upsell_together is None else ("높음" if ratio_upsell_together>=bm_together else "낮음")}** {"" if ratio_upsell_together is None else f"`{ratio_upsell_together:.2f}%`"}
+  - [전체주문 vs 업셀주문] 객단가 : 전체평균 {bm_aov:.0f}%⤴️ **대비 {'높음' if aov_lift_pct>=bm_aov else '낮음'} `{aov_lift_pct:.2f}%` 🆙**
+  - 주문 당 평균 상품수 : 전체평균 {bm_items:.1f}개 대비 **{'높음' if items_diff>=bm_items else '낮음'}  `+{items_diff:.1f}개`** ⤴️
 
 > 💡 인사이트  
 > - 주문금액 공헌도: 평균 대비 비슷/낮음 여부 체크. 체험 후반부 우상향이면 **금액별 할인**과의 상관관계를 추가 관찰  
@@ -255,6 +283,8 @@ def build_notion_md(
 ### 2) [업셀] 함께구매주문 객단가분포
 {bins_to_md(recent_bins_up)}
 
+{pcts_to_md(recent_aov_pcts)}
+
 ---
 
 # 3. 성과 제고를 위한 액션 🏃🏻
@@ -351,20 +381,50 @@ def tag_cmp(val, bm, high_good=None):
         verdict = "**낮음**" if (high_good is None or not high_good) else "**낮음(보완)**"
     return f"전체평균 {bm:.2f}% 대비 {verdict} `{val:.2f}%`"
 
+# 벤치마크: 이 쇼핑몰을 뺀 (업종 →) 전체 쇼핑몰 평균을 기준값으로 사용
+report_metrics = {
+    "upsell_conv_ratio": ratio_upsell_conv, "upsell_together_ratio": ratio_upsell_together,
+    "aov_lift": aov_lift_pct, "items_lift": items_diff,
+}
+bm_stats = benchmarks.benchmarks(BM_FALLBACKS, bm_segment, exclude_shop=bm_shop or None)
+bm_values = {metric: stat["value"] for metric, stat in bm_stats.items()}
+
+def bm_note(metric):
+    # 벤치마크 출처와 이 쇼핑몰의 분포 내 위치
+    stat = bm_stats[metric]
+    if stat["digest"] is None:
+        return ""
+    rank = benchmarks.percentile(stat, report_metrics[metric])
+    return (f" <small>({stat['source']} {stat['n']:,}개 쇼핑몰 평균"
+            + (f", 상위 {max(100 - rank, 1):.0f}%" if rank is not None else "") + ")</small>")
+
 st.markdown("---")
 st.markdown("**벤치마크 지표**")
 bm_lines = [
-    f"- 전체주문금액 중 [업셀]전환주문 비율 : {tag_cmp(ratio_upsell_conv, BM_UPSELL_CONV_RATIO, high_good=True)}",
+    f"- 전체주문금액 중 [업셀]전환주문 비율 : {tag_cmp(ratio_upsell_conv, bm_values['upsell_conv_ratio'], high_good=True)}"
+        + bm_note("upsell_conv_ratio"),
     f"- 전체주문금액 중 [업셀]함께구매주문금액 비율 : " + (
-        tag_cmp(ratio_upsell_together, BM_UPSELL_TOGETHER_RATIO, high_good=True) if ratio_upsell_together is not None
+        tag_cmp(ratio_upsell_together, bm_values['upsell_together_ratio'], high_good=True)
+        + bm_note("upsell_together_ratio") if ratio_upsell_together is not None
         else "**라인금액 미제공 → 산출 불가**"
     ),
-    f"- [전체주문 vs 업셀주문] 객단가 : 전체평균 {BM_AOV_LIFT:.0f}%⤴️ 대비 " +
-        (f"**높음 `{aov_lift_pct:.2f}%` 🆙**" if aov_lift_pct >= BM_AOV_LIFT else f"**낮음 `{aov_lift_pct:.2f}%`**"),
-    f"- 주문 당 평균 상품수 : 전체평균 {BM_ITEMS_LIFT:.1f}개 대비 " +
-        (f"**높음 `+{items_diff:.1f}개` ⤴️**" if items_diff >= BM_ITEMS_LIFT else f"**낮음 `+{items_diff:.1f}개`**"),
+    f"- [전체주문 vs 업셀주문] 객단가 : 전체평균 {bm_values['aov_lift']:.0f}%⤴️ 대비 " +
+        (f"**높음 `{aov_lift_pct:.2f}%` 🆙**" if aov_lift_pct >= bm_values['aov_lift'] else f"**낮음 `{aov_lift_pct:.2f}%`**")
+        + bm_note("aov_lift"),
+    f"- 주문 당 평균 상품수 : 전체평균 {bm_values['items_lift']:.1f}개 대비 " +
+        (f"**높음 `+{items_diff:.1f}개` ⤴️**" if items_diff >= bm_values['items_lift'] else f"**낮음 `+{items_diff:.1f}개`**")
+        + bm_note("items_lift"),
 ]
-st.markdown("\n".join(bm_lines))
+st.markdown("\n".join(bm_lines), unsafe_allow_html=True)
+if bm_shop:
+    # 쇼핑몰마다 마지막으로 반영한 보고서 한 벌만 남음 (기간·업종을 바꿔 다시 반영하면 교체)
+    bm_prev = benchmarks.recorded(bm_shop)
+    if st.button(f"이 보고서를 {bm_shop} 벤치마크로 반영"):
+        benchmarks.record(bm_shop, start_date, end_date, report_metrics, bm_segment)
+        st.success(f"{bm_shop}: {start_date} ~ {end_date}{f' · {bm_segment}' if bm_segment else ''} 반영됨")
+    elif bm_prev:
+        st.caption(f"{bm_shop} 현재 반영분: {bm_prev['period_start']} ~ {bm_prev['period_end']}"
+                   + (f" · {bm_prev['segment']}" if bm_prev['segment'] else ""))
 
 st.markdown("---")
 st.markdown("""
@@ -380,13 +440,12 @@ st.markdown("""
 # 5) 2. 자사몰현황(최근 30일)
 # =========================================
 st.markdown('<div class="h1">2. 자사몰현황(최근 30일 🗓️)</div>', unsafe_allow_html=True)
-cutoff = df[COL_ORDER_DATE].max() - timedelta(days=29)
-recent = df[df[COL_ORDER_DATE] >= cutoff].copy()
+# 분석 기간 마지막 주문일 포함 30일(일 단위), 집계 작업의 일별 분포에서 산출
+recent = recent_window(summary, days=30)
 
 # 주문당 구매품목수 — 파이차트 (최근30일)
 st.markdown('<div class="h3">주문 당 구매품목수</div>', unsafe_allow_html=True)
-recent_items = recent.groupby(COL_ORDER_ID).size()
-dist = recent_items.value_counts().sort_index()
+dist = recent["items"]
 total_recent_orders = dist.sum()
 
 labels, vals, others_sum = [], [], 0
@@ -401,12 +460,15 @@ if others_sum > 0:
     labels.append("Others")
     vals.append(others_sum)
 
-fig, ax = plt.subplots(figsize=(6.6, 6.6))
-explode = [0.03]*len(vals)
-wedges, texts, autotexts = ax.pie(vals, labels=labels, autopct="%1.1f%%", startangle=0,
-                                  explode=explode, pctdistance=0.8, labeldistance=1.05)
-ax.axis('equal'); ax.set_title("최근 30일: 주문 당 구매품목수 비중")
-st.pyplot(fig)
+if vals:
+    fig, ax = plt.subplots(figsize=(6.6, 6.6))
+    explode = [0.03]*len(vals)
+    wedges, texts, autotexts = ax.pie(vals, labels=labels, autopct="%1.1f%%", startangle=0,
+                                      explode=explode, pctdistance=0.8, labeldistance=1.05)
+    ax.axis('equal'); ax.set_title("최근 30일: 주문 당 구매품목수 비중")
+    st.pyplot(fig)
+else:
+    st.caption("최근 30일 주문 없음")
 
 if 1 in dist.index and total_recent_orders:
     one_pct = dist.loc[1]/total_recent_orders*100.0
@@ -417,9 +479,7 @@ if 1 in dist.index and total_recent_orders:
 # 객단가 분포 — 전체/업셀
 st.markdown('<div class="h3">객단가분포</div>', unsafe_allow_html=True)
 # 전체
-orders_recent = recent.sort_values([COL_UPSELL_FLAG], ascending=False).drop_duplicates(subset=[COL_ORDER_ID], keep="last")
-orders_recent["_만원대"] = ((orders_recent[COL_ORDER_TOTAL]//10000)*10000).clip(upper=200000)
-vc_all = orders_recent["_만원대"].value_counts().reindex([i*10000 for i in range(21)], fill_value=0).sort_index()
+vc_all = recent["price_bins"]
 labels_all = [f">{200000//10000}.0" if i==200000 else f"{i//10000}.0" for i in vc_all.index]
 fig2, ax2 = plt.subplots(figsize=(10,5.6))
 bars = ax2.bar(labels_all, vc_all.values)
@@ -430,11 +490,8 @@ st.pyplot(fig2)
 st.caption("🚚 무료배송 임계값 예: 2만원 이상")
 
 # 업셀
-orders_recent["_is_upsell_order"] = orders_recent[COL_ORDER_ID].isin(upsell_order_ids)
-upsell_recent = orders_recent[orders_recent["_is_upsell_order"]]
-if not upsell_recent.empty:
-    upsell_recent["_만원대"] = ((upsell_recent[COL_ORDER_TOTAL]//10000)*10000).clip(upper=200000)
-    vc_up = upsell_recent["_만원대"].value_counts().reindex([i*10000 for i in range(21)], fill_value=0).sort_index()
+if recent["upsell_price_bins"].sum():
+    vc_up = recent["upsell_price_bins"]
     labels_up = [f">{200000//10000}.0" if i==200000 else f"{i//10000}.0" for i in vc_up.index]
     fig3, ax3 = plt.subplots(figsize=(10,5.6))
     bars = ax3.bar(labels_up, vc_up.values)
@@ -445,6 +502,23 @@ if not upsell_recent.empty:
 else:
     st.caption("최근 30일 업셀 전환주문 없음")
 
+# 객단가 분위수 — 20만원 상한 고정 구간 대신 t-digest 분위수로 가격대 무관 요약
+recent_digests = recent["digests"]
+recent_aov_pcts = {name: (d.quantile(0.5), d.quantile(0.9), d.quantile(0.99))
+                   for name, d in recent_digests.items() if d.count}      # 주문이 없는 구간은 생략
+if recent_aov_pcts:
+    st.table(pd.DataFrame(recent_aov_pcts, index=["p50", "p90", "p99"]).T.style.format("{:,.0f}원"))
+
+adaptive_edges = recent_digests["전체주문"].bin_edges(n_bins=10)
+if len(adaptive_edges) > 1:
+    adaptive_labels = [f"{adaptive_edges[i]/10000:,.1f}~{adaptive_edges[i+1]/10000:,.1f}" for i in range(len(adaptive_edges) - 1)]
+    adaptive_counts = pd.DataFrame({name: d.histogram(adaptive_edges) for name, d in recent_digests.items()},
+                                   index=adaptive_labels)
+    fig4, ax4 = plt.subplots(figsize=(10,5.6))
+    adaptive_counts.plot.bar(ax=ax4, rot=45)
+    ax4.set_title("객단가 분위수 구간 분포 (최근 30일)"); ax4.set_xlabel("만원 구간(분위수 기반)"); ax4.set_ylabel("주문 건수(추정)")
+    st.pyplot(fig4)
+
 # =========================================
 # 6) 3. 성과 제고를 위한 액션
 # =========================================
@@ -461,7 +535,21 @@ st.markdown("""
 if widget_perf_file is not None:
     wdf = pd.read_csv(widget_perf_file)
     st.markdown('<div class="h3">⚡️위젯별 성과</div>', unsafe_allow_html=True)
-    st.dataframe(wdf)
+    widget_perf = run_with_progress(
+        input_key("attribute_widgets", upload_key, widget_perf_file, period_args, aov_all, items_all_avg),
+        attribute_upload, upload_key, REPORT_COLUMNS, wdf, COL_WIDGET_NAME, aov_all, items_all_avg, *period_args,
+        label="위젯별 성과 집계 중..."
+    )
+    if widget_perf is None:
+        st.dataframe(wdf)
+        st.caption(f"위젯 CSV에 '{COL_WIDGET_NAME}'과 '{COL_PRODUCT_CODE}' 또는 '{COL_PRODUCT_NAME}' 컬럼이 있으면 주문 데이터와 연결해 위젯별 전환 성과를 계산합니다.")
+    else:
+        st.dataframe(widget_perf.style.format({
+            "전환주문금액": "{:,.0f}", "함께구매주문금액": "{:,.0f}", "객단가": "{:,.0f}",
+            "객단가 상승률(%)": "{:+.2f}%", "주문당 상품수": "{:.2f}", "상품수 상승(개)": "{:+.2f}",
+        }), hide_index=True)
+        with st.expander("업로드한 위젯 CSV 원본"):
+            st.dataframe(wdf)
 else:
     st.caption("위젯별 성과 CSV를 업로드하면 표로 표시됩니다.")
 
@@ -481,10 +569,26 @@ st.write("- 추가구매를 유도하는 **타이틀 문구**와 **썸네일 비
 # =========================================
 st.markdown('<div class="h1">4. 구독료 안내</div>', unsafe_allow_html=True)
 
-# 최근 한 달 주문 수
-month_cut = df[COL_ORDER_DATE].max() - timedelta(days=29)
-recent_month_orders = df[df[COL_ORDER_DATE] >= month_cut][COL_ORDER_ID].nunique()
-st.write(f"🌱 최근 한달 주문 수: **{recent_month_orders:,}건**")
+# 최근 한 달 주문 수 (2. 자사몰현황과 같은 일 단위 30일 구간)
+month_start, month_end = recent["start"], recent["end"]
+if month_start is None:
+    # 분석 기간에 유효한 주문이 없음
+    recent_month_orders = 0
+    st.write("🌱 최근 한달 주문 수: **0건**")
+elif approx_distinct:
+    # 일별 주문번호 HLL 스케치 (업로드 캐시 키 기준 작업) → 구간 안 일자 스케치 병합
+    sketch_days, daily_registers = run_with_progress(
+        input_key("daily_order_sketches", upload_key, REPORT_COLUMNS), daily_order_sketches,
+        upload_key, REPORT_COLUMNS, label="일별 주문 스케치 생성 중..."
+    )
+    in_month = (sketch_days >= max(month_start, pd.Timestamp(start_date))) & (sketch_days <= month_end)
+    # 구간 안 스케치가 없으면(해당 일자 주문 없음) 0건
+    recent_month_orders = (int(round(float(estimate(daily_registers[in_month].max(axis=0)))))
+                           if in_month.any() else 0)
+    st.write(f"🌱 최근 한달 주문 수: **약 {recent_month_orders:,}건** (HLL 추정, 상대 표준오차 ±{relative_error() * 100:.1f}%)")
+else:
+    recent_month_orders = recent["orders"]
+    st.write(f"🌱 최근 한달 주문 수: **{recent_month_orders:,}건**")
 
 st.write("- 월 **~~800,000원~~ 540,000원**(부가세별도) **`엔터프라이즈3`** (월주문수 한도: ~20,000건)")
 if enterprise_offer:
@@ -536,8 +640,22 @@ md_for_notion = build_notion_md(
     recent_one_pct=recent_one_pct,
     recent_bins_all=recent_bins_all,
     recent_bins_up=recent_bins_up if ('vc_up' in locals()) else None,
-    recent_month_orders=recent_month_orders
+    recent_month_orders=recent_month_orders,
+    recent_aov_pcts=recent_aov_pcts,
+    bm=bm_values
 )
 
 st.markdown("### 노션 공유용 마크다운")
 copy_to_clipboard_ui(md_for_notion, label="노션용 마크다운 복사")
+
+# 보고서 묶음: 노션용 마크다운 + 요약 지표 (+ 위젯 성과) — 파일은 버튼을 누를 때만 생성
+st.markdown("### 보고서 묶음 다운로드")
+report_members = {
+    "report.md": md_for_notion,
+    "summary": pd.Series({k: v for k, v in summary.items()
+                          if k not in ("upsell_order_ids", "daily_orders", "daily_digests")}, dtype=object)
+                 .rename_axis("지표").reset_index(name="값"),
+}
+if widget_perf_file is not None and widget_perf is not None:
+    report_members["widget_performance"] = widget_perf
+download_bundle("보고서 묶음", report_members, "upsell_report")
@@ -1,8 +1,42 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from collections import Counter
-import itertools
+from utils.jobs import input_key, get_runner, run_with_progress
+from utils.pair_counts import count_upload_pairs, pair_preview, upload_products
+from utils.progressive import SAMPLE_ORDERS, count_ci
+from utils import cooccurrence_store
+from utils.recommender import METRICS, TOP_K, recommend
+from utils.schema import SchemaError
+from utils import guardrails
+from utils.engine import compare_engines, select_engine, run as run_engine
+from utils.exports import download_bundle, download_buttons
+from utils.parsing import warn_rejected
+
+def find_related_products(combination_counts, product_name):
+    related = []
+    for (prod1, prod2), count in combination_counts.items():
+        if prod1 == product_name:
+            related.append((prod2, count))
+        elif prod2 == product_name:
+            related.append((prod1, count))
+    return sorted(related, key=lambda x: x[1], reverse=True)
+
+def find_related_upsell_products(combination_counts_upsell, product_name):
+    related = [(upsell_prod, count) for (general_prod, upsell_prod), count in combination_counts_upsell.items()
+               if general_prod == product_name]
+    return sorted(related, key=lambda x: x[1], reverse=True)
+
+def counts_table(counts, columns):
+    """조합 Counter → 횟수 많은 순 표 (다운로드용)."""
+    table = pd.DataFrame([(a, b, n) for (a, b), n in counts.items()], columns=columns)
+    return table.sort_values(columns[-1], ascending=False, kind='stable', ignore_index=True)
+
+def estimated_table(related, n_sampled, n_orders):
+    """표본 조합 횟수 → 전체 규모 추정치와 95% 신뢰구간."""
+    df = pd.DataFrame(related, columns=['상품명', '표본 횟수']).head(10)
+    estimate, half = count_ci(df['표본 횟수'].to_numpy(), n_sampled, n_orders)
+    df['함께 구매된 횟수(추정)'] = [f"≈ {e:,.0f} ± {h:,.0f}" for e, h in zip(estimate, half)]
+    return df[['상품명', '함께 구매된 횟수(추정)']]
 
 def run_product_analysis():
     st.title('상품 연관성 분석 v1.2')
@@ -11,92 +45,150 @@ def run_product_analysis():
 
     if uploaded_file is not None:
         # 데이터 읽기 및 전처리
-        data = pd.read_csv(uploaded_file)
-        data['총 주문 금액'] = pd.to_numeric(data['총 주문 금액'], errors='coerce')
-        data = data[data['총 주문 금액'] > 0]
-        data = data.sort_values(by=['일반/업셀 구분'], ascending=False)
-
-        # 상품명으로 그룹화하여 데이터 집계
-        aggregated_data = data.groupby('상품명').agg({
-            '총 주문 금액': 'sum',
-            '일반/업셀 구분': 'first'  # 각 그룹의 첫 번째 값 사용
-        }).reset_index()
-
-        # 상품명을 기준으로 정렬
-        sorted_product_names = sorted(aggregated_data['상품명'].unique())
-
-        # 검색 기능 추가
-        search_term = st.text_input("상품 검색:", "")
-        filtered_options = [option for option in sorted_product_names if search_term.lower() in option.lower()]
-
-        selected_product_name = st.selectbox("상품을 선택하세요:", filtered_options)
-
-        # 1. 전체 상품 조합 분석
-        st.header("1. 전체 상품 조합 분석")
-
-        order_groups = data.groupby('주문번호')['상품명'].apply(list).reset_index()
-
-        def get_product_combinations(products):
-            return list(itertools.combinations(set(products), 2))
-
-        all_combinations = []
-        for _, row in order_groups.iterrows():
-            all_combinations.extend(get_product_combinations(row['상품명']))
-
-        combination_counts = Counter(all_combinations)
-
-        def find_related_products(product_name):
-            related = []
-            for (prod1, prod2), count in combination_counts.items():
-                if prod1 == product_name:
-                    related.append((prod2, count))
-                elif prod2 == product_name:
-                    related.append((prod1, count))
-            return sorted(related, key=lambda x: x[1], reverse=True)
-
-        if selected_product_name:
-            related_products = find_related_products(selected_product_name)
-            st.write(f"{selected_product_name}와(과) 함께 구매된 상품:")
-            
-            if related_products:
-                df_related = pd.DataFrame(related_products, columns=['상품명', '함께 구매된 횟수'])
-                st.dataframe(df_related.head(10))
+        try:
+            plan = guardrails.plan_upload(uploaded_file, ['주문번호', '상품명', '총 주문 금액', '일반/업셀 구분'])
+        except SchemaError as e:
+            st.error(str(e))
+            return
+        guardrails.show_plan(plan)
+        # 무거운 분석은 동시 실행 수를 제한 (파싱·조합 집계가 끝날 때까지 슬롯 점유)
+        with guardrails.admit(plan, "상품 연관성 분석"):
+            upload_key = guardrails.open_planned(uploaded_file, plan)
+            engine_name, compare_engine = select_engine("product_pairs")
+            # 상품 목록·주문 수는 워커에서 집계 (세션마다 라인아이템 프레임을 만들지 않음)
+            products = run_with_progress(input_key('upload_products', upload_key), upload_products, upload_key,
+                                         label="상품 목록 준비 중...")
+            warn_rejected(products['report'])
+
+            # 쇼핑몰별 누적 저장소: 이전 업로드에서 집계한 주문번호는 건너뛰고 새 주문만 더함
+            shop = st.selectbox("누적 집계 쇼핑몰 (선택):", cooccurrence_store.shops(), index=None, accept_new_options=True,
+                                placeholder="쇼핑몰 ID를 입력하면 이번 업로드의 새 주문을 누적 집계에 반영합니다")
+
+            # 상품명을 기준으로 정렬
+            sorted_product_names = products['products']
+
+            # 검색 기능 추가
+            search_term = st.text_input("상품 검색:", "")
+            filtered_options = [option for option in sorted_product_names if search_term.lower() in option.lower()]
+
+            selected_product_name = st.selectbox("상품을 선택하세요:", filtered_options)
+
+            # 1. 전체 상품 조합 분석
+            st.header("1. 전체 상품 조합 분석")
+
+            notice = st.empty()
+            section_related = st.empty()
+
+            # 2. 업셀 상품 분석
+            st.header("2. 업셀 상품 분석")
+            section_upsell = st.empty()
+
+            def show_related(related_products, related_upsell_products, preview=None):
+                """preview=(표본 주문 수, 전체 주문 수)이면 표본 횟수를 전체 규모로 환산해 표시."""
+                with section_related.container():
+                    st.write(f"{selected_product_name}와(과) 함께 구매된 상품:")
+
+                    if related_products:
+                        if preview:
+                            st.dataframe(estimated_table(related_products, *preview))
+                        else:
+                            df_related = pd.DataFrame(related_products, columns=['상품명', '함께 구매된 횟수'])
+                            st.dataframe(df_related.head(10))
+                    else:
+                        st.write("이 상품과 함께 구매된 다른 상품이 없습니다.")
+
+                with section_upsell.container():
+                    st.write(f"{selected_product_name}와(과) 함께 구매된 업셀 상품:")
+
+                    if related_upsell_products:
+                        if preview:
+                            st.dataframe(estimated_table(related_upsell_products, *preview))
+                        else:
+                            df_related_upsell = pd.DataFrame(related_upsell_products, columns=['상품명', '함께 구매된 횟수'])
+                            st.dataframe(df_related_upsell.head(10))
+                    else:
+                        st.write("이 상품과 함께 구매된 업셀 상품이 없습니다.")
+
+            if not selected_product_name:
+                return
+
+            if shop and plan['rate'] < 1:
+                # 표본 업로드를 누적 저장소에 넣으면 조합 횟수가 영구히 과소 집계되므로 이번 업로드만 분석
+                st.warning(f"표본 분석 중이라 {shop} 누적 집계에는 반영하지 않고 이번 업로드만 분석합니다.")
+                shop = None
+
+            if shop:
+                # 새 주문만 집계해 저장소에 반영 → 누적 조합 순위를 저장소에서 바로 조회
+                # 워커에는 업로드 캐시 키만 넘김 (워커가 Arrow 파일을 메모리 맵으로 직접 읽음)
+                stats = run_with_progress(input_key('cooccurrence_ingest', shop, upload_key),
+                                          cooccurrence_store.ingest_upload, shop, upload_key, label="누적 집계 반영 중...")
+                notice.caption(f"🗂️ {shop} 누적 {stats['total_orders']:,}건 기준 "
+                               f"(이번 업로드 신규 {stats['new_orders']:,}건 반영, 기존 {stats['skipped_orders']:,}건 건너뜀)")
+                show_related(cooccurrence_store.related_products(shop, selected_product_name),
+                             cooccurrence_store.related_upsell_products(shop, selected_product_name))
+                product_orders, combination_counts, combination_counts_upsell = cooccurrence_store.load_counts(shop)
+                n_orders = stats['total_orders']
+                counts_key = input_key('cooccurrence_store', shop, n_orders)
+            elif engine_name != "pandas":
+                # DuckDB: 주문 내 상품 쌍을 SQL self-join으로 집계 (표본 미리보기 없이 바로 정확한 값)
+                counts_key = input_key('pair_counts', engine_name, upload_key)
+                combination_counts, combination_counts_upsell = run_engine(
+                    engine_name, 'pair_counts', upload_key, label="상품 조합 집계 중...")
+                show_related(find_related_products(combination_counts, selected_product_name),
+                             find_related_upsell_products(combination_counts_upsell, selected_product_name))
+                product_orders, n_orders = products['product_orders'], products['n_orders']
             else:
-                st.write("이 상품과 함께 구매된 다른 상품이 없습니다.")
-
-        # 2. 업셀 상품 분석
-        st.header("2. 업셀 상품 분석")
-
-        order_groups_upsell = data.groupby('주문번호').apply(lambda x: {
-            'general': x[x['일반/업셀 구분'] == '일반 상품']['상품명'].tolist(),
-            'upsell': x[x['일반/업셀 구분'] == '업셀 상품']['상품명'].tolist()
-        }).reset_index(name='products')
-
-        def get_product_combinations_upsell(products):
-            general = products.get('general', [])
-            upsell = products.get('upsell', [])
-            return list(itertools.product(general, upsell))
-
-        all_combinations_upsell = []
-        for _, row in order_groups_upsell.iterrows():
-            all_combinations_upsell.extend(get_product_combinations_upsell(row['products']))
-
-        combination_counts_upsell = Counter(all_combinations_upsell)
-
-        def find_related_upsell_products(product_name):
-            related = [(upsell_prod, count) for (general_prod, upsell_prod), count in combination_counts_upsell.items()
-                       if general_prod == product_name]
-            return sorted(related, key=lambda x: x[1], reverse=True)
-
-        if selected_product_name:
-            related_upsell_products = find_related_upsell_products(selected_product_name)
-            st.write(f"{selected_product_name}와(과) 함께 구매된 업셀 상품:")
-            
-            if related_upsell_products:
-                df_related_upsell = pd.DataFrame(related_upsell_products, columns=['상품명', '함께 구매된 횟수'])
-                st.dataframe(df_related_upsell.head(10))
-            else:
-                st.write("이 상품과 함께 구매된 업셀 상품이 없습니다.")
+                # 조합 집계는 공유 프로세스 풀에서 실행 (같은 업로드·컬럼 매핑·표본 여부는 세션 간 한 번만 계산)
+                # 업로드 캐시 키가 매핑·표본 모드를 포함하고, 워커는 키로 Arrow 파일을 메모리 맵으로 읽음
+                counts_key = input_key('pair_counts', upload_key)
+                pairs_job = get_runner().submit(counts_key, count_upload_pairs, upload_key)
+
+                # 정확한 집계가 끝나기 전에는 주문 표본으로 추정한 순위를 먼저 보여주고, 끝나면 같은 자리를 교체
+                if not pairs_job.done():
+                    sample = run_with_progress(input_key('pair_preview', upload_key, SAMPLE_ORDERS), pair_preview,
+                                               upload_key, SAMPLE_ORDERS, label="표본 집계 중...")
+                    n_sampled, n_orders = sample['n_sampled'], sample['n_orders']
+                    if n_sampled < n_orders:
+                        notice.caption(f"⏳ 표본 {n_sampled:,} / 전체 {n_orders:,} 주문 기준 추정치를 먼저 표시합니다 (± 95% 신뢰구간). "
+                                       "정확한 집계가 끝나면 자동으로 교체됩니다.")
+                        show_related(find_related_products(sample['counts'], selected_product_name),
+                                     find_related_upsell_products(sample['counts_upsell'], selected_product_name),
+                                     preview=(n_sampled, n_orders))
+
+                combination_counts, combination_counts_upsell = run_with_progress(
+                    counts_key, count_upload_pairs, upload_key, label="상품 조합 집계 중..."
+                )
+                notice.empty()
+                show_related(find_related_products(combination_counts, selected_product_name),
+                             find_related_upsell_products(combination_counts_upsell, selected_product_name))
+                product_orders, n_orders = products['product_orders'], products['n_orders']
+
+            if compare_engine:
+                compare_engines('pair_counts', upload_key)
+
+        # 3. 업셀 추천 목록: 동시구매 유사도로 모든 상품의 top-k를 한 번에 계산
+        st.header("3. 업셀 추천 목록")
+        st.caption("함께 구매된 업셀 상품을 유사도 순으로 추천하고, 부족하면 연관 상품의 업셀(2단계 연관)과 인기 업셀로 채웁니다.")
+        col_metric, col_k = st.columns(2)
+        metric = col_metric.selectbox("유사도 기준:", list(METRICS))
+        k = col_k.slider("상품별 추천 수:", 1, 20, TOP_K)
+        candidates = products['upsell_products'] | {upsell for _, upsell in combination_counts_upsell}
+        # 후보 업셀 상품은 이번 업로드에서도 오므로 (쇼핑몰 누적 모드에서 counts_key가 같아도) 업로드 키를 함께 씀
+        recommendations = run_with_progress(
+            input_key('recommend', counts_key, upload_key, metric, k),
+            recommend, pd.Series(product_orders), combination_counts, n_orders, candidates, k, METRICS[metric],
+            label="추천 목록 계산 중..."
+        )
+
+        st.write(f"{selected_product_name}에 추천할 업셀 상품:")
+        st.dataframe(recommendations[recommendations['상품명'] == selected_product_name], hide_index=True)
+        # 다운로드 파일은 버튼을 누를 때만 생성
+        download_buttons("전체 상품 추천 목록", recommendations, "upsell_recommendations")
+        download_bundle("상품 조합 집계", {
+            "pair_counts": lambda: counts_table(combination_counts, ['상품 A', '상품 B', '함께 구매된 횟수']),
+            "upsell_pair_counts": lambda: counts_table(combination_counts_upsell, ['일반 상품', '업셀 상품', '함께 구매된 횟수']),
+            "upsell_recommendations": recommendations,
+        }, "product_pairs")
 
     else:
         st.write("CSV 파일을 업로드해주세요.")
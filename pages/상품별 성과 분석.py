@@ -1,5 +1,28 @@
 import streamlit as st
 import pandas as pd
+from utils.product_trends import daily_series, product_trends
+from utils.schema import SchemaError, open_upload
+import pyarrow.compute as pc
+from utils.upload_cache import arrow_table, load_frame
+from utils.engine import compare_engines, select_engine, run as run_engine
+from utils.exports import download_buttons
+from utils.parsing import parse_amounts, warn_rejected
+
+PRODUCT_KEYS = ['상품 코드', '상품명']
+SORT_OPTIONS = ['합계 매출', '7일 매출 증감률(%)', '28일 매출 증감률(%)', '최근 7일 매출', '최근 28일 매출', '구매 수량']
+
+
+@st.cache_data(show_spinner="상품별 일별 추이 계산 중...")
+def load_product_trends(upload_key, filter_option):
+    """업로드·필터별 상품 × 일자 시계열 (필터 변경 시에만 다시 계산)."""
+    data = load_frame(upload_key, PRODUCT_KEYS + ['주문일', '일반/업셀 구분', '구매 수량', '상품 단가'])
+    if filter_option != "전체 상품":
+        data = data[data['일반/업셀 구분'] == filter_option]
+    parse_report = {}
+    data = data.assign(합계_매출=parse_amounts(data['구매 수량'], parse_report)
+                       * parse_amounts(data['상품 단가'], parse_report))
+    warn_rejected(parse_report)
+    return product_trends(data, PRODUCT_KEYS, '주문일', '구매 수량', '합계_매출')
 
 # 제목 설정
 st.title('상품 구매 성과 분석')
@@ -9,37 +32,75 @@ uploaded_file = st.file_uploader("CSV 파일을 업로드하세요.", type="csv"
 
 if uploaded_file is not None:
     # 데이터 읽기
-    data = pd.read_csv(uploaded_file)
+    try:
+        upload_key, _, columns = open_upload(uploaded_file, PRODUCT_KEYS + ['일반/업셀 구분', '구매 수량', '상품 단가'],
+                                             optional=['주문일'])
+    except SchemaError as e:
+        st.error(str(e))
+        st.stop()
+    # 세션마다 프레임을 만들지 않고 공유 메모리 맵 Arrow 테이블에서 건수만 확인 (집계는 엔진·캐시 함수에서)
+    kinds = arrow_table(upload_key, ['일반/업셀 구분']).column(0)
+
+    engine_name, compare_engine = select_engine("product_performance")
 
     # 드롭다운 메뉴 생성
     filter_option = st.selectbox("보고 싶은 데이터를 선택하세요:", ["전체 상품", "일반 상품", "업셀 상품"])
 
     # 필터링 조건 설정
-    if filter_option == "일반 상품":
-        filtered_data = data[data['일반/업셀 구분'] == '일반 상품']
-    elif filter_option == "업셀 상품":
-        filtered_data = data[data['일반/업셀 구분'] == '업셀 상품']
+    if filter_option == "전체 상품":
+        n_lines = len(kinds)
     else:
-        filtered_data = data  # 전체 상품
+        n_lines = pc.sum(pc.equal(kinds, filter_option)).as_py() or 0
 
-    if not filtered_data.empty:
-        # 각 행의 매출 계산
-        filtered_data['합계 매출'] = filtered_data['구매 수량'] * filtered_data['상품 단가']
+    if n_lines:
+        # 상품 코드, 상품명별로 구매 수량 합계, 단가 목록, 합계 매출을 기준으로 요약 (선택한 엔진으로 실행)
+        kind = None if filter_option == "전체 상품" else filter_option
+        summary = run_engine(engine_name, 'product_summary', upload_key, kind, label="상품별 요약 중...")
+        if compare_engine:
+            compare_engines('product_summary', upload_key, kind)
 
-        # 상품 코드, 상품명별로 구매 수량 합계, 단가 목록, 합계 매출을 기준으로 요약
-        summary = filtered_data.groupby(['상품 코드', '상품명'], as_index=False).agg({
-            '구매 수량': 'sum',
-            '상품 단가': lambda x: ', '.join(map(str, sorted(x.unique()))),  # 단가 목록 표시
-            '합계 매출': 'sum'  # 합계 매출 합산
-        })
+        # 상품 × 일자 시계열 → 최근 7/28일 합계·증감률·주별 스파크라인을 요약에 결합
+        has_dates = '주문일' in columns
+        if has_dates:
+            trends, daily, day_index = load_product_trends(upload_key, filter_option)
+            summary = summary.join(trends, on=PRODUCT_KEYS)
 
         # 요약 결과 표시
         st.write(f"### {filter_option} 구매 성과 요약")
-        st.write(summary)
+        if has_dates and len(day_index):
+            st.caption(f"추이 기준일: {day_index[-1]:%Y-%m-%d} · 증감률은 직전 같은 기간 대비 (직전 판매 없음은 빈칸)")
+            sort_by = st.selectbox("정렬 기준", SORT_OPTIONS)
+            summary = summary.sort_values(sort_by, ascending=False, na_position='last', ignore_index=True)
+            st.dataframe(
+                summary,
+                column_config={
+                    '주별 매출 추이': st.column_config.LineChartColumn(
+                        f"주별 매출 추이 (최근 {len(trends['주별 매출 추이'].iloc[0])}주)"),
+                    '7일 매출 증감률(%)': st.column_config.NumberColumn(format="%.1f%%"),
+                    '28일 매출 증감률(%)': st.column_config.NumberColumn(format="%.1f%%"),
+                    '7일 수량 증감률(%)': st.column_config.NumberColumn(format="%.1f%%"),
+                    '28일 수량 증감률(%)': st.column_config.NumberColumn(format="%.1f%%"),
+                },
+                hide_index=True,
+            )
+
+            # 선택 상품의 일별 수량·매출과 롤링 합계
+            picked = st.selectbox("일별 추이를 볼 상품", list(summary[PRODUCT_KEYS].itertuples(index=False, name=None)),
+                                  format_func=lambda key: f"{key[1]} ({key[0]})")
+            product_no = trends.index.get_loc(picked)
+            metric = st.radio("지표", ['매출', '수량'], horizontal=True)
+            series = daily_series(daily, product_no, day_index)[metric]
+            st.line_chart(pd.DataFrame({
+                f'일별 {metric}': series,
+                '7일 합계': series.rolling(7, min_periods=1).sum(),
+                '28일 합계': series.rolling(28, min_periods=1).sum(),
+            }))
+        else:
+            st.write(summary)
 
-        # 선택 옵션: 데이터 다운로드 제공
-        csv_data = summary.to_csv(index=False).encode('utf-8')
-        st.download_button("CSV 파일로 다운로드", csv_data, "purchase_performance_summary.csv", "text/csv")
+        # 선택 옵션: 데이터 다운로드 제공 (파일은 버튼을 누를 때만 생성)
+        download_buttons("파일로 다운로드", lambda: summary.drop(columns=['주별 매출 추이'], errors='ignore'),
+                         "purchase_performance_summary")
     else:
         st.write(f"{filter_option} 데이터가 없습니다.")
 else:
@@ -3,6 +3,14 @@ import pandas as pd
 import math
 from datetime import timedelta
 import altair as alt
+from utils.schema import SchemaError, read_mapped
+from utils.parsing import parse_amounts, parse_dates, warn_rejected
+from utils.timeseries import FREQ_OPTIONS, order_trend, downsample, trend_chart
+from utils.segments import order_segments, threshold_grid
+
+ITEM_THRESHOLDS = list(range(1, 11))                   # 상품 수 임계값 (개 이상)
+AMOUNT_THRESHOLDS = list(range(10000, 200001, 10000))  # 주문 금액 임계값 (원 이상)
+MIN_SEGMENT_ORDERS = 30                                # 상위 변화 표에 포함할 세그먼트의 기간별 최소 주문 수
 
 st.set_page_config(page_title="이용 전후 비교", layout="wide")
 st.title("📊 이용 전후 비교")
@@ -14,8 +22,18 @@ if not uploaded_file:
     st.stop()
 
 # 2) 데이터 로드 & 전처리
-df_raw = pd.read_csv(uploaded_file)
-df_raw["주문일"] = pd.to_datetime(df_raw["주문일"])
+try:
+    df_raw = read_mapped(uploaded_file, ["주문번호", "주문일", "총 상품수", "총 주문 금액"],
+                         optional=["주문자 아이디", "일반/업셀 구분", "상품명"])
+except SchemaError as e:
+    st.error(str(e))
+    st.stop()
+parse_report = {}
+df_raw["주문일"] = parse_dates(df_raw["주문일"], parse_report)
+df_raw["총 주문 금액"] = parse_amounts(df_raw["총 주문 금액"], parse_report)
+df_raw["총 상품수"] = parse_amounts(df_raw["총 상품수"], parse_report)
+warn_rejected(parse_report)
+df_raw = df_raw[df_raw["주문일"].notna()]
 orders = (
     df_raw[["주문번호", "주문일", "총 상품수", "총 주문 금액"]]
     .drop_duplicates(subset="주문번호")
@@ -137,4 +155,73 @@ with col1:
 
 with col2:
     st.subheader(f"금액 기준 ({threshold_amount:,}원 이상)")
-    st.altair_chart(make_chart(df_amount, delta_amount_rel), use_container_width=True)
\ No newline at end of file
+    st.altair_chart(make_chart(df_amount, delta_amount_rel), use_container_width=True)
+
+# 9) 일/주 단위 추이 (서버에서 집계·다운샘플 후 Altair로 렌더링)
+st.markdown("## 📉 기간별 추이")
+trend_unit = st.radio("집계 단위", list(FREQ_OPTIONS), horizontal=True)
+trend = order_trend(
+    orders, "주문일", "총 주문 금액", "총 상품수",
+    freq=FREQ_OPTIONS[trend_unit],
+    amount_threshold=threshold_amount, items_threshold=threshold_n,
+)
+share_cols = [f"{threshold_n}개 이상 비중", f"{threshold_amount:,}원 이상 비중"]
+
+t1, t2 = st.columns(2)
+with t1:
+    st.altair_chart(
+        trend_chart(downsample(trend, "기간", ["객단가"]), "기간", "객단가(원)", rule_at=curr_start),
+        use_container_width=True
+    )
+with t2:
+    st.altair_chart(
+        trend_chart(downsample(trend, "기간", ["주문당 상품수"]), "기간", "주문당 상품수(개)", ",.2f", rule_at=curr_start),
+        use_container_width=True
+    )
+st.altair_chart(
+    trend_chart(downsample(trend, "기간", share_cols), "기간", "임계값 이상 주문 비중", ".0%", rule_at=curr_start),
+    use_container_width=True
+)
+
+# 10) 세그먼트 × 임계값 전후 비교 (어느 고객·상품군에서 변화가 생겼는지)
+st.markdown("## 🧩 세그먼트별 전후 비교")
+grid_basis = st.radio("비교 기준", ["상품 수", "주문 금액"], horizontal=True)
+membership = order_segments(df_raw, orders["주문번호"])
+grid = threshold_grid(
+    orders["총 상품수" if grid_basis == "상품 수" else "총 주문 금액"],
+    orders["주문일_date"] >= curr_start,
+    membership,
+    ITEM_THRESHOLDS if grid_basis == "상품 수" else AMOUNT_THRESHOLDS,
+)
+current_threshold = threshold_n if grid_basis == "상품 수" else threshold_amount
+grid["임계값 표시"] = (grid["임계값"].map(lambda v: f"{v:.0f}개" if grid_basis == "상품 수" else f"{v / 10000:.0f}만원"))
+st.caption(f"칸 색: 이후 기간 비중 − 이전 기간 비중 (%p). "
+           f"현재 기준 임계값: {current_threshold:,}{'개' if grid_basis == '상품 수' else '원'} 이상")
+
+heatmap = (
+    alt.Chart(grid)
+    .mark_rect()
+    .encode(
+        x=alt.X("임계값 표시:O", sort=None, title=f"{grid_basis} 임계값 (이상)", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("세그먼트:N", sort=list(membership.columns), title=None),
+        color=alt.Color("변화(%p):Q", scale=alt.Scale(scheme="redblue", domainMid=0, reverse=True), title="변화(%p)"),
+        tooltip=[
+            "세그먼트", "임계값 표시",
+            alt.Tooltip("이전 비중:Q", format=".1%"), alt.Tooltip("이후 비중:Q", format=".1%"),
+            alt.Tooltip("변화(%p):Q", format="+.1f"),
+            alt.Tooltip("이전 주문 수:Q", format=","), alt.Tooltip("이후 주문 수:Q", format=","),
+        ],
+    )
+    .properties(height=max(24 * len(membership.columns), 120))
+)
+st.altair_chart(heatmap, use_container_width=True)
+
+st.markdown(f"**변화가 큰 조합 (기간별 주문 {MIN_SEGMENT_ORDERS}건 이상 세그먼트)**")
+top_moves = grid[(grid["이전 주문 수"] >= MIN_SEGMENT_ORDERS) & (grid["이후 주문 수"] >= MIN_SEGMENT_ORDERS)]
+top_moves = top_moves.reindex(top_moves["변화(%p)"].abs().sort_values(ascending=False).index).head(10)
+st.dataframe(
+    top_moves[["세그먼트", "임계값 표시", "이전 비중", "이후 비중", "변화(%p)", "이전 주문 수", "이후 주문 수"]]
+    .style.format({"이전 비중": "{:.1%}", "이후 비중": "{:.1%}", "변화(%p)": "{:+.1f}",
+                   "이전 주문 수": "{:,}", "이후 주문 수": "{:,}"}),
+    hide_index=True,
+)
@@ -0,0 +1,101 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+from utils.schema import SchemaError, read_mapped
+from utils.parsing import parse_amounts, parse_dates, warn_rejected
+
+st.set_page_config(page_title="주문 시간대 분석", layout="wide")
+st.title("🕒 주문 시간대 분석")
+
+WEEKDAYS = ['월', '화', '수', '목', '금', '토', '일']
+SEGMENTS = ['일반 주문', '업셀 주문']
+
+# 1) CSV 업로드
+uploaded_file = st.file_uploader("📂 주문 데이터 CSV 업로드", type="csv")
+if not uploaded_file:
+    st.info("먼저 주문 데이터 CSV를 업로드해 주세요.")
+    st.stop()
+
+# 2) 데이터 로드 & 주문 단위 정리 (업셀 라인이 있는 주문은 업셀 주문으로 남김)
+try:
+    df_raw = read_mapped(uploaded_file, ['주문번호', '주문일', '총 주문 금액', '일반/업셀 구분'])
+except SchemaError as e:
+    st.error(str(e))
+    st.stop()
+parse_report = {}
+df_raw['총 주문 금액'] = parse_amounts(df_raw['총 주문 금액'], parse_report)
+df_raw['주문일'] = parse_dates(df_raw['주문일'], parse_report)
+warn_rejected(parse_report)
+df_raw = df_raw[(df_raw['총 주문 금액'] > 0) & df_raw['주문일'].notna()]
+orders = (
+    df_raw.sort_values(by=['일반/업셀 구분'], ascending=False)
+    .drop_duplicates(subset=['주문번호'], keep='last')
+)
+
+# 3) 요일 × 시간 × (일반/업셀) 셀 번호 → 한 번의 bincount로 건수·금액 집계
+cell = (
+    (orders['일반/업셀 구분'] == '업셀 상품').to_numpy(dtype=np.int64) * (7 * 24)
+    + orders['주문일'].dt.weekday.to_numpy(dtype=np.int64) * 24
+    + orders['주문일'].dt.hour.to_numpy(dtype=np.int64)
+)
+counts = np.bincount(cell, minlength=2 * 7 * 24).reshape(2, 7, 24)
+amounts = np.bincount(cell, weights=orders['총 주문 금액'].to_numpy(dtype=np.float64),
+                      minlength=2 * 7 * 24).reshape(2, 7, 24)
+
+total_counts = counts.sum(axis=0)
+with np.errstate(invalid='ignore', divide='ignore'):
+    grids = {
+        '주문 수': {'전체': total_counts, '일반 주문': counts[0], '업셀 주문': counts[1]},
+        '객단가': {'전체': amounts.sum(axis=0) / total_counts,
+                  '일반 주문': amounts[0] / counts[0], '업셀 주문': amounts[1] / counts[1]},
+        '주문 비중': {'전체': total_counts / total_counts.sum(),
+                   '일반 주문': counts[0] / counts[0].sum(), '업셀 주문': counts[1] / counts[1].sum()},
+        '업셀 비중': {'전체': counts[1] / total_counts},
+    }
+
+st.write(f"**분석 기간:** {orders['주문일'].min():%Y-%m-%d} ~ {orders['주문일'].max():%Y-%m-%d} "
+         f"· 주문 {len(orders):,}건 (업셀 주문 {int(counts[1].sum()):,}건)")
+
+# 4) 보기 선택
+c1, c2 = st.columns(2)
+metric = c1.selectbox("지표", list(grids))
+segment_options = list(grids[metric])
+if metric == '주문 비중':
+    segment_options.append('업셀 - 일반 (비중 차이)')
+segment = c2.selectbox("주문 구분", segment_options)
+
+if segment == '업셀 - 일반 (비중 차이)':
+    grid = grids['주문 비중']['업셀 주문'] - grids['주문 비중']['일반 주문']
+else:
+    grid = grids[metric][segment]
+
+heat = pd.DataFrame({
+    '요일': np.repeat(WEEKDAYS, 24),
+    '시간': np.tile(np.arange(24), 7),
+    '값': np.asarray(grid, dtype=np.float64).ravel(),
+    '주문 수': (total_counts if segment in ('전체', '업셀 - 일반 (비중 차이)')
+              else counts[SEGMENTS.index(segment)]).ravel(),
+})
+
+value_format = {'주문 수': ',.0f', '객단가': ',.0f', '주문 비중': '.2%', '업셀 비중': '.1%'}[metric]
+color_scale = (alt.Scale(scheme='redblue', domainMid=0, reverse=True) if segment == '업셀 - 일반 (비중 차이)'
+               else alt.Scale(scheme='blues'))
+
+chart = (
+    alt.Chart(heat)
+    .mark_rect()
+    .encode(
+        x=alt.X('시간:O', title='시간', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('요일:O', sort=WEEKDAYS, title=None),
+        color=alt.Color('값:Q', scale=color_scale, title=metric, legend=alt.Legend(format=value_format)),
+        tooltip=['요일', '시간', alt.Tooltip('값:Q', title=metric, format=value_format), alt.Tooltip('주문 수:Q', format=',')]
+    )
+    .properties(height=320)
+)
+st.altair_chart(chart, use_container_width=True)
+
+# 5) 상위 시간대
+st.subheader("상위 시간대")
+top = heat.dropna(subset=['값']).sort_values('값', ascending=False).head(10)
+st.dataframe(top.style.format({'값': '{:' + value_format + '}', '주문 수': '{:,}'}), hide_index=True)
@@ -3,17 +3,21 @@ import pandas as pd
 import mysql.connector
 import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.ticker import PercentFormatter
-import matplotlib.dates as mdates
+import altair as alt
+from utils.sketches import grouped_registers, merge_registers, estimate, relative_error
+from utils.timeseries import MAX_CHART_POINTS, downsample, trend_chart
+from utils.service_usage import (service_transitions, transition_matrix, service_bitsets, co_usage, target_shops,
+                                 NEW_LABEL, DROP_LABEL)
+from utils.exports import download_buttons
+from utils import usage_mirror
 
 # --- Page Setup ---
 st.set_page_config(page_title="Service Usage Dashboard", layout="wide")
 st.title("Weekly Service Usage Dashboard")
 
-# --- Connect to Railway MySQL ---
-@st.cache_data
-def load_data():
-    conn = mysql.connector.connect(
+# --- Connect to Railway MySQL (로컬 미러 동기화에만 사용) ---
+def connect_remote():
+    return mysql.connector.connect(
         host=st.secrets["mysql"]["host"],
         port=st.secrets["mysql"]["port"],
         user=st.secrets["mysql"]["user"],
@@ -21,25 +25,63 @@ def load_data():
         database=st.secrets["mysql"]["database"],
         auth_plugin='mysql_native_password'
     )
-    
-    query = """
-    SELECT
-        msu.shop_id,
-        s.service_name,
-        snap.snapshot_date
-    FROM mall_service_usage msu
-    JOIN services s ON msu.service_id = s.service_id
-    JOIN snapshots snap ON msu.snapshot_id = snap.snapshot_id
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
+
+def sync_mirror():
+    bar = st.progress(0.0, text="원격 DB에서 새 스냅샷을 받는 중...")
+    remote = connect_remote()
+    try:
+        result = usage_mirror.sync(remote, lambda fraction, message: bar.progress(fraction, text=message))
+    finally:
+        remote.close()
+        bar.empty()
+    return result
+
+@st.cache_data
+def load_data(synced_at):
+    # 로컬 미러 조회 (synced_at이 바뀌면 = 동기화 후에만 다시 읽음)
+    df = usage_mirror.load()
+    df['snapshot_date'] = pd.to_datetime(df['snapshot_date'])
     return df
 
-df = load_data()
+# --- 로컬 미러: 비어 있거나 버튼을 누르면 원격에서 새 스냅샷만 동기화 ---
+mirror = usage_mirror.status()
+with st.sidebar:
+    if st.button("원격 DB와 동기화", help="미러에 없는 스냅샷(과 마지막 스냅샷)만 받아옵니다.") or not mirror['snapshots']:
+        try:
+            synced = sync_mirror()
+            st.caption(f"새 스냅샷 {synced['new_snapshots']}개 · {synced['rows']:,}행 동기화")
+        except (mysql.connector.Error, KeyError, FileNotFoundError) as e:
+            st.warning(f"원격 DB 동기화 실패: {e}")
+        mirror = usage_mirror.status()
+    if mirror['snapshots']:
+        st.caption(f"로컬 미러: 스냅샷 {mirror['snapshots']}개 (최신 {mirror['last_snapshot']}) · "
+                   f"마지막 동기화 {pd.Timestamp(mirror['synced_at'], unit='s', tz='Asia/Seoul'):%Y-%m-%d %H:%M}")
+if not mirror['snapshots']:
+    st.error("로컬 미러가 비어 있습니다. 원격 DB 접속 정보를 확인한 뒤 동기화하세요.")
+    st.stop()
+
+@st.cache_data
+def build_snapshot_sketches(synced_at):
+    # 스냅샷 × 서비스별 shop_id HLL 스케치 (동기화 시각 기준 캐시, 원본 행은 여기서 한 번만 읽음)
+    df = load_data(synced_at)
+    keys = df[['snapshot_date', 'service_name']].drop_duplicates().sort_values(['snapshot_date', 'service_name'])
+    keys = keys.reset_index(drop=True)
+    codes = pd.MultiIndex.from_frame(keys).get_indexer(pd.MultiIndex.from_frame(df[['snapshot_date', 'service_name']]))
+    registers = grouped_registers(df['shop_id'].to_numpy(), codes, len(keys))
+    return keys, registers
 
 # --- Data Preparation ---
-df['snapshot_date'] = pd.to_datetime(df['snapshot_date'])
-pivot = df.groupby(['snapshot_date', 'service_name'])['shop_id'].nunique().unstack(fill_value=0)
+df = load_data(mirror['synced_at'])
+
+use_sketch = st.sidebar.checkbox("근사 집계 (HyperLogLog)", value=False,
+                                 help="스냅샷별 스케치로 shop 수를 추정합니다. 스냅샷 이력이 길수록 빠릅니다.")
+if use_sketch:
+    sketch_keys, sketch_registers = build_snapshot_sketches(mirror['synced_at'])
+    pivot = (sketch_keys.assign(shops=np.round(estimate(sketch_registers)).astype(int))
+             .set_index(['snapshot_date', 'service_name'])['shops'].unstack(fill_value=0))
+    st.sidebar.caption(f"상대 표준오차 ±{relative_error() * 100:.1f}% (95% 구간 ±{relative_error() * 200:.1f}%)")
+else:
+    pivot = df.groupby(['snapshot_date', 'service_name'])['shop_id'].nunique().unstack(fill_value=0)
 
 # Calculate percentage for each snapshot (row normalized to 100%)
 pivot_pct = pivot.div(pivot.sum(axis=1), axis=0) * 100
@@ -49,28 +91,25 @@ avg_proportions = pivot_pct.mean(axis=0)
 sorted_services = avg_proportions.sort_values(ascending=False).index.tolist()
 pivot_pct = pivot_pct[sorted_services]
 
-# --- Stacked Bar Chart: Weekly Service Usage Distribution (100% Stacked) ---
+# --- 100% Stacked: 스냅샷별 서비스 비중 (행 단위로 솎아낸 스냅샷만 브라우저로 전송, 스택이 맞도록 전 서비스 공통 행) ---
 st.subheader("Weekly Service Usage Distribution (100% Stacked)")
-fig_stacked, ax_stacked = plt.subplots(figsize=(10, 6))
-bottom = np.zeros(len(pivot_pct))
-for service in pivot_pct.columns:
-    ax_stacked.bar(pivot_pct.index, pivot_pct[service], bottom=bottom, label=service)
-    bottom += pivot_pct[service].values
-
-ax_stacked.set_title("Weekly Active Shops Distribution by Service (Normalized to 100%)")
-ax_stacked.set_xlabel("Snapshot Date")
-ax_stacked.set_ylabel("Percentage (%)")
-ax_stacked.yaxis.set_major_formatter(plt.matplotlib.ticker.PercentFormatter(decimals=0))
-
-min_date = pivot_pct.index.min()
-max_date = pivot_pct.index.max()
-ax_stacked.set_xlim([min_date, max_date])
-ax_stacked.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-ax_stacked.xaxis.set_major_locator(mdates.DayLocator(interval=7))
-plt.xticks(rotation=45)
-
-ax_stacked.legend(title="Service", bbox_to_anchor=(1.05, 1), loc='upper left')
-st.pyplot(fig_stacked)
+share_rows = np.unique(np.linspace(0, len(pivot_pct) - 1, min(len(pivot_pct), MAX_CHART_POINTS)).astype(int))
+share = (pivot_pct.iloc[share_rows].rename_axis(index='snapshot_date', columns='service')
+         .stack().rename('share').reset_index())
+share['service_order'] = share['service'].map({s: i for i, s in enumerate(sorted_services)})
+share_chart = (
+    alt.Chart(share)
+    .mark_area()
+    .encode(
+        x=alt.X('snapshot_date:T', title='Snapshot Date'),
+        y=alt.Y('share:Q', stack='normalize', title='Percentage (%)', axis=alt.Axis(format='%')),
+        color=alt.Color('service:N', title='Service', sort=sorted_services),
+        order=alt.Order('service_order:Q'),
+        tooltip=[alt.Tooltip('snapshot_date:T'), 'service:N', alt.Tooltip('share:Q', format='.1f')]
+    )
+    .properties(title="Weekly Active Shops Distribution by Service (Normalized to 100%)", height=360)
+)
+st.altair_chart(share_chart, use_container_width=True)
 
 # --- 2. (기존 Snapshot Comparison Bar Chart: 그대로 유지) ---
 st.subheader("Snapshot Comparison")
@@ -106,3 +145,158 @@ ax2.set_title("Service Usage Comparison Across Snapshots")
 ax2.legend()
 ax2.grid(True)
 st.pyplot(fig2)
+
+# --- 2-1. 서비스별 추이 (집계·다운샘플된 시계열만 브라우저로 전송) ---
+st.subheader("Active Shops Trend by Service")
+trend_frame = pivot[sorted_services].reset_index()
+st.altair_chart(
+    trend_chart(downsample(trend_frame, 'snapshot_date', sorted_services), 'snapshot_date', "Active Shops per Snapshot"),
+    use_container_width=True
+)
+
+# --- 3. 주/월 단위 롤업 ---
+st.subheader("Weekly / Monthly Active Shops")
+rollup_freq = st.radio("집계 단위", ["주", "월"], horizontal=True)
+period_freq = 'W' if rollup_freq == "주" else 'M'
+if use_sketch:
+    # 스냅샷 스케치를 기간 단위로 병합 (원본 행 재스캔 없음)
+    periods = sketch_keys['snapshot_date'].dt.to_period(period_freq).dt.start_time
+    rollup_keys = pd.DataFrame({'period': periods, 'service_name': sketch_keys['service_name']})
+    rollup_index = rollup_keys.drop_duplicates().reset_index(drop=True)
+    rollup_codes = pd.MultiIndex.from_frame(rollup_index).get_indexer(pd.MultiIndex.from_frame(rollup_keys))
+    rolled = merge_registers(sketch_registers, rollup_codes, len(rollup_index))
+    rollup = (rollup_index.assign(shops=np.round(estimate(rolled)).astype(int))
+              .set_index(['period', 'service_name'])['shops'].unstack(fill_value=0))
+    st.caption(f"HLL 추정치 — 상대 표준오차 ±{relative_error() * 100:.1f}%")
+else:
+    rollup = (df.assign(period=df['snapshot_date'].dt.to_period(period_freq).dt.start_time)
+              .groupby(['period', 'service_name'])['shop_id'].nunique().unstack(fill_value=0))
+rollup.index = rollup.index.strftime('%Y-%m-%d')
+st.dataframe(rollup[[c for c in sorted_services if c in rollup.columns]])
+
+# --- 4. 스냅샷 간 이동 흐름 (Churn & Migration) ---
+st.subheader("Shop Migration Between Snapshots")
+
+@st.cache_data
+def load_transitions(synced_at):
+    return service_transitions(load_data(synced_at))
+
+flows = load_transitions(mirror['synced_at'])
+snapshot_dates = sorted(df['snapshot_date'].dt.date.unique())
+if len(snapshot_dates) < 2:
+    st.caption("스냅샷이 2개 이상일 때 이동 흐름을 표시합니다.")
+else:
+    flow_start, flow_end = st.select_slider(
+        "분석 구간 (스냅샷)", options=snapshot_dates,
+        value=(snapshot_dates[-2], snapshot_dates[-1])
+    )
+    in_range = flows[(flows['from_snapshot'].dt.date >= flow_start) & (flows['to_snapshot'].dt.date <= flow_end)]
+    matrix = transition_matrix(in_range)
+    moved = int(in_range[(in_range['from_service'] != NEW_LABEL) & (in_range['to_service'] != DROP_LABEL)].shape[0])
+    m1, m2, m3 = st.columns(3)
+    m1.metric("서비스 이동", f"{moved:,}")
+    m2.metric("신규 도입", f"{int((in_range['from_service'] == NEW_LABEL).sum()):,}")
+    m3.metric("이용 중단", f"{int((in_range['to_service'] == DROP_LABEL).sum()):,}")
+
+    heat = matrix.stack().rename('shops').reset_index()
+    heat_chart = (
+        alt.Chart(heat)
+        .mark_rect()
+        .encode(
+            x=alt.X('to_service:N', title='To'),
+            y=alt.Y('from_service:N', title='From'),
+            color=alt.Color('shops:Q', scale=alt.Scale(scheme='blues'), title='Shops'),
+            tooltip=['from_service', 'to_service', 'shops']
+        )
+    )
+    heat_text = heat_chart.mark_text(fontSize=11).encode(
+        text='shops:Q',
+        color=alt.value('black')
+    )
+    st.altair_chart(heat_chart + heat_text, use_container_width=True)
+    st.dataframe(matrix)
+
+    # 스냅샷별 신규 도입 / 이용 중단 추이
+    churn = (flows.assign(kind=np.where(flows['from_service'] == NEW_LABEL, 'New adopters',
+                                        np.where(flows['to_service'] == DROP_LABEL, 'Drop-offs', 'Migrations')))
+             .groupby(['to_snapshot', 'kind']).size().rename('shops').reset_index())
+    churn_chart = (
+        alt.Chart(churn)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X('to_snapshot:T', title='Snapshot Date'),
+            y=alt.Y('shops:Q', title='Shops'),
+            color=alt.Color('kind:N', title=None)
+        )
+    )
+    st.altair_chart(churn_chart, use_container_width=True)
+
+# --- 5. 서비스 동시 사용 (Co-usage) ---
+st.subheader("Service Co-usage")
+
+@st.cache_data
+def load_co_usage(synced_at):
+    # (스냅샷, shop)별 서비스 집합을 비트셋으로 한 번 만들고, 모든 스냅샷 × 서비스 쌍을 비트 연산으로 집계
+    bitsets = service_bitsets(load_data(synced_at))
+    return bitsets, co_usage(bitsets)
+
+bitsets, co = load_co_usage(mirror['synced_at'])
+co_services = list(bitsets['services'])
+co_dates = [d.date() for d in pd.DatetimeIndex(bitsets['snapshots'])]
+co_date = st.select_slider("스냅샷", options=co_dates, value=co_dates[-1], key="co_snapshot")
+t = co_dates.index(co_date)
+pairs = pd.DataFrame(co['pairs'][t], index=co_services, columns=co_services)
+users = pd.Series(np.diag(co['pairs'][t]), index=co_services)
+
+n_active = int((bitsets['snapshot'] == t).sum())
+c1, c2 = st.columns(2)
+c1.metric("서비스 사용 shop", f"{n_active:,}")
+c2.metric("2개 이상 병행", f"{int(co['multi'][t]):,}",
+          f"{co['multi'][t] / n_active * 100:.1f}%" if n_active else None, delta_color="off")
+
+co_order = [s for s in sorted_services if s in pairs.index]
+co_heat = (pairs.loc[co_order, co_order].rename_axis(index='service_a', columns='service_b')
+           .stack().rename('shops').reset_index())
+co_chart = (
+    alt.Chart(co_heat)
+    .mark_rect()
+    .encode(
+        x=alt.X('service_b:N', title=None, sort=co_order),
+        y=alt.Y('service_a:N', title=None, sort=co_order),
+        color=alt.Color('shops:Q', scale=alt.Scale(scheme='oranges'), title='Shops'),
+        tooltip=['service_a', 'service_b', 'shops']
+    )
+)
+st.altair_chart(co_chart, use_container_width=True)
+st.caption("대각선은 서비스별 사용 shop 수, 나머지 칸은 두 서비스를 함께 쓰는 shop 수입니다.")
+
+exclusive = pd.Series(co['exclusive'][t], index=co_services)
+st.dataframe(pd.DataFrame({
+    '사용 shop': users,
+    '단독 사용': exclusive,
+    '병행 사용': users - exclusive,
+    '병행 비율(%)': ((users - exclusive) / users.where(users > 0) * 100).round(1),
+}).loc[co_order])
+
+# 영업 타깃: X는 쓰지만 Y는 쓰지 않는 shop
+st.markdown("**타깃 목록: X 사용 · Y 미사용**")
+t1, t2 = st.columns(2)
+uses = t1.selectbox("사용 중 (X)", co_order, key="co_uses")
+not_uses = t2.selectbox("미사용 (Y)", ["(없음)"] + [s for s in co_order if s != uses], key="co_not_uses")
+uses_code = co_services.index(uses)
+not_uses_code = co_services.index(not_uses) if not_uses != "(없음)" else None
+targets = pd.DataFrame({'shop_id': target_shops(bitsets, t, uses_code, not_uses_code)})
+st.caption(f"{co_date} 기준 {len(targets):,}개 shop")
+st.dataframe(targets, hide_index=True, height=240)
+download_buttons("타깃 목록", targets, f"targets_{uses}_{not_uses}_{co_date}", key="co_targets")
+
+# 선택한 두 서비스의 스냅샷별 병행·이탈 후보 추이
+if not_uses_code is not None:
+    pair_trend = pd.DataFrame({
+        'snapshot_date': pd.DatetimeIndex(bitsets['snapshots']),
+        f'{uses} + {not_uses}': co['pairs'][:, uses_code, not_uses_code],
+        f'{uses} only (no {not_uses})': co['pairs'][:, uses_code, uses_code] - co['pairs'][:, uses_code, not_uses_code],
+    })
+    st.altair_chart(trend_chart(downsample(pair_trend, 'snapshot_date', list(pair_trend.columns[1:])),
+                                'snapshot_date', "Shops per Snapshot"),
+                    use_container_width=True)
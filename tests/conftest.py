@@ -0,0 +1,5 @@
+import os
+import sys
+
+# pages와 같이 저장소 루트 기준으로 utils를 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
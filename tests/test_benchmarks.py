@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from utils import benchmarks
+
+FALLBACKS = {"aov_lift": 34.0, "items_lift": 0.7}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "benchmarks.sqlite3")
+
+
+def _fill(store, n=6, segment="패션"):
+    for i in range(n):
+        benchmarks.record(f"shop{i}", "2025-01-01", "2025-01-31", {"aov_lift": 10.0 * i, "items_lift": i},
+                          segment, path=store)
+
+
+def test_benchmark_is_mean_over_shops(store):
+    _fill(store)
+    stat = benchmarks.benchmarks(FALLBACKS, "패션", path=store)["aov_lift"]
+    values = np.arange(6) * 10.0
+    assert stat["source"] == "패션" and stat["n"] == 6
+    assert stat["value"] == pytest.approx(values.mean())
+    assert stat["std"] == pytest.approx(values.std(ddof=1))
+
+
+def test_rerecording_a_shop_replaces_its_report(store):
+    _fill(store)
+    for end in ("2025-02-28", "2025-03-31", "2025-04-30"):
+        benchmarks.record("shop5", "2025-01-01", end, {"aov_lift": 100.0}, "뷰티", path=store)
+    stat = benchmarks.benchmarks(FALLBACKS, path=store)["aov_lift"]
+    assert stat["n"] == 6
+    assert stat["value"] == pytest.approx(np.mean([0, 10, 20, 30, 40, 100]))
+    assert benchmarks.recorded("shop5", path=store)["segment"] == "뷰티"
+    assert benchmarks.segments(path=store) == ["뷰티", "패션"]
+
+
+def test_current_shop_is_excluded(store):
+    _fill(store)
+    stat = benchmarks.benchmarks(FALLBACKS, exclude_shop="shop5", path=store)["aov_lift"]
+    assert stat["n"] == 5
+    assert stat["value"] == pytest.approx(20.0)
+
+
+def test_falls_back_to_all_then_default(store):
+    _fill(store, n=5)
+    stats = benchmarks.benchmarks(FALLBACKS, "뷰티", path=store)
+    assert stats["aov_lift"]["source"] == benchmarks.ALL_SEGMENT
+    stats = benchmarks.benchmarks(FALLBACKS, "뷰티", exclude_shop="shop0", path=store)
+    assert stats["aov_lift"] == {"value": 34.0, "n": 0, "std": None, "source": "기본값", "digest": None,
+                                    "excluded": None}
+
+
+def test_percentile_tracks_exact_rank(store):
+    rng = np.random.default_rng(0)
+    values = rng.normal(30, 10, 200)
+    for i, v in enumerate(values):
+        benchmarks.record(f"s{i}", "2025-01-01", "2025-01-31", {"aov_lift": v}, path=store)
+    stat = benchmarks.benchmarks(FALLBACKS, path=store)["aov_lift"]
+    for q in (10, 50, 90):
+        x = np.percentile(values, q)
+        assert benchmarks.percentile(stat, x) == pytest.approx((values <= x).mean() * 100, abs=2)
+
+
+
+def test_running_aggregates_match_rows_after_replacements(store):
+    rng = np.random.default_rng(1)
+    latest = {}
+    for _ in range(300):
+        shop, segment = f"s{rng.integers(40)}", rng.choice(["패션", "뷰티", None])
+        latest[shop] = (segment, float(rng.normal(30, 10)))
+        benchmarks.record(shop, "2025-01-01", "2025-01-31", {"aov_lift": latest[shop][1]}, segment, path=store)
+    for segment in ("패션", None):
+        values = np.array([v for s, v in latest.values() if segment is None or s == segment])
+        stat = benchmarks.benchmarks(FALLBACKS, segment, path=store)["aov_lift"]
+        assert stat["n"] == len(values)
+        assert stat["value"] == pytest.approx(values.mean())
+        assert stat["std"] == pytest.approx(values.std(ddof=1))
+        assert stat["digest"].count == len(values)
+
+
+def test_percentile_excludes_current_shop(store):
+    _fill(store, n=6)
+    stat = benchmarks.benchmarks(FALLBACKS, exclude_shop="shop5", path=store)["aov_lift"]
+    assert benchmarks.percentile(stat, 50.0) == pytest.approx(100.0)
+    assert benchmarks.percentile(stat, 0.0) == pytest.approx(20.0, abs=10)
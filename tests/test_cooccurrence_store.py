@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import cooccurrence_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "cooccurrence.sqlite3")
+
+
+def _lines(order_ids):
+    return pd.DataFrame({
+        "주문번호": order_ids,
+        "상품명": ["A", "B", "A", "C"],
+        "일반/업셀 구분": ["일반 상품", "업셀 상품", "일반 상품", "업셀 상품"],
+    })
+
+
+def test_reingest_skips_seen_orders(store):
+    first = cooccurrence_store.ingest("shop", _lines([1, 1, 2, 2]), path=store)
+    again = cooccurrence_store.ingest("shop", _lines([1, 1, 2, 2]), path=store)
+    assert first["new_orders"] == 2 and again == {"new_orders": 0, "skipped_orders": 2, "total_orders": 2}
+    counts = cooccurrence_store.load_counts("shop", path=store)
+    assert counts[1] == {("A", "B"): 1, ("A", "C"): 1}
+
+
+def test_float_order_ids_match_int_ids(store):
+    # 빈 주문번호가 섞여 실수로 읽힌 열("1.0")도 정수 열과 같은 주문으로 판별
+    cooccurrence_store.ingest("shop", _lines([1.0, 1.0, 2.0, np.nan]), path=store)
+    stats = cooccurrence_store.ingest("shop", _lines([1, 1, 2, 2]), path=store)
+    assert stats == {"new_orders": 0, "skipped_orders": 2, "total_orders": 2}
+    assert cooccurrence_store.order_keys(pd.Series([12.0, np.nan, 1.5])).tolist()[::2] == ["12", "1.5"]
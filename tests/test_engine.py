@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from utils import engine, upload_cache
+
+pytestmark = pytest.mark.skipif(engine.duckdb is None, reason="duckdb 미설치")
+
+
+@pytest.fixture
+def upload_key(tmp_path, monkeypatch):
+    """한국식 금액 표기·취소 주문·비회원이 섞인 업로드를 임시 캐시에 저장하고 키 반환."""
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path))
+    rng = np.random.default_rng(0)
+    n_orders = 2_000
+    n_lines = rng.integers(1, 5, n_orders)
+    order = np.repeat(np.arange(n_orders), n_lines)
+    total = np.repeat(rng.integers(0, 30, n_orders) * 10_000, n_lines)
+    buyer = np.repeat(np.where(rng.random(n_orders) < 0.6, [f"user{i % 300}" for i in range(n_orders)], ""), n_lines)
+    product = rng.integers(0, 40, len(order))
+    lines = pd.DataFrame({
+        "주문번호": [f"O{i:06d}" for i in order],
+        "주문자 아이디": buyer,
+        "총 주문 금액": [f"{v:,}원" for v in total],
+        "일반/업셀 구분": np.where(rng.random(len(order)) < 0.2, "업셀 상품", "일반 상품"),
+        "상품 코드": [f"P{i}" for i in product],
+        "상품명": [f"상품{i}" for i in product],
+        "구매 수량": rng.integers(1, 4, len(order)),
+        "상품 단가": product * 1_000 + rng.integers(0, 2, len(order)) * 500,
+    })
+    upload_cache.store_csv(lines.to_csv(index=False).encode("utf-8"), "parity")
+    return "parity"
+
+
+def test_order_summary_parity(upload_key):
+    expected = engine.PandasEngine().order_summary(upload_key)
+    actual = engine.DuckDBEngine().order_summary(upload_key)
+    assert actual.keys() == expected.keys()
+    for name in ("total_revenue", "avg_order_value", "n_orders"):
+        assert actual[name] == pytest.approx(expected[name])
+    for name in ("member_counts", "order_counts", "upsell_order_counts", "item_count_distribution"):
+        pdt.assert_series_equal(actual[name].sort_index(), expected[name].sort_index(),
+                                check_dtype=False, check_names=False, check_index_type=False)
+    pdt.assert_frame_equal(actual["order_items"].reset_index(drop=True), expected["order_items"], check_dtype=False)
+    assert actual["segment_digests"].keys() == expected["segment_digests"].keys()
+    for segment, digest in expected["segment_digests"].items():
+        assert actual["segment_digests"][segment].count == digest.count
+        assert actual["segment_digests"][segment].quantile(0.5) == pytest.approx(digest.quantile(0.5))
+
+
+@pytest.mark.parametrize("kind", [None, "업셀 상품"])
+def test_product_summary_parity(upload_key, kind):
+    expected = engine.PandasEngine().product_summary(upload_key, kind)
+    actual = engine.DuckDBEngine().product_summary(upload_key, kind)
+    pdt.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_pair_counts_parity(upload_key):
+    assert engine.DuckDBEngine().pair_counts(upload_key) == engine.PandasEngine().pair_counts(upload_key)
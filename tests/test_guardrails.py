@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from utils import guardrails, upload_cache
+
+MAPPING = {"주문번호": "주문번호", "총 주문 금액": "총 주문 금액"}
+
+
+def _csv(n_orders: int, lines_per_order: int = 2) -> bytes:
+    order = np.repeat(np.arange(n_orders), lines_per_order)
+    return pd.DataFrame({
+        "주문번호": [f"O{i:07d}" for i in order],
+        "총 주문 금액": [f"{(i % 50) * 1_000:,}원" for i in order],
+        "메모": "x" * 20,     # 매핑되지 않은 컬럼은 추정에서 빠짐
+    }).to_csv(index=False).encode("utf-8")
+
+
+def test_estimate_small_upload_is_exact():
+    raw = _csv(500)
+    plan = guardrails.estimate(io.BytesIO(raw), MAPPING)
+    frame = pd.read_csv(io.BytesIO(raw), usecols=list(MAPPING))
+    assert plan["bytes"] == len(raw) and plan["rows"] == 1_000
+    assert plan["memory"] == frame.memory_usage(deep=True, index=False).sum() * guardrails.PEAK_FACTOR
+    assert plan["rate"] == 1.0
+
+
+def test_estimate_extrapolates_rows_past_sample(monkeypatch):
+    monkeypatch.setattr(guardrails, "SAMPLE_BYTES", 4_096)
+    plan = guardrails.estimate(io.BytesIO(_csv(5_000)), MAPPING)
+    assert plan["rows"] == pytest.approx(10_000, rel=0.05)
+
+
+def test_sampling_rate_fits_memory_limit(monkeypatch):
+    raw = _csv(500)
+    memory = guardrails.estimate(io.BytesIO(raw), MAPPING)["memory"]
+    monkeypatch.setattr(guardrails, "ANALYSIS_MEMORY_MAX", memory // 4)
+    assert guardrails.estimate(io.BytesIO(raw), MAPPING)["rate"] == round(memory // 4 / memory, 3)
+    monkeypatch.setattr(guardrails, "ANALYSIS_MEMORY_MAX", 1)
+    assert guardrails.estimate(io.BytesIO(raw), MAPPING)["rate"] == guardrails.MIN_SAMPLE_RATE
+
+
+def test_sampled_store_keeps_whole_orders(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(upload_cache, "SAMPLE_CHUNK_ROWS", 1_000)
+    path = upload_cache.store_sampled_csv(_csv(5_000), "sample", MAPPING, "주문번호", 0.2)
+    orders = pa.ipc.open_file(path).read_all().to_pandas()["주문번호"]
+    assert orders.value_counts().eq(2).all()            # 주문의 줄은 함께 남음
+    assert orders.nunique() == pytest.approx(1_000, rel=0.15)
+    assert [p.name for p in tmp_path.iterdir()] == ["sample.arrow"]
+
+
+def test_sampled_store_header_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path))
+    path = upload_cache.store_sampled_csv(_csv(0), "empty", MAPPING, "주문번호", 0.5)
+    table = pa.ipc.open_file(path).read_all()
+    assert table.num_rows == 0 and table.column_names == ["주문번호", "총 주문 금액"]
+
+
+def test_sampled_store_removes_temp_file_on_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path))
+    with pytest.raises(KeyError):
+        upload_cache.store_sampled_csv(_csv(10), "broken", MAPPING, "없는 컬럼", 0.5)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_admit_releases_slot_after_error(monkeypatch):
+    monkeypatch.setattr(guardrails, "MAX_HEAVY", 1)
+    guardrails._slots.clear()
+    heavy = {"memory": guardrails.HEAVY_MIN_BYTES}
+    with pytest.raises(RuntimeError):
+        with guardrails.admit(heavy):
+            assert not guardrails._slots()["semaphore"].acquire(blocking=False)    # 슬롯 1개가 사용 중
+            raise RuntimeError
+    with guardrails.admit(heavy):
+        pass
+    assert guardrails._slots()["semaphore"].acquire(blocking=False)
+    guardrails._slots.clear()
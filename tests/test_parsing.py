@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from utils.parsing import detect_date_format, parse_amounts, parse_dates
+
+
+def test_korean_amounts():
+    values = pd.Series(["12,000원", "₩1,200", "3000 KRW", " 45,500 ", "", None, "무료", "-1,000원"], name="금액")
+    report = {}
+    parsed = parse_amounts(values, report)
+    expected = [12000, 1200, 3000, 45500, np.nan, np.nan, np.nan, -1000]
+    assert np.allclose(parsed.to_numpy(), expected, equal_nan=True)
+    assert report["금액"]["format"] == "korean"
+    assert report["금액"]["rejected"] == 1 and report["금액"]["examples"] == ["무료"]
+
+
+def test_plain_and_numeric_amounts_pass_through():
+    numeric = pd.Series([1000, 2500], name="금액")
+    assert parse_amounts(numeric) is numeric
+    report = {}
+    parsed = parse_amounts(pd.Series(["1000", "2500.5", "1e3"], name="금액"), report)
+    assert parsed.tolist() == [1000.0, 2500.5, 1000.0]
+    assert report["금액"] == {"format": "plain", "rejected": 0, "examples": []}
+
+
+def test_dotted_dates_use_detected_format():
+    values = pd.Series(["2025.08.21 14:03", "2025.08.22 09:00", "2025.12.01 00:10"], name="주문일")
+    report = {}
+    parsed = parse_dates(values, report)
+    assert parsed.tolist() == pd.to_datetime(["2025-08-21 14:03", "2025-08-22 09:00", "2025-12-01 00:10"]).tolist()
+    assert report["주문일"]["format"] == "%Y.%m.%d %H:%M"
+
+
+def test_meridiem_dates():
+    values = pd.Series(["2025-08-21 오후 2:03:00", "2025-08-21 오전 12:30:00", "2025-08-21 오후 12:05:00"])
+    parsed = parse_dates(values)
+    assert parsed.tolist() == pd.to_datetime(["2025-08-21 14:03", "2025-08-21 00:30", "2025-08-21 12:05"]).tolist()
+
+
+def test_mismatched_rows_retry_then_reject():
+    values = pd.Series(["2025-08-21 14:03:00"] * 5 + ["2025/08/22", "어제", ""], name="주문일")
+    report = {}
+    parsed = parse_dates(values, report)
+    assert parsed.iloc[5] == pd.Timestamp("2025-08-22")       # 판별 형식과 다른 행은 범용 변환으로 재시도
+    assert parsed.iloc[6:].isna().all()
+    assert report["주문일"]["rejected"] == 1 and report["주문일"]["examples"] == ["어제"]
+
+
+def test_detect_date_format_prefers_korean_style():
+    text = pd.Series(["2025년 08월 21일", "2025년 12월 01일"])
+    assert detect_date_format(text) == "%Y년 %m월 %d일"
+    assert detect_date_format(pd.Series(["", None])) is None
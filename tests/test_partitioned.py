@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from utils import order_metrics, upsell_report
+from utils.partitioned import hash_partitions
+
+COLS = {
+    "order_id": "주문번호", "order_total": "총 주문 금액", "buyer_id": "주문자 아이디",
+    "upsell_flag": "일반/업셀 구분", "upsell_value": "업셀 상품", "order_date": "주문일",
+    "line_price": "상품 단가", "line_qty": "구매 수량", "line_amount": "상품 구매 금액",
+    "product_code": "상품 코드", "product_name": "상품명",
+}
+N_PARTITIONS = 4
+
+
+def _lines(n_orders=3_000, seed=0):
+    """주문당 1~4개 라인, 주문 금액은 주문 안에서 같고 일부는 취소(0원)·한국식 금액 표기."""
+    rng = np.random.default_rng(seed)
+    n_lines = rng.integers(1, 5, n_orders)
+    order = np.repeat(np.arange(n_orders), n_lines)
+    total = np.repeat(rng.integers(0, 30, n_orders) * 10_000, n_lines)
+    day = np.repeat(pd.Timestamp("2025-05-01") + pd.to_timedelta(rng.integers(0, 90, n_orders), "D"), n_lines)
+    buyer = np.repeat(np.where(rng.random(n_orders) < 0.6, [f"user{i % 400}" for i in range(n_orders)], None),
+                      n_lines)
+    return pd.DataFrame({
+        "주문번호": [f"O{i:06d}" for i in order],
+        "주문일": (day + pd.to_timedelta(rng.integers(0, 86_400, len(order)), "s")).strftime("%Y.%m.%d %H:%M:%S"),
+        "주문자 아이디": buyer,
+        "총 주문 금액": [f"{v:,}원" for v in total],
+        "일반/업셀 구분": np.where(rng.random(len(order)) < 0.2, "업셀 상품", "일반 상품"),
+        "상품 단가": rng.integers(1, 10, len(order)) * 5_000,
+        "구매 수량": rng.integers(1, 3, len(order)),
+    })
+
+
+def _partitions(lines):
+    parts = hash_partitions(lines["주문번호"], N_PARTITIONS)
+    return [lines[parts == part] for part in range(N_PARTITIONS)]
+
+
+def test_hash_partitions_keep_orders_together():
+    lines = _lines()
+    parts = hash_partitions(lines["주문번호"], N_PARTITIONS)
+    assert (pd.Series(parts).groupby(lines["주문번호"].to_numpy()).nunique() == 1).all()
+    assert set(parts) == set(range(N_PARTITIONS))
+    # 숫자로 읽힌 주문번호도 문자열과 같은 파티션
+    assert np.array_equal(hash_partitions(pd.Series([1, 22, 333]), 8), hash_partitions(pd.Series(["1", "22", "333"]), 8))
+
+
+def test_order_summary_partitions_merge_to_single_pass():
+    lines = _lines()
+    single = order_metrics.order_summary(order_metrics.clean_orders(lines))
+    merged = order_metrics.merge_order_partials(
+        [order_metrics.summarize_partition(part) for part in _partitions(lines)])
+
+    for name in ("total_revenue", "avg_order_value", "n_orders"):
+        assert merged[name] == pytest.approx(single[name])
+    for name in ("member_counts", "order_counts", "upsell_order_counts", "item_count_distribution"):
+        pdt.assert_series_equal(merged[name], single[name])
+    pdt.assert_frame_equal(merged["order_items"], single["order_items"])
+    assert merged["segment_digests"].keys() == single["segment_digests"].keys()
+    for segment, digest in single["segment_digests"].items():
+        assert merged["segment_digests"][segment].count == digest.count
+        assert merged["segment_digests"][segment].quantile(0.5) == pytest.approx(digest.quantile(0.5), rel=0.05)
+
+    # 정확한 pandas 집계와 비교
+    amounts = lines["총 주문 금액"].str.replace(r"[,원]", "", regex=True).astype(float)
+    orders = lines.assign(amount=amounts)[amounts > 0].drop_duplicates("주문번호")
+    assert merged["n_orders"] == len(orders)
+    assert merged["total_revenue"] == orders["amount"].sum()
+    assert merged["member_counts"]["Member"] == orders["주문자 아이디"].notna().sum()
+
+
+def test_upsell_summary_partitions_merge_to_single_pass():
+    lines = _lines(seed=1)
+    single = upsell_report.summarize_orders(upsell_report.prepare_orders(lines, COLS), COLS)
+    merged = upsell_report.merge_summaries(
+        [upsell_report.summarize_partition(part, COLS) for part in _partitions(lines)])
+
+    for name, value in single.items():
+        if name == "daily_digests":
+            continue
+        if isinstance(value, pd.Series):
+            pdt.assert_series_equal(merged[name], value)
+        elif isinstance(value, pd.Index):
+            pdt.assert_index_equal(merged[name], value)
+        else:
+            assert merged[name] == pytest.approx(value), name
+    assert merged["daily_digests"].keys() == single["daily_digests"].keys()
+    for key, digest in single["daily_digests"].items():
+        assert merged["daily_digests"][key].count == digest.count
+
+    # 정확한 pandas 집계와 비교
+    df = upsell_report.prepare_orders(lines, COLS)
+    is_upsell = df.groupby("주문번호")["일반/업셀 구분"].apply(lambda s: (s == "업셀 상품").any())
+    assert merged["orders_cnt"] == df["주문번호"].nunique()
+    assert merged["upsell_orders_cnt"] == is_upsell.sum()
+    assert merged["upsell_together_amount"] == pytest.approx(
+        (df["상품 단가"] * df["구매 수량"])[df["일반/업셀 구분"] == "업셀 상품"].sum())
+
+
+def test_recent_window_matches_exact_month():
+    lines = _lines(seed=2)
+    summary = upsell_report.merge_summaries(
+        [upsell_report.summarize_partition(part, COLS) for part in _partitions(lines)])
+    recent = upsell_report.recent_window(summary, days=30)
+
+    df = upsell_report.prepare_orders(lines, COLS)
+    order_day = df.groupby("주문번호")["주문일"].max().dt.normalize()
+    cutoff = order_day.max() - pd.Timedelta(days=29)
+    in_window = order_day[order_day >= cutoff].index
+    orders = df.drop_duplicates("주문번호").set_index("주문번호").loc[in_window]
+    assert recent["start"] == cutoff and recent["end"] == order_day.max()
+    assert recent["orders"] == len(in_window)
+    bins = ((orders["총 주문 금액"] // 10_000) * 10_000).clip(upper=200_000).value_counts()
+    assert recent["price_bins"][recent["price_bins"] > 0].to_dict() == bins.to_dict()
+    items = df.groupby("주문번호").size().loc[in_window].value_counts()
+    assert recent["items"].to_dict() == items.to_dict()
+    assert recent["digests"]["전체주문"].count == len(in_window)
+    assert recent["digests"]["전체주문"].quantile(0.5) == pytest.approx(orders["총 주문 금액"].median(), rel=0.05)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from utils.segments import order_segments, threshold_grid
+
+
+def _orders(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(1, 8, n).astype(float)
+    values[rng.random(n) < 0.1] = np.nan         # 변환 실패 주문
+    membership = pd.DataFrame({
+        "전체": np.ones(n, dtype=bool),
+        "회원": rng.random(n) < 0.6,
+        "업셀 주문": rng.random(n) < 0.3,
+    })
+    return values, rng.random(n) < 0.5, membership
+
+
+def test_threshold_grid_matches_per_segment_mean():
+    values, is_after, membership = _orders()
+    thresholds = [2, 3, 5]
+    grid = threshold_grid(values, is_after, membership, thresholds).set_index(["세그먼트", "임계값"])
+    for segment in membership.columns:
+        for t in thresholds:
+            row = grid.loc[(segment, float(t))]
+            for period, column in ((False, "이전 비중"), (True, "이후 비중")):
+                x = pd.Series(values[membership[segment].to_numpy() & (is_after == period)])
+                assert np.isclose(row[column], (x >= t).mean())
+            assert row["이전 주문 수"] == (membership[segment] & ~is_after).sum()
+
+
+def test_threshold_grid_counts_nan_below_every_threshold():
+    grid = threshold_grid([np.nan, np.nan, 10.0, 1.0], [False, False, False, False],
+                          pd.DataFrame({"전체": [True] * 4}), [5])
+    assert grid.loc[0, "이전 비중"] == 0.25
+
+
+def test_order_segments_membership():
+    lines = pd.DataFrame({
+        "주문번호": ["a", "a", "b", "c"],
+        "주문자 아이디": ["u1", "u1", None, " "],
+        "일반/업셀 구분": ["일반 상품", "업셀 상품", "일반 상품", "일반 상품"],
+    })
+    seg = order_segments(lines, ["a", "b", "c"], top_products=0)
+    assert seg["회원"].tolist() == [True, False, False]
+    assert seg["업셀 주문"].tolist() == [True, False, False]
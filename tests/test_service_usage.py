@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.service_usage import (DROP_LABEL, NEW_LABEL, co_usage, service_bitsets, service_transitions,
+                                 target_shops, transition_matrix)
+
+
+def _usage(rows):
+    return pd.DataFrame(rows, columns=["snapshot_date", "shop_id", "service_name"]).assign(
+        snapshot_date=lambda d: pd.to_datetime(d["snapshot_date"]))
+
+
+def _flows(flows):
+    return sorted(zip(flows["shop_id"], flows["from_service"], flows["to_service"]))
+
+
+def test_single_migration_adoption_and_drop():
+    df = _usage([
+        ("2025-01-01", 1, "A"), ("2025-01-08", 1, "B"),            # A → B
+        ("2025-01-01", 2, "A"), ("2025-01-08", 2, "A"), ("2025-01-08", 2, "C"),   # 유지 + 도입
+        ("2025-01-01", 3, "C"),                                     # 중단
+    ])
+    assert _flows(service_transitions(df)) == sorted([(1, "A", "B"), (2, NEW_LABEL, "C"), (3, "C", DROP_LABEL)])
+
+
+def test_multi_drop_multi_add_pairs_one_to_one():
+    df = _usage([
+        ("2025-01-01", 1, "A"), ("2025-01-01", 1, "B"), ("2025-01-01", 1, "C"),
+        ("2025-01-08", 1, "D"), ("2025-01-08", 1, "E"),
+        ("2025-01-01", 2, "A"),
+        ("2025-01-08", 2, "B"), ("2025-01-08", 2, "C"), ("2025-01-08", 2, "D"),
+    ])
+    flows = service_transitions(df)
+    assert _flows(flows) == sorted([(1, "A", "D"), (1, "B", "E"), (1, "C", DROP_LABEL),
+                                    (2, "A", "B"), (2, NEW_LABEL, "C"), (2, NEW_LABEL, "D")])
+    # 이동은 shop당 min(중단 수, 도입 수)건, 중단·도입 건수는 실제 서비스 수와 같음
+    moved = flows[(flows["from_service"] != NEW_LABEL) & (flows["to_service"] != DROP_LABEL)]
+    assert moved.groupby("shop_id").size().to_dict() == {1: 2, 2: 1}
+    assert (flows["from_service"] != NEW_LABEL).sum() == 4     # 중단된 서비스 A, B, C + A
+    assert (flows["to_service"] != DROP_LABEL).sum() == 5      # 도입된 서비스 D, E + B, C, D
+    assert transition_matrix(flows).to_numpy().sum() == len(flows)
+
+
+def _random_usage(n_snap=6, n_shop=300, n_svc=70, seed=0):
+    rng = np.random.default_rng(seed)
+    snap = np.repeat(np.arange(n_snap), n_shop * 3)
+    shop = np.tile(np.repeat(np.arange(n_shop), 3), n_snap)
+    svc = rng.zipf(1.5, len(snap)) % n_svc
+    keep = rng.random(len(snap)) < 0.8
+    return _usage(list(zip(pd.Timestamp("2025-01-01") + pd.to_timedelta(snap[keep] * 7, "D"),
+                           shop[keep], [f"svc{i:02d}" for i in svc[keep]])))
+
+
+def test_co_usage_matches_set_counts():
+    df = _random_usage()
+    bitsets = service_bitsets(df)
+    co = co_usage(bitsets)
+    services = list(bitsets["services"])
+    sets = df.groupby(["snapshot_date", "shop_id"])["service_name"].agg(frozenset)
+    for t, snapshot in enumerate(bitsets["snapshots"]):
+        shops = sets.loc[snapshot]
+        for i, a in enumerate(services):
+            assert co["exclusive"][t, i] == sum(s == {a} for s in shops)
+            for j, b in enumerate(services):
+                assert co["pairs"][t, i, j] == sum(a in s and b in s for s in shops)
+        assert co["multi"][t] == sum(len(s) >= 2 for s in shops)
+
+
+@pytest.mark.parametrize("not_uses", [None, 65])
+def test_target_shops_matches_set_filter(not_uses):
+    df = _random_usage()
+    bitsets = service_bitsets(df)
+    services = list(bitsets["services"])
+    uses = services.index("svc01")
+    t = 3
+    shops = df[df["snapshot_date"] == bitsets["snapshots"][t]].groupby("shop_id")["service_name"].agg(set)
+    expected = {shop for shop, s in shops.items()
+                if "svc01" in s and (not_uses is None or services[not_uses] not in s)}
+    assert set(target_shops(bitsets, t, uses, not_uses)) == expected
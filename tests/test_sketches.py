@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from utils.sketches import HyperLogLog, TDigest, estimate, grouped_registers, merge_registers, relative_error
+
+
+@pytest.mark.parametrize("n", [10, 1_000, 50_000, 300_000])
+def test_hll_count_within_error_bound(n):
+    values = [f"order-{i}" for i in range(n)] * 2       # 중복은 세지 않음
+    sketch = HyperLogLog.from_values(values)
+    assert abs(sketch.count() - n) <= 4 * relative_error() * n + 1
+
+
+def test_hll_merge_equals_single_pass():
+    rng = np.random.default_rng(0)
+    a, b = rng.integers(0, 40_000, 30_000), rng.integers(20_000, 60_000, 30_000)
+    merged = HyperLogLog.from_values(a).merge(HyperLogLog.from_values(b))
+    assert np.array_equal(merged.registers, HyperLogLog.from_values(np.r_[a, b]).registers)
+
+
+def test_grouped_registers_merge_to_coarser_groups():
+    rng = np.random.default_rng(1)
+    values, days = rng.integers(0, 5_000, 20_000), rng.integers(0, 14, 20_000)
+    daily = grouped_registers(values, days, 14)
+    weekly = merge_registers(daily, np.arange(14) // 7, 2)
+    for week in range(2):
+        exact = len(np.unique(values[days // 7 == week]))
+        assert np.array_equal(weekly[week], HyperLogLog.from_values(values[days // 7 == week]).registers)
+        assert abs(estimate(weekly[week]) - exact) <= 4 * relative_error() * exact
+
+
+def test_tdigest_quantiles_close_to_exact():
+    rng = np.random.default_rng(2)
+    values = rng.lognormal(11, 0.6, 200_000)
+    digest = TDigest.from_values(values)
+    qs = np.array([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+    # 순위 오차: 추정 분위수의 실제 순위가 목표 순위에서 1%p 안
+    ranks = np.searchsorted(np.sort(values), digest.quantile(qs)) / len(values)
+    assert np.abs(ranks - qs).max() < 0.01
+    assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+    assert digest.count == len(values)
+
+
+def test_tdigest_merge_matches_single_digest():
+    rng = np.random.default_rng(3)
+    chunks = [rng.exponential(50_000, 30_000) for _ in range(5)]
+    merged = TDigest.from_values(chunks[0])
+    for chunk in chunks[1:]:
+        merged = merged.merge(TDigest.from_values(chunk))
+    values = np.sort(np.concatenate(chunks))
+    qs = np.linspace(0.01, 0.99, 25)
+    ranks = np.searchsorted(values, merged.quantile(qs)) / len(values)
+    assert np.abs(ranks - qs).max() < 0.01
+    assert merged.count == len(values)
+
+
+def test_tdigest_histogram_and_cdf():
+    rng = np.random.default_rng(4)
+    values = rng.normal(100_000, 20_000, 100_000)
+    digest = TDigest.from_values(np.r_[values, np.nan])       # NaN은 무시
+    edges = digest.bin_edges(10)
+    counts = digest.histogram(edges)
+    exact, _ = np.histogram(values, edges)
+    assert counts.sum() == pytest.approx(len(values))
+    assert np.abs(counts - exact).max() < 0.01 * len(values)
+    assert digest.cdf(100_000) == pytest.approx((values <= 100_000).mean(), abs=0.005)
+    assert TDigest.from_dict(digest.to_dict()).quantile(0.5) == digest.quantile(0.5)
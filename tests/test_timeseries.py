@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from utils.timeseries import downsample, lttb_indices, order_trend
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_000, dtype=float)
+    y = rng.normal(0, 1, len(x))
+    y[[1234, 7777]] = [50, -50]
+    idx = lttb_indices(x, y, 200)
+    assert len(idx) == 200 and idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert {1234, 7777} <= set(idx)
+
+
+def test_lttb_small_input_is_unchanged():
+    assert lttb_indices([1, 2, 3], [1, 2, 3], 10).tolist() == [0, 1, 2]
+
+
+def test_lttb_matches_reference_implementation():
+    rng = np.random.default_rng(1)
+    x = np.sort(rng.random(2_000))
+    y = np.cumsum(rng.normal(0, 1, len(x)))
+    n_out = 100
+
+    # 버킷 경계를 같은 방식으로 나눈 단순 루프 구현
+    edges = np.linspace(1, len(x) - 1, n_out - 1).astype(int)
+    expected, prev = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else len(x)
+        avg_x, avg_y = x[hi:nhi].mean(), y[hi:nhi].mean()
+        areas = [abs((x[prev] - avg_x) * (y[j] - y[prev]) - (x[prev] - x[j]) * (avg_y - y[prev]))
+                 for j in range(lo, hi)]
+        prev = lo + int(np.argmax(areas))
+        expected.append(prev)
+    expected.append(len(x) - 1)
+    assert lttb_indices(x, y, n_out).tolist() == expected
+
+
+def test_downsample_long_format_skips_nan():
+    days = pd.date_range("2024-01-01", periods=1_000, freq="D")
+    frame = pd.DataFrame({"기간": days[::-1], "객단가": np.arange(1_000.0)[::-1], "비중": np.nan})
+    frame.loc[::2, "비중"] = 0.5
+    series = downsample(frame, "기간", ["객단가", "비중"], max_points=50)
+    aov = series[series["metric"] == "객단가"]
+    assert len(aov) == 50 and aov["기간"].is_monotonic_increasing
+    assert aov["기간"].iloc[[0, -1]].tolist() == [days[0], days[-1]]
+    share = series[series["metric"] == "비중"]
+    assert len(share) == 50 and (share["value"] == 0.5).all()
+
+
+def test_order_trend_weekly():
+    orders = pd.DataFrame({
+        "주문일": pd.to_datetime(["2025-01-06", "2025-01-07", "2025-01-13", "2025-01-19"]),
+        "금액": [10_000.0, 30_000.0, 50_000.0, np.nan],
+        "상품 수": [1, 3, 2, 4],
+    })
+    trend = order_trend(orders, "주문일", "금액", "상품 수", freq="W", items_threshold=2)
+    assert trend["주문 수"].tolist() == [2, 1]
+    assert trend["객단가"].tolist() == [20_000.0, 50_000.0]
+    assert trend["2개 이상 비중"].tolist() == [0.5, 1.0]
@@ -0,0 +1 @@
+"""여러 페이지에서 함께 쓰는 분석 유틸리티."""
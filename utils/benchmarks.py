@@ -0,0 +1,197 @@
+"""알파업셀 보고서 벤치마크 저장소 (SQLite). 쇼핑몰마다 가장 최근에 반영한 보고서 지표 한 벌을 보관.
+
+업종·전체 벤치마크는 record()가 갱신하는 누적 집계(aggregates)로 조회한다: 평균·분산은 Welford 방식으로
+값을 더하고 빼며(쇼핑몰 보고서 교체 시 이전 값을 뺌), 분위수는 t-digest에 병합. t-digest는 값을 뺄 수 없어
+보고서를 교체할 때만 해당 업종의 digest를 쇼핑몰 지표에서 다시 만든다. 조회는 지표 수만큼의 행만 읽는다.
+"""
+import json
+import math
+import os
+import sqlite3
+import time
+
+from utils.cooccurrence_store import BUSY_TIMEOUT, STORE_DIR
+from utils.sketches import TDigest
+
+STORE_PATH = os.path.join(STORE_DIR, "benchmarks.sqlite3")
+ALL_SEGMENT = "전체"
+MIN_SHOPS = 5       # 반영된 쇼핑몰이 이보다 적으면 업종 → 전체 → 기본값 순으로 대체
+
+METRICS = ["upsell_conv_ratio", "upsell_together_ratio", "aov_lift", "items_lift"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shop_reports (
+    shop TEXT PRIMARY KEY, segment TEXT, period_start TEXT NOT NULL, period_end TEXT NOT NULL,
+    metrics TEXT NOT NULL, updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aggregates (
+    segment TEXT NOT NULL, metric TEXT NOT NULL, n INTEGER NOT NULL, mean REAL NOT NULL, m2 REAL NOT NULL,
+    digest TEXT NOT NULL, PRIMARY KEY (segment, metric)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path: str = STORE_PATH) -> sqlite3.Connection:
+    """저장소 연결 (없으면 생성). isolation_level=None → 트랜잭션은 직접 BEGIN/COMMIT."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _add(stats, x: float):
+    """Welford 누적 (n, mean, m2)에 값 추가."""
+    n, mean, m2 = stats
+    n += 1
+    delta = x - mean
+    mean += delta / n
+    return n, mean, m2 + delta * (x - mean)
+
+
+def _remove(stats, x: float):
+    """Welford 누적 (n, mean, m2)에서 값 제거 (_add의 역연산)."""
+    n, mean, m2 = stats
+    if n <= 1:
+        return 0, 0.0, 0.0
+    new_mean = (n * mean - x) / (n - 1)
+    return n - 1, new_mean, max(m2 - (x - new_mean) * (x - mean), 0.0)
+
+
+def _segments(segment) -> list:
+    return [ALL_SEGMENT] + ([segment] if segment and segment != ALL_SEGMENT else [])
+
+
+def _load_aggregate(conn, segment: str, metric: str):
+    row = conn.execute("SELECT n, mean, m2, digest FROM aggregates WHERE segment = ? AND metric = ?",
+                       (segment, metric)).fetchone()
+    if row is None:
+        return (0, 0.0, 0.0), TDigest()
+    return row[:3], TDigest.from_dict(json.loads(row[3]))
+
+
+def _save_aggregate(conn, segment: str, metric: str, stats, digest: TDigest):
+    conn.execute("INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?)",
+                 (segment, metric, *stats, json.dumps(digest.to_dict())))
+
+
+def _rebuild_digests(conn, segment: str):
+    """업종(또는 전체)의 지표별 digest를 현재 쇼핑몰 지표로 다시 만듦 (보고서 교체 시에만)."""
+    values = {metric: [] for metric in METRICS}
+    for seg, metrics in conn.execute("SELECT segment, metrics FROM shop_reports"):
+        if segment == ALL_SEGMENT or seg == segment:
+            for metric, value in json.loads(metrics).items():
+                values.setdefault(metric, []).append(value)
+    for metric, xs in values.items():
+        stats, _ = _load_aggregate(conn, segment, metric)
+        _save_aggregate(conn, segment, metric, stats, TDigest.from_values(xs))
+
+
+def record(shop: str, period_start, period_end, metrics: dict, segment: str = None, path: str = STORE_PATH):
+    """쇼핑몰의 보고서 지표를 반영. 같은 쇼핑몰의 이전 반영분(기간·업종 포함)은 이 보고서로 교체.
+
+    metrics: {지표: 값} (None·NaN인 지표는 저장하지 않음)
+    """
+    values = {k: float(v) for k, v in metrics.items() if v is not None and math.isfinite(v)}
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous = conn.execute("SELECT segment, metrics FROM shop_reports WHERE shop = ?", (shop,)).fetchone()
+            if previous is not None:
+                old_segment, old_values = previous[0], json.loads(previous[1])
+                for seg in _segments(old_segment):
+                    for metric, x in old_values.items():
+                        stats, digest = _load_aggregate(conn, seg, metric)
+                        stats = _remove(stats, x)
+                        _save_aggregate(conn, seg, metric, stats, digest if stats[0] else TDigest())
+            conn.execute("INSERT OR REPLACE INTO shop_reports VALUES (?, ?, ?, ?, ?, ?)",
+                         (shop, segment, str(period_start), str(period_end), json.dumps(values), time.time()))
+            for seg in _segments(segment):
+                for metric, x in values.items():
+                    stats, digest = _load_aggregate(conn, seg, metric)
+                    _save_aggregate(conn, seg, metric, _add(stats, x), digest.update([x]))
+            if previous is not None:
+                for seg in dict.fromkeys(_segments(old_segment) + _segments(segment)):
+                    _rebuild_digests(conn, seg)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def recorded(shop: str, path: str = STORE_PATH) -> dict:
+    """쇼핑몰의 현재 반영분 {'segment', 'period_start', 'period_end', 'updated_at'} (없으면 None)."""
+    if not os.path.exists(path):
+        return None
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT segment, period_start, period_end, updated_at FROM shop_reports WHERE shop = ?",
+                           (shop,)).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(['segment', 'period_start', 'period_end', 'updated_at'], row)) if row else None
+
+
+def segments(path: str = STORE_PATH) -> list:
+    """벤치마크가 쌓인 업종 목록."""
+    if not os.path.exists(path):
+        return []
+    conn = connect(path)
+    try:
+        return [s for (s,) in conn.execute(
+            "SELECT DISTINCT segment FROM shop_reports WHERE segment IS NOT NULL ORDER BY segment")]
+    finally:
+        conn.close()
+
+
+def benchmarks(fallbacks: dict, segment: str = None, exclude_shop: str = None, min_shops: int = MIN_SHOPS,
+               path: str = STORE_PATH) -> dict:
+    """지표별 벤치마크 {지표: {'value', 'n', 'std', 'source', 'digest', 'excluded'}}.
+
+    업종 → 전체 순으로 지표가 있는 쇼핑몰이 min_shops개 이상이면 그 평균을 쓰고, 없으면 fallbacks 값(source='기본값').
+    exclude_shop: 비교 대상 쇼핑몰. 자기 자신의 반영분은 누적 평균·분산에서 빼고, digest에는 남아 있으므로
+    그 값을 excluded로 넘겨 percentile에서 뺀다.
+    """
+    aggregates, own = {}, (None, {})
+    if os.path.exists(path):
+        conn = connect(path)
+        try:
+            for seg in dict.fromkeys([segment or ALL_SEGMENT, ALL_SEGMENT]):
+                for metric in fallbacks:
+                    aggregates[seg, metric] = _load_aggregate(conn, seg, metric)
+            row = conn.execute("SELECT segment, metrics FROM shop_reports WHERE shop = ?", (exclude_shop,)).fetchone()
+            if row is not None:
+                own = (row[0], json.loads(row[1]))
+        finally:
+            conn.close()
+
+    result = {}
+    for metric, fallback in fallbacks.items():
+        for seg in dict.fromkeys([segment or ALL_SEGMENT, ALL_SEGMENT]):
+            stats, digest = aggregates.get((seg, metric), ((0, 0.0, 0.0), None))
+            excluded = own[1].get(metric) if seg in _segments(own[0]) else None
+            if excluded is not None:
+                stats = _remove(stats, excluded)
+            n, mean, m2 = stats
+            if n >= max(min_shops, 2):
+                result[metric] = {'value': mean, 'n': n, 'std': math.sqrt(m2 / (n - 1)), 'source': seg,
+                                  'digest': digest, 'excluded': excluded}
+                break
+        else:
+            result[metric] = {'value': fallback, 'n': 0, 'std': None, 'source': '기본값', 'digest': None,
+                              'excluded': None}
+    return result
+
+
+def percentile(benchmark: dict, value) -> float:
+    """벤치마크 분포에서 value 이하 쇼핑몰 비율(%) 추정 (excluded 값은 뺌). 분포가 없거나 값이 없으면 None."""
+    if benchmark['digest'] is None or value is None or not math.isfinite(value):
+        return None
+    digest = benchmark['digest']
+    below = float(digest.cdf(value)) * digest.count
+    if benchmark['excluded'] is not None and benchmark['excluded'] <= value:
+        below -= 1
+    return min(max(below / benchmark['n'], 0.0), 1.0) * 100
@@ -0,0 +1,162 @@
+"""쇼핑몰별 상품 조합 누적 저장소 (SQLite). 이미 집계한 주문번호는 건너뛰고 새 주문만 반영."""
+import os
+import sqlite3
+from collections import Counter
+
+import pandas as pd
+
+from utils.jobs import APP_ROOT
+from utils.pair_counts import count_pairs, load_pair_lines
+
+STORE_DIR = os.environ.get("TOOLKIT_STORE_DIR", os.path.join(APP_ROOT, "data"))
+STORE_PATH = os.path.join(STORE_DIR, "cooccurrence.sqlite3")
+BUSY_TIMEOUT = 60   # 다른 세션이 같은 저장소를 갱신 중일 때 기다릴 시간(초)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_orders (
+    shop TEXT NOT NULL, order_id TEXT NOT NULL,
+    PRIMARY KEY (shop, order_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS product_orders (
+    shop TEXT NOT NULL, product TEXT NOT NULL, orders INTEGER NOT NULL,
+    PRIMARY KEY (shop, product)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pair_counts (
+    shop TEXT NOT NULL, product_a TEXT NOT NULL, product_b TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (shop, product_a, product_b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pair_counts_b ON pair_counts (shop, product_b);
+CREATE TABLE IF NOT EXISTS upsell_pairs (
+    shop TEXT NOT NULL, general TEXT NOT NULL, upsell TEXT NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (shop, general, upsell)
+) WITHOUT ROWID;
+"""
+
+
+def connect(path: str = STORE_PATH) -> sqlite3.Connection:
+    """저장소 연결 (없으면 생성). isolation_level=None → 트랜잭션은 직접 BEGIN/COMMIT."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _new_order_ids(conn, shop: str, order_ids) -> set:
+    """업로드의 주문번호 중 아직 저장소에 없는 것."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS upload_orders (order_id TEXT PRIMARY KEY) WITHOUT ROWID")
+    conn.execute("DELETE FROM upload_orders")
+    conn.executemany("INSERT OR IGNORE INTO upload_orders VALUES (?)", ((o,) for o in order_ids))
+    rows = conn.execute(
+        "SELECT u.order_id FROM upload_orders u "
+        "LEFT JOIN seen_orders s ON s.shop = ? AND s.order_id = u.order_id "
+        "WHERE s.order_id IS NULL", (shop,))
+    return {order_id for (order_id,) in rows}
+
+
+def order_keys(values: pd.Series) -> pd.Series:
+    """주문번호 → 저장소 키 문자열 (빈 값은 NaN). 빈 값 때문에 실수로 읽힌 정수 주문번호("123.0")는
+    정수 표기("123")로 맞춰, 같은 주문을 정수 열로 다시 올려도 새 주문으로 세지 않는다."""
+    if pd.api.types.is_float_dtype(values):
+        whole = values.notna() & (values == values.round())
+        keys = values.astype(str)
+        keys[whole] = values[whole].astype('int64').astype(str)
+        return keys.where(values.notna())
+    return values.astype(str).str.strip().where(values.notna())
+
+
+def _upsert(conn, table: str, key_cols, value_col: str, shop: str, counts):
+    """Counter를 누적 테이블에 더함 (있으면 기존 값 + 새 값)."""
+    cols = ", ".join(key_cols)
+    conn.executemany(
+        f"INSERT INTO {table} (shop, {cols}, {value_col}) VALUES (?, {', '.join('?' * len(key_cols))}, ?) "
+        f"ON CONFLICT (shop, {cols}) DO UPDATE SET {value_col} = {value_col} + excluded.{value_col}",
+        ((shop, *(key if isinstance(key, tuple) else (key,)), n) for key, n in counts.items()))
+
+
+def ingest(shop: str, data, progress=None, path: str = STORE_PATH) -> dict:
+    """업로드 라인아이템 중 새 주문만 집계해 저장소에 더함.
+
+    data: '주문번호', '상품명', '일반/업셀 구분' 컬럼을 가진 라인아이템 프레임.
+    새 주문 판별부터 반영까지 한 쓰기 트랜잭션으로 처리하므로, 같은 쇼핑몰을 동시에 갱신해도
+    주문이 두 번 집계되지 않는다. 비용은 새 주문 수에 비례. 주문번호가 빈 라인은 건너뜀.
+    전체 주문 내보내기만 반영할 것 (표본 업로드를 넣으면 누적 횟수가 영구히 줄어든 채로 남음).
+    반환: {'new_orders', 'skipped_orders', 'total_orders'}
+    """
+    order_ids = order_keys(data['주문번호'])
+    data, order_ids = data[order_ids.notna().to_numpy()], order_ids.dropna()
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        new_ids = _new_order_ids(conn, shop, order_ids.unique())
+        new_data = data[order_ids.isin(new_ids).to_numpy()]
+
+        if new_ids:
+            combination_counts, combination_counts_upsell = count_pairs(new_data, progress)
+            product_orders = Counter(new_data.drop_duplicates(subset=['주문번호', '상품명'])['상품명'])
+            _upsert(conn, "product_orders", ["product"], "orders", shop, product_orders)
+            _upsert(conn, "pair_counts", ["product_a", "product_b"], "count", shop, combination_counts)
+            _upsert(conn, "upsell_pairs", ["general", "upsell"], "count", shop, combination_counts_upsell)
+            conn.executemany("INSERT INTO seen_orders VALUES (?, ?)", ((shop, o) for o in new_ids))
+        total = conn.execute("SELECT COUNT(*) FROM seen_orders WHERE shop = ?", (shop,)).fetchone()[0]
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return {'new_orders': len(new_ids), 'skipped_orders': order_ids.nunique() - len(new_ids), 'total_orders': total}
+
+
+def ingest_upload(shop: str, cache_key: str, progress=None, path: str = STORE_PATH) -> dict:
+    """캐시된 업로드를 워커에서 직접 읽어 ingest (프레임 대신 캐시 키만 워커로 넘김)."""
+    return ingest(shop, load_pair_lines(cache_key)[['주문번호', '상품명', '일반/업셀 구분']], progress, path)
+
+
+def shops(path: str = STORE_PATH) -> list:
+    """저장소에 누적 집계가 있는 쇼핑몰 목록."""
+    if not os.path.exists(path):
+        return []
+    conn = connect(path)
+    try:
+        return [shop for (shop,) in conn.execute("SELECT DISTINCT shop FROM product_orders ORDER BY shop")]
+    finally:
+        conn.close()
+
+
+def related_products(shop: str, product: str, limit: int = 10, path: str = STORE_PATH) -> list:
+    """누적 기준 product와 함께 구매된 상품 [(상품명, 횟수)] (많은 순)."""
+    conn = connect(path)
+    try:
+        return conn.execute(
+            "SELECT product_b, count FROM pair_counts WHERE shop = ? AND product_a = ? "
+            "UNION ALL SELECT product_a, count FROM pair_counts WHERE shop = ? AND product_b = ? "
+            "ORDER BY 2 DESC, 1 LIMIT ?", (shop, product, shop, product, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+def related_upsell_products(shop: str, product: str, limit: int = 10, path: str = STORE_PATH) -> list:
+    """누적 기준 일반 상품 product와 함께 구매된 업셀 상품 [(상품명, 횟수)] (많은 순)."""
+    conn = connect(path)
+    try:
+        return conn.execute(
+            "SELECT upsell, count FROM upsell_pairs WHERE shop = ? AND general = ? "
+            "ORDER BY count DESC, upsell LIMIT ?", (shop, product, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+def load_counts(shop: str, path: str = STORE_PATH):
+    """누적 집계 전체 → (상품별 주문 수, combination_counts, combination_counts_upsell) Counter."""
+    conn = connect(path)
+    try:
+        product_orders = Counter(dict(conn.execute(
+            "SELECT product, orders FROM product_orders WHERE shop = ?", (shop,))))
+        combination_counts = Counter({(a, b): n for a, b, n in conn.execute(
+            "SELECT product_a, product_b, count FROM pair_counts WHERE shop = ?", (shop,))})
+        combination_counts_upsell = Counter({(g, u): n for g, u, n in conn.execute(
+            "SELECT general, upsell, count FROM upsell_pairs WHERE shop = ?", (shop,))})
+        return product_orders, combination_counts, combination_counts_upsell
+    finally:
+        conn.close()
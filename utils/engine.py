@@ -0,0 +1,227 @@
+"""집계 엔진 선택: pandas(기본) 또는 DuckDB(설치된 경우).
+
+같은 집계(주문 정리·업셀 판별·가격 분포, 상품별 요약, 상품 조합 수)를 두 엔진으로 구현해
+페이지마다 엔진을 고르고, 필요하면 두 결과와 소요 시간을 나란히 비교한다.
+DuckDB는 캐시된 Arrow 파일을 복사 없이 스캔하고, 멀티코어로 실행하며, 메모리를 넘으면 디스크로 내린다.
+"""
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.jobs import input_key, run_with_progress
+from utils.order_metrics import ORDER_COLUMNS, PRICE_BIN, PRICE_CAP, PRICE_RANGE, summarize_upload
+from utils.pair_counts import PAIR_COLUMNS, count_upload_pairs
+from utils.parsing import AMOUNT_JUNK
+from utils.sketches import TDigest
+from utils.upload_cache import CACHE_DIR, arrow_table, load_frame
+
+try:
+    import duckdb
+except ImportError:  # 선택 의존성: 없으면 pandas 엔진만 사용
+    duckdb = None
+
+DUCKDB_MEMORY_LIMIT = os.environ.get("TOOLKIT_DUCKDB_MEMORY_LIMIT", "2GB")
+DUCKDB_SPILL_DIR = os.path.join(CACHE_DIR, "duckdb-spill")
+
+PRODUCT_COLUMNS = ['상품 코드', '상품명', '일반/업셀 구분', '구매 수량', '상품 단가']
+# parsing.parse_amounts와 같은 금액 변환 (구분자·통화 표기 제거 후 숫자, 실패는 NULL)
+AMOUNT_SQL = f"""TRY_CAST(regexp_replace(CAST("총 주문 금액" AS VARCHAR), '{AMOUNT_JUNK}', '', 'g') AS DOUBLE)"""
+
+
+class PandasEngine:
+    """기존 pandas 집계 (공유 프로세스 풀 워커에서 실행)."""
+    name = "pandas"
+
+    def order_summary(self, key, progress=None) -> dict:
+        return summarize_upload(key, progress)
+
+    def product_summary(self, key, kind=None, progress=None) -> pd.DataFrame:
+        data = load_frame(key, PRODUCT_COLUMNS)
+        if kind is not None:
+            data = data[data['일반/업셀 구분'] == kind]
+        data = data.assign(**{'합계 매출': data['구매 수량'] * data['상품 단가']})
+        return data.groupby(['상품 코드', '상품명'], as_index=False).agg({
+            '구매 수량': 'sum',
+            '상품 단가': lambda x: ', '.join(map(str, sorted(x.unique()))),
+            '합계 매출': 'sum'
+        })
+
+    def pair_counts(self, key, progress=None):
+        return count_upload_pairs(key, progress)
+
+
+class DuckDBEngine:
+    """같은 집계를 DuckDB SQL로 실행 (앱 프로세스 안에서 멀티스레드)."""
+    name = "duckdb"
+
+    def _connect(self, key, columns):
+        os.makedirs(DUCKDB_SPILL_DIR, exist_ok=True)
+        # 설정은 SQL 문자열이 아니라 연결 옵션으로 전달 (경로에 따옴표가 있어도 안전)
+        con = duckdb.connect(config={'memory_limit': DUCKDB_MEMORY_LIMIT, 'temp_directory': DUCKDB_SPILL_DIR})
+        con.register("lines", arrow_table(key, columns))
+        return con
+
+    def order_summary(self, key, progress=None) -> dict:
+        con = self._connect(key, ORDER_COLUMNS)
+        try:
+            # 취소/환불(0원 이하) 제외 → 주문 단위 정리. 업셀 라인이 하나라도 있으면 업셀 주문 (min: '업셀' < '일반')
+            con.execute(f"""
+                CREATE TEMP TABLE orders AS
+                SELECT "주문번호",
+                       arg_min(amount, kind) AS amount,
+                       arg_min("주문자 아이디", kind) AS buyer,
+                       min(kind) = '업셀 상품' AS is_upsell,
+                       count(*) AS items
+                FROM (SELECT *, {AMOUNT_SQL} AS amount, "일반/업셀 구분" AS kind FROM lines)
+                WHERE amount > 0
+                GROUP BY "주문번호"
+            """)
+            totals = con.execute("SELECT sum(amount), avg(amount), count(*) FROM orders").fetchone()
+            orders = con.execute("""
+                SELECT "주문번호", amount, is_upsell, items,
+                       CASE WHEN buyer IS NULL OR trim(CAST(buyer AS VARCHAR)) = '' THEN 'Guest' ELSE 'Member' END AS member,
+                       least(floor(amount / ?) * ?, ?) AS price_bin
+                FROM orders ORDER BY "주문번호"
+            """, [PRICE_BIN, PRICE_BIN, PRICE_CAP]).df()
+            hist = con.execute("""
+                SELECT least(floor(amount / ?) * ?, ?) AS price_bin, count(*) AS n,
+                       count(*) FILTER (WHERE is_upsell) AS n_upsell
+                FROM orders GROUP BY 1
+            """, [PRICE_BIN, PRICE_BIN, PRICE_CAP]).df().set_index('price_bin').reindex(PRICE_RANGE, fill_value=0)
+        finally:
+            con.close()
+
+        kind = np.where(orders['is_upsell'], '업셀 상품', '일반 상품')
+        segment_digests = {
+            segment: TDigest.from_values(group.to_numpy())
+            for segment, group in orders['amount'].groupby([orders['member'].rename('회원여부'),
+                                                            pd.Series(kind, name='주문 유형')])
+        }
+        order_items = orders[['주문번호', 'items']].rename(columns={'items': 'ItemCount'})
+        return {
+            'total_revenue': float(totals[0] or 0),
+            'avg_order_value': float(totals[1]) if totals[1] is not None else float('nan'),
+            'n_orders': int(totals[2]),
+            'member_counts': orders['member'].rename('회원여부').value_counts(),
+            'order_counts': pd.Series(hist['n'].to_numpy(), index=PRICE_RANGE.to_numpy(), name='count'),
+            'upsell_order_counts': (pd.Series(hist['n_upsell'].to_numpy(), index=PRICE_RANGE.to_numpy(), name='count')
+                                    if orders['is_upsell'].any() else None),
+            'segment_digests': segment_digests,
+            'order_items': order_items,
+            'item_count_distribution': order_items['ItemCount'].value_counts().sort_index(),
+        }
+
+    def product_summary(self, key, kind=None, progress=None) -> pd.DataFrame:
+        con = self._connect(key, PRODUCT_COLUMNS)
+        try:
+            return con.execute("""
+                SELECT "상품 코드", "상품명",
+                       sum("구매 수량") AS "구매 수량",
+                       array_to_string(list_sort(list_distinct(list("상품 단가"))), ', ') AS "상품 단가",
+                       sum("구매 수량" * "상품 단가") AS "합계 매출"
+                FROM lines
+                WHERE ? IS NULL OR "일반/업셀 구분" = ?
+                GROUP BY 1, 2 ORDER BY 1, 2
+            """, [kind, kind]).df()
+        finally:
+            con.close()
+
+    def pair_counts(self, key, progress=None):
+        con = self._connect(key, PAIR_COLUMNS)
+        try:
+            con.execute(f"""
+                CREATE TEMP TABLE l AS
+                SELECT "주문번호" AS oid, "상품명" AS product, "일반/업셀 구분" AS kind
+                FROM lines WHERE {AMOUNT_SQL} > 0
+            """)
+            # 주문 내 서로 다른 상품 쌍 (이름순 정렬된 조합)
+            pairs = con.execute("""
+                WITH p AS (SELECT DISTINCT oid, product FROM l)
+                SELECT a.product, b.product, count(*) FROM p a JOIN p b ON a.oid = b.oid AND a.product < b.product
+                GROUP BY 1, 2
+            """).fetchall()
+            # 일반 라인 × 업셀 라인 (라인 수만큼 중복 집계 — count_pairs와 동일)
+            upsell = con.execute("""
+                SELECT g.product, u.product, count(*)
+                FROM l g JOIN l u ON g.oid = u.oid AND g.kind = '일반 상품' AND u.kind = '업셀 상품'
+                GROUP BY 1, 2
+            """).fetchall()
+        finally:
+            con.close()
+        return (Counter({(a, b): n for a, b, n in pairs}),
+                Counter({(g, u): n for g, u, n in upsell}))
+
+
+ENGINES = {"pandas": PandasEngine()}
+if duckdb is not None:
+    ENGINES["duckdb"] = DuckDBEngine()
+
+
+def _run_op(engine_name, op, key, *args, progress=None):
+    return getattr(ENGINES[engine_name], op)(key, *args, progress=progress)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _run_duckdb(op, key, *args):
+    return _run_op("duckdb", op, key, *args)
+
+
+def run(engine_name, op, key, *args, label="계산 중..."):
+    """op(key, *args)를 선택한 엔진으로 실행. pandas는 공유 프로세스 풀, DuckDB는 앱 프로세스에서 실행."""
+    if engine_name == "pandas":
+        return run_with_progress(input_key(op, key, *args), _run_op, "pandas", op, key, *args, label=label)
+    with st.spinner(f"{label} (DuckDB)"):
+        return _run_duckdb(op, key, *args)
+
+
+def select_engine(page: str) -> tuple:
+    """사이드바 엔진 선택. 반환: (엔진 이름, 비교 여부)."""
+    with st.sidebar:
+        engine_name = st.selectbox("집계 엔진", list(ENGINES), key=f"engine_{page}",
+                                   help="DuckDB: 멀티코어·디스크 스필 지원 (duckdb 설치 시 표시)")
+        compare = len(ENGINES) > 1 and st.checkbox("엔진 결과·시간 비교", key=f"engine_compare_{page}")
+    return engine_name, compare
+
+
+def _same(a, b) -> bool:
+    """두 엔진 결과가 같은지 (dtype·인덱스 이름 차이는 무시, 실수는 근사 비교)."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, TDigest) and isinstance(b, TDigest):
+        return a.count == b.count and np.allclose(a.quantile([0.5, 0.9]), b.quantile([0.5, 0.9]))
+    if isinstance(a, (pd.Series, pd.DataFrame)) and isinstance(b, type(a)):
+        a, b = a.reset_index(), b.reset_index()
+        if a.shape != b.shape:
+            return False
+        for col_a, col_b in zip(a.columns, b.columns):
+            x, y = a[col_a], b[col_b]
+            if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+                if not np.allclose(x.to_numpy(np.float64), y.to_numpy(np.float64), equal_nan=True):
+                    return False
+            elif x.astype(str).tolist() != y.astype(str).tolist():
+                return False
+        return True
+    if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)):
+        return bool(np.isclose(float(a), float(b), equal_nan=True))
+    return a == b
+
+
+def compare_engines(op, key, *args):
+    """모든 엔진으로 같은 집계를 앱 프로세스에서 실행해 소요 시간과 결과 일치 여부를 표로 표시."""
+    rows, results = [], {}
+    with st.spinner("엔진별 실행 시간 측정 중..."):
+        for name in ENGINES:
+            started = time.perf_counter()
+            results[name] = _run_op(name, op, key, *args)
+            rows.append({'엔진': name, '소요 시간(초)': time.perf_counter() - started})
+    baseline = results["pandas"]
+    for row in rows:
+        row['pandas와 결과 일치'] = _same(baseline, results[row['엔진']])
+    with st.expander("엔진 비교", expanded=True):
+        st.dataframe(pd.DataFrame(rows).style.format({'소요 시간(초)': '{:.3f}'}), hide_index=True)
@@ -0,0 +1,92 @@
+"""다운로드 파일은 버튼을 누를 때만 만든다 (st.download_button의 callable data).
+
+rerun마다 CSV 문자열·바이트를 미리 만들지 않고, 누르면 표를 청크 단위로 임시 파일에 기록한 뒤 그 내용을 넘긴다.
+포맷: CSV, Parquet, Excel. 여러 표는 zip 묶음으로 내보낸다.
+"""
+import tempfile
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+try:
+    import openpyxl
+except ImportError:  # requirements.txt에 포함. 설치되지 않은 개발 환경에서는 Excel 버튼만 생략
+    openpyxl = None
+
+CHUNK_ROWS = 50_000             # CSV·Parquet 청크(row group) 크기
+EXCEL_MAX_ROWS = 1_048_575      # 시트당 최대 행 (헤더 제외). 넘으면 시트를 나눔
+
+
+def _frame(data) -> pd.DataFrame:
+    return data() if callable(data) else data
+
+
+def write_csv(frame: pd.DataFrame, sink):
+    for start in range(0, max(len(frame), 1), CHUNK_ROWS):
+        chunk = frame.iloc[start:start + CHUNK_ROWS]
+        sink.write(chunk.to_csv(index=False, header=start == 0).encode('utf-8'))
+
+
+def write_parquet(frame: pd.DataFrame, sink):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=CHUNK_ROWS):
+            writer.write_batch(batch)
+
+
+def write_xlsx(frame: pd.DataFrame, sink):
+    with pd.ExcelWriter(sink, engine="openpyxl") as writer:
+        for i, start in enumerate(range(0, max(len(frame), 1), EXCEL_MAX_ROWS)):
+            frame.iloc[start:start + EXCEL_MAX_ROWS].to_excel(writer, sheet_name=f"Sheet{i + 1}", index=False)
+
+
+# 버튼 이름 → (확장자, MIME, 기록 함수)
+FORMATS = {
+    "CSV": ("csv", "text/csv", write_csv),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", write_parquet),
+}
+if openpyxl is not None:
+    FORMATS["Excel"] = ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx)
+
+
+def write_bundle(members: dict, fmt: str, sink):
+    """{파일 이름: DataFrame·DataFrame을 만드는 함수·문자열} → zip. 표는 fmt 포맷, 문자열은 그대로 기록."""
+    ext, _, writer = FORMATS[fmt]
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for name, data in members.items():
+            if isinstance(data, str):
+                bundle.writestr(name, data.encode('utf-8'))
+                continue
+            # xlsx·parquet 기록기는 되감기가 필요할 수 있어 임시 파일에 쓴 뒤 zip에 복사
+            with tempfile.TemporaryFile() as member:
+                writer(_frame(data), member)
+                member.seek(0)
+                with bundle.open(f"{name}.{ext}", "w") as target:
+                    while chunk := member.read(1024 * 1024):
+                        target.write(chunk)
+
+
+def export_file(write, *args):
+    """write(*args, sink)로 임시 파일에 기록 → 파일 내용(bytes). 기록 중 중간 버퍼는 메모리에 두지 않음."""
+    with tempfile.TemporaryFile(prefix="toolkit-export-") as sink:
+        write(*args, sink)
+        sink.seek(0)
+        return sink.read()
+
+
+def download_buttons(label: str, data, file_stem: str, key: str = None):
+    """포맷별 다운로드 버튼. data: DataFrame 또는 DataFrame을 만드는 함수 — 누를 때만 호출된다."""
+    for col, (name, (ext, mime, writer)) in zip(st.columns(len(FORMATS)), FORMATS.items()):
+        col.download_button(f"{label} ({name})", lambda writer=writer: export_file(writer, _frame(data)),
+                            f"{file_stem}.{ext}", mime, key=key and f"{key}_{ext}", on_click="ignore")
+
+
+def download_bundle(label: str, members: dict, file_stem: str, key: str = None):
+    """여러 표(+텍스트 파일)를 포맷별 zip으로 묶어 내려받는 버튼 (누를 때만 생성)."""
+    for col, name in zip(st.columns(len(FORMATS)), FORMATS):
+        col.download_button(f"{label} ({name} zip)", lambda name=name: export_file(write_bundle, members, name),
+                            f"{file_stem}_{FORMATS[name][0]}.zip", "application/zip",
+                            key=key and f"{key}_{FORMATS[name][0]}_zip", on_click="ignore")
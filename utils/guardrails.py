@@ -0,0 +1,124 @@
+"""대용량 분석 보호: 파싱 전에 메모리·시간을 추정하고, 무거운 분석의 동시 실행 수를 제한.
+
+추정: 파일 크기 + 앞부분 표본(SAMPLE_BYTES)의 행당 크기로 전체 행 수와 프레임 메모리를 계산.
+한도(ANALYSIS_MEMORY_MAX)를 넘는 업로드는 실패시키지 않고 주문번호 해시 표본만 스트리밍으로 캐시해 분석.
+무거운 분석(HEAVY_MIN_BYTES 이상)은 프로세스 공용 세마포어로 MAX_HEAVY개까지만 동시에 실행하고 나머지는 대기.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from utils.jobs import POLL_INTERVAL
+from utils.schema import detect_profile, read_header
+from utils.upload_cache import cache_sampled_upload, cache_upload
+
+SAMPLE_BYTES = 1024 ** 2       # 행당 크기를 재는 앞부분 표본
+PEAK_FACTOR = 3                # 파싱·정렬·중복 제거 중 중간 복사본 포함 최대 메모리 / 프레임 메모리 (실측 약 2.5배)
+ROWS_PER_SECOND = 300_000      # 파싱 + 주문 집계 처리량 (대략)
+MIN_SAMPLE_RATE = 0.01
+
+
+def _memory_limit() -> int:
+    """컨테이너 메모리 한도 (cgroup 한도가 없으면 물리 메모리)."""
+    physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            return min(int(value), physical)
+    return physical
+
+
+ANALYSIS_MEMORY_MAX = int(os.environ.get("TOOLKIT_ANALYSIS_MEMORY_MAX", _memory_limit() // 4))  # 분석 하나의 메모리 한도
+HEAVY_MIN_BYTES = int(os.environ.get("TOOLKIT_HEAVY_MIN_BYTES", 256 * 1024 ** 2))  # 이 이상이면 동시 실행 제한 대상
+MAX_HEAVY = int(os.environ.get("TOOLKIT_MAX_HEAVY_ANALYSES", 2))
+
+
+def estimate(uploaded_file, mapping: dict) -> dict:
+    """파싱 전 추정: {'bytes', 'rows', 'memory', 'seconds', 'rate'}.
+
+    mapping의 컬럼만 앞부분 표본으로 파싱해 행당 바이트(파일)·메모리(프레임)를 재고 파일 크기로 환산.
+    rate: 메모리 한도 안에 들도록 남길 주문 비율 (1이면 전체 분석).
+    """
+    raw = uploaded_file.getvalue()
+    head = raw[:SAMPLE_BYTES]
+    if len(raw) > SAMPLE_BYTES:
+        head = head[:head.rfind(b"\n") + 1]     # 잘린 마지막 줄 제외
+    sample = pd.read_csv(BytesIO(head), usecols=lambda c: str(c).replace("\ufeff", "").strip() in mapping)
+    n_sample = max(len(sample), 1)
+    rows = len(sample) if len(raw) <= SAMPLE_BYTES else int(n_sample * len(raw) / max(len(head), 1))
+    memory = int(rows * sample.memory_usage(deep=True, index=False).sum() / n_sample * PEAK_FACTOR)
+    rate = 1.0 if memory <= ANALYSIS_MEMORY_MAX else max(ANALYSIS_MEMORY_MAX / memory, MIN_SAMPLE_RATE)
+    return {'bytes': len(raw), 'rows': rows, 'memory': memory, 'seconds': rows / ROWS_PER_SECOND,
+            'rate': round(rate, 3) if rate < 1 else 1.0}
+
+
+def plan_upload(uploaded_file, required, optional=(), column: str = "주문번호") -> dict:
+    """헤더로 프로필을 판별하고(schema.open_upload와 같음) 파싱 전 추정까지 한 실행 계획.
+
+    반환: estimate 결과 + {'profile', 'mapping', 'columns'(이 페이지가 쓸 수 있는 표준 컬럼), 'column'(표본 키)}
+    """
+    name, mapping = detect_profile(read_header(uploaded_file), required)
+    available = set(mapping.values())
+    return {**estimate(uploaded_file, mapping), 'profile': name, 'mapping': mapping, 'column': column,
+            'columns': [col for col in dict.fromkeys([*required, *optional]) if col in available]}
+
+
+def open_planned(uploaded_file, plan: dict) -> str:
+    """계획대로 업로드를 캐시하고 키 반환: 한도 안이면 전체, 넘으면 표본 키 컬럼 해시 표본만 스트리밍으로."""
+    if plan['rate'] < 1:
+        return cache_sampled_upload(uploaded_file, plan['mapping'], plan['column'], plan['rate'])
+    return cache_upload(uploaded_file, plan['mapping'])
+
+
+def show_plan(plan: dict):
+    """무거운 분석이면 추정치 캡션, 표본 모드면 경고."""
+    if plan['memory'] >= HEAVY_MIN_BYTES:
+        st.caption(f"예상 {plan['rows']:,}행 · 메모리 약 {plan['memory'] / 1024 ** 2:,.0f}MB · "
+                   f"처리 약 {max(plan['seconds'], 1):,.0f}초")
+    if plan['rate'] < 1:
+        st.warning(f"업로드가 커서 (예상 메모리 {plan['memory'] / 1024 ** 3:,.1f}GB > 한도 "
+                   f"{ANALYSIS_MEMORY_MAX / 1024 ** 3:,.1f}GB) 주문 {plan['rate'] * 100:.1f}% 표본으로 분석합니다. "
+                   "비율·평균은 전체 추정치이고, 건수·합계는 표본 기준입니다.")
+
+
+@st.cache_resource
+def _slots() -> dict:
+    """프로세스 공용 실행 슬롯 (모든 세션이 공유)."""
+    return {'semaphore': threading.BoundedSemaphore(MAX_HEAVY), 'waiting': 0, 'lock': threading.Lock()}
+
+
+@contextmanager
+def admit(plan: dict, label: str = "분석"):
+    """무거운 분석이면 실행 슬롯을 잡고 실행 (슬롯이 없으면 대기 상태를 표시하며 기다림). 가벼운 분석은 바로 실행."""
+    if plan['memory'] < HEAVY_MIN_BYTES:
+        yield
+        return
+    slots = _slots()
+    status = None
+    if not slots['semaphore'].acquire(blocking=False):
+        with slots['lock']:
+            slots['waiting'] += 1
+        status = st.empty()
+        started = time.time()
+        try:
+            while not slots['semaphore'].acquire(timeout=POLL_INTERVAL):
+                status.info(f"⏳ 대용량 분석 {MAX_HEAVY}개가 실행 중이라 {label} 대기 중입니다 "
+                            f"(대기 {slots['waiting']}건 · {time.time() - started:.0f}초)")
+        finally:
+            with slots['lock']:
+                slots['waiting'] -= 1
+    try:
+        if status is not None:
+            status.empty()
+        yield
+    finally:
+        slots['semaphore'].release()    # 중간에 st.stop·rerun으로 끝나도 슬롯은 반드시 반환
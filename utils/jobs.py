@@ -0,0 +1,195 @@
+"""세션 간 공유 프로세스 풀 작업 실행기 (동일 입력 작업은 한 번만 계산)."""
+import hashlib
+import multiprocessing
+import os
+import site
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import streamlit as st
+
+MAX_WORKERS = None          # None → CPU 코어 수
+MAX_FINISHED_JOBS = 32      # 완료된 결과를 보관할 최대 작업 수 (LRU)
+POLL_INTERVAL = 0.2         # 진행률 갱신 주기(초)
+
+# 서버는 멀티스레드이므로 fork는 다른 스레드가 잡고 있던 락까지 복제해 워커가 멈출 수 있음 → forkserver(없으면 spawn).
+# 워커가 실행하는 함수는 모두 utils 모듈의 최상위 함수여야 함 (인자와 함께 pickle로 전달)
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+PRELOAD_MODULES = ["numpy", "pandas", "pyarrow"]    # forkserver가 미리 import → 워커 시작 비용 절감
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_BARE_MAIN = types.ModuleType("__main__")
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _bare_main():
+    """프로세스를 만드는 동안만 __main__을 빈 모듈로 바꿈.
+
+    Streamlit은 실행 중인 페이지를 sys.modules['__main__']에 두는데, spawn/forkserver 워커는 __main__ 파일을
+    __mp_main__으로 다시 실행하므로 그대로 두면 워커마다 페이지 스크립트가 돈다.
+    """
+    with _main_lock:
+        page = sys.modules.get("__main__")
+        sys.modules["__main__"] = _BARE_MAIN
+        try:
+            yield
+        finally:
+            if sys.modules.get("__main__") is _BARE_MAIN:     # 그 사이 다른 세션이 바꿨으면 그대로 둠
+                sys.modules["__main__"] = page
+
+
+_base_context = multiprocessing.get_context(START_METHOD)
+
+
+class _WorkerProcess(_base_context.Process):
+    @staticmethod
+    def _Popen(process_obj):
+        with _bare_main():
+            return _base_context.Process._Popen(process_obj)
+
+
+class _WorkerContext(type(_base_context)):
+    """START_METHOD 컨텍스트와 같고, 프로세스(풀 워커·Manager)만 _bare_main 안에서 시작."""
+    Process = _WorkerProcess
+
+
+def input_key(*parts) -> str:
+    """작업 이름·업로드 바이트·파라미터로 작업 키(해시) 생성."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if hasattr(part, "getvalue"):
+            part = part.getvalue()
+        h.update(part if isinstance(part, (bytes, bytearray, memoryview)) else repr(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class Progress:
+    """워커 프로세스에서 진행률을 보고하는 핸들 (pickle 가능)."""
+
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+
+    def __call__(self, fraction: float, message: str = ""):
+        self._store[self._key] = (min(max(float(fraction), 0.0), 1.0), message)
+
+
+class Job:
+    def __init__(self, key, future, progress_store):
+        self.key = key
+        self.future = future
+        self._progress_store = progress_store
+        self.submitted_at = time.time()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def progress(self):
+        if self.future.done():
+            return 1.0, ""
+        return self._progress_store.get(self.key, (0.0, ""))
+
+    def result(self):
+        return self.future.result()
+
+
+class JobRunner:
+    """프로세스 풀 + single-flight: 같은 키의 작업은 실행 중이든 완료됐든 공유.
+
+    완료된 작업만 MAX_FINISHED_JOBS개까지 LRU로 보관하고, 실행 중인 작업은 내보내지 않는다.
+    여러 작업을 묶은 작업(partitioned.PartitionedJob 등)도 register로 같은 키 공간에 등록.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        ctx = _WorkerContext()
+        if START_METHOD == "forkserver":
+            ctx.set_forkserver_preload(PRELOAD_MODULES)
+        # 워커에서 utils 패키지를 import할 수 있도록 앱 루트를 경로에 추가
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx,
+                                             initializer=site.addsitedir, initargs=(APP_ROOT,))
+        self._manager = ctx.Manager()
+        self._progress = self._manager.dict()
+        self._jobs = OrderedDict()
+        self._lock = threading.RLock()
+
+    def submit(self, key, fn, *args, **kwargs) -> Job:
+        """fn(*args, progress=..., **kwargs)를 풀에서 실행. 같은 key가 있으면 그 작업을 반환."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+                return job
+            future = self._executor.submit(fn, *args, progress=Progress(self._progress, key), **kwargs)
+            job = Job(key, future, self._progress)
+            self._jobs[key] = job
+            future.add_done_callback(lambda f, key=key: self._finished(key, f))
+            return job
+
+    def register(self, key, factory):
+        """factory()로 만든 묶음 작업(done/progress/result, done은 부수효과 없이)을 등록. 같은 key가 있으면 그 작업을 반환."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = factory()
+            self._evict()
+            return job
+
+    def discard(self, job):
+        """실패한 작업을 제거해 다음 요청 때 다시 계산되게 함 (그 사이 같은 키로 새로 등록된 작업은 그대로 둠)."""
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def _finished(self, key, future):
+        with self._lock:
+            self._progress.pop(key, None)
+            # 실패한 작업은 다음 요청 때 다시 계산되도록 제거
+            if future.cancelled() or future.exception() is not None:
+                self._jobs.pop(key, None)
+            self._evict()
+
+    def _evict(self):
+        finished = [k for k, j in self._jobs.items() if j.done()]
+        for stale in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            self._jobs.pop(stale, None)
+
+    def running(self) -> int:
+        with self._lock:
+            return sum(not j.done() for j in self._jobs.values())
+
+
+@st.cache_resource
+def get_runner() -> JobRunner:
+    """앱 프로세스 전체(모든 세션)가 공유하는 실행기."""
+    return JobRunner()
+
+
+def wait(job, label: str = "계산 중..."):
+    """진행률 바를 표시하며 작업 결과를 기다림. 이미 끝난 작업은 즉시 반환."""
+    if not job.done():
+        bar = st.progress(0.0, text=label)
+        while not job.done():
+            fraction, message = job.progress()
+            elapsed = time.time() - job.submitted_at
+            bar.progress(fraction, text=f"{label} {message} ({elapsed:.0f}초)".strip())
+            time.sleep(POLL_INTERVAL)
+        bar.empty()
+    try:
+        return job.result()
+    except Exception:
+        get_runner().discard(job)     # 실패한 작업은 다음 요청 때 다시 계산
+        raise
+
+
+def run_with_progress(key, fn, *args, label: str = "계산 중...", **kwargs):
+    """작업 제출 후 진행률 바를 표시하며 결과를 기다림. 이미 끝난 작업은 즉시 반환."""
+    return wait(get_runner().submit(key, fn, *args, **kwargs), label)
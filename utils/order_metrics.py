@@ -0,0 +1,154 @@
+"""주문 지표 집계 (객단가 분석)."""
+import operator
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from utils.parsing import parse_amounts, parse_dates
+from utils.progressive import sample_orders
+from utils.sketches import TDigest
+from utils.upload_cache import load_frame
+
+PRICE_BIN = 10000       # 만원 단위 구간
+PRICE_CAP = 200000      # 20만원 이상은 한 구간으로
+PRICE_RANGE = pd.Series([i * PRICE_BIN for i in range(PRICE_CAP // PRICE_BIN + 1)])  # 0, 10000, ..., 200000
+
+
+def clean_orders(raw_data: pd.DataFrame, report: dict = None) -> pd.DataFrame:
+    """'총 주문 금액' 숫자 변환("12,000원" 등 포함) 후 0원 이하(취소/환불) 라인 제외. report: parsing 참고."""
+    raw_data = raw_data.copy()
+    raw_data['총 주문 금액'] = parse_amounts(raw_data['총 주문 금액'], report)
+    return raw_data[raw_data['총 주문 금액'] > 0]
+
+
+def dedup_orders(raw_data: pd.DataFrame) -> pd.DataFrame:
+    """'주문번호' 기준 1행으로 정리. 업셀 라인이 있는 주문은 업셀 행을 남김."""
+    data = raw_data.sort_values(by=['일반/업셀 구분'], ascending=False)
+    return data.drop_duplicates(subset=['주문번호'], keep='last')
+
+
+def member_labels(buyers: pd.Series) -> pd.Series:
+    """주문자 아이디 → 'Member' / 'Guest'(빈 값)."""
+    return buyers.apply(lambda x: 'Guest' if pd.isna(x) or str(x).strip() == '' else 'Member')
+
+
+def price_bins(amounts: pd.Series) -> pd.Series:
+    """만원 단위 구간별 주문 수 (20만원 초과는 마지막 구간)."""
+    bins = ((amounts // PRICE_BIN) * PRICE_BIN).clip(upper=PRICE_CAP)
+    return bins.value_counts().reindex(PRICE_RANGE, fill_value=0).sort_index()
+
+
+def order_partial(raw_data: pd.DataFrame, progress=None) -> dict:
+    """정리된 라인아이템(주문이 쪼개지지 않은 일부) → 더하거나 병합해 합칠 수 있는 부분 집계.
+
+    분위수는 세그먼트별 t-digest로 넘겨 병합하므로 부분 집계 크기가 주문 수와 무관하다.
+    """
+    if progress is not None:
+        progress(0.1, "주문 단위 정리 중")
+    data = dedup_orders(raw_data)
+    member = member_labels(data['주문자 아이디'])
+    is_upsell = data['일반/업셀 구분'] == '업셀 상품'
+
+    if progress is not None:
+        progress(0.4, "가격 분포 집계 중")
+    kind = is_upsell.map({True: '업셀 상품', False: '일반 상품'})
+    segment_digests = {
+        segment: TDigest.from_values(group.to_numpy(np.float64))
+        for segment, group in data['총 주문 금액'].groupby([member.rename('회원여부'), kind.rename('주문 유형')])
+    }
+
+    if progress is not None:
+        progress(0.7, "주문당 상품 수 집계 중")
+    return {
+        'total_revenue': float(data['총 주문 금액'].sum()),
+        'n_orders': int(len(data)),
+        'n_upsell_orders': int(is_upsell.sum()),
+        'member_counts': member.rename('회원여부').value_counts(),
+        'order_counts': price_bins(data['총 주문 금액']),
+        'upsell_order_counts': price_bins(data.loc[is_upsell, '총 주문 금액']),
+        'segment_digests': segment_digests,
+        'order_items': raw_data.groupby('주문번호').size().reset_index(name='ItemCount'),
+    }
+
+
+def merge_order_partials(parts) -> dict:
+    """order_partial 결과들 → order_summary와 같은 요약 (주문이 한 부분에만 있으면 단일 패스와 동일)."""
+    total_revenue = float(sum(part['total_revenue'] for part in parts))
+    n_orders = sum(part['n_orders'] for part in parts)
+    segments = sorted({segment for part in parts for segment in part['segment_digests']})
+    order_items = (pd.concat([part['order_items'] for part in parts])
+                   .sort_values('주문번호', kind='stable').reset_index(drop=True))
+    return {
+        'total_revenue': total_revenue,
+        'avg_order_value': total_revenue / n_orders if n_orders else float('nan'),
+        'n_orders': n_orders,
+        'member_counts': (pd.concat([part['member_counts'] for part in parts])
+                          .groupby(level=0).sum().sort_values(ascending=False, kind='stable')),
+        'order_counts': reduce(operator.add, (part['order_counts'] for part in parts)),
+        'upsell_order_counts': (reduce(operator.add, (part['upsell_order_counts'] for part in parts))
+                                if any(part['n_upsell_orders'] for part in parts) else None),
+        'segment_digests': {
+            segment: reduce(TDigest.merge, [part['segment_digests'][segment] for part in parts
+                                            if segment in part['segment_digests']])
+            for segment in segments
+        },
+        'order_items': order_items,
+        'item_count_distribution': order_items['ItemCount'].value_counts().sort_index(),
+    }
+
+
+def order_facts(raw_data: pd.DataFrame) -> pd.DataFrame:
+    """정리된 라인아이템 → 주문 1행 팩트 테이블 (주문번호, [주문일], 총 주문 금액, 회원여부, 주문 유형, 상품 수)."""
+    data = dedup_orders(raw_data)
+    items = raw_data.groupby('주문번호').size()
+    is_upsell = data['일반/업셀 구분'] == '업셀 상품'
+    facts = data[[c for c in ['주문번호', '주문일', '총 주문 금액'] if c in data.columns]].assign(**{
+        '회원여부': member_labels(data['주문자 아이디']),
+        '주문 유형': is_upsell.map({True: '업셀 상품', False: '일반 상품'}),
+        '상품 수': items.reindex(data['주문번호']).to_numpy(),
+    })
+    return facts.sort_values('주문번호', ignore_index=True)
+
+
+def order_summary(raw_data: pd.DataFrame, progress=None) -> dict:
+    """정리된 라인아이템 → 매출·객단가·회원 비중·가격/상품수 분포·분위수 스케치."""
+    return merge_order_partials([order_partial(raw_data, progress)])
+
+
+ORDER_COLUMNS = ['주문번호', '총 주문 금액', '주문자 아이디', '일반/업셀 구분']
+
+
+def summarize_upload(cache_key: str, progress=None) -> dict:
+    """캐시된 업로드를 워커에서 직접 읽어 order_summary 실행."""
+    return order_summary(clean_orders(load_frame(cache_key, ORDER_COLUMNS)), progress)
+
+
+def summarize_partition(lines: pd.DataFrame, progress=None) -> dict:
+    """해시 파티션 하나의 라인아이템 → order_partial (partitioned.submit용)."""
+    return order_partial(clean_orders(lines), progress)
+
+
+def load_orders(cache_key: str, report: dict = None) -> pd.DataFrame:
+    """캐시된 업로드 → 취소 제외·주문일 변환까지 한 라인아이템 (주문 팩트 다운로드용)."""
+    raw_data = clean_orders(load_frame(cache_key, ORDER_COLUMNS + ['주문일']), report)
+    raw_data['주문일'] = parse_dates(raw_data['주문일'], report)
+    return raw_data
+
+
+def order_period(cache_key: str, progress=None) -> dict:
+    """워커에서 금액·주문일만 변환해 분석 기간과 변환 실패 보고 산출: {'start', 'end', 'report'}."""
+    report = {}
+    raw_data = clean_orders(load_frame(cache_key, ['총 주문 금액', '주문일']), report)
+    dates = parse_dates(raw_data['주문일'], report)
+    return {'start': dates.min(), 'end': dates.max(), 'report': report}
+
+
+def order_preview(cache_key: str, k: int, progress=None) -> dict:
+    """워커에서 주문 k개 표본을 뽑아 미리보기 집계: {'approx', 'amounts', 'n_sampled', 'n_orders'}.
+
+    amounts: 표본 주문의 총 주문 금액 (주문당 1행, 평균 객단가 신뢰구간용)
+    """
+    sample, n_sampled, n_orders = sample_orders(clean_orders(load_frame(cache_key, ORDER_COLUMNS)), '주문번호', k)
+    return {'approx': order_summary(sample), 'amounts': dedup_orders(sample)['총 주문 금액'].to_numpy(np.float64),
+            'n_sampled': n_sampled, 'n_orders': n_orders}
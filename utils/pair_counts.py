@@ -0,0 +1,76 @@
+"""상품 조합(함께 구매) 집계."""
+import itertools
+from collections import Counter
+
+from utils.parsing import parse_amounts
+from utils.progressive import sample_orders
+from utils.upload_cache import load_frame
+
+PROGRESS_STEPS = 20
+PAIR_COLUMNS = ['주문번호', '상품명', '총 주문 금액', '일반/업셀 구분']
+
+
+def count_pairs(data, progress=None):
+    """주문번호별 상품 조합 수와 일반→업셀 조합 수를 집계.
+
+    data: '주문번호', '상품명', '일반/업셀 구분' 컬럼을 가진 라인아이템 프레임.
+    반환: (combination_counts, combination_counts_upsell)
+    """
+    combination_counts = Counter()
+    combination_counts_upsell = Counter()
+    groups = data.groupby('주문번호', sort=False)
+    n_groups = groups.ngroups
+    report_every = max(n_groups // PROGRESS_STEPS, 1)
+
+    for i, (_, order) in enumerate(groups):
+        products = order['상품명'].tolist()
+        combination_counts.update(itertools.combinations(sorted(set(products)), 2))
+
+        kinds = order['일반/업셀 구분'].tolist()
+        general = [p for p, k in zip(products, kinds) if k == '일반 상품']
+        upsell = [p for p, k in zip(products, kinds) if k == '업셀 상품']
+        combination_counts_upsell.update(itertools.product(general, upsell))
+
+        if progress is not None and i % report_every == 0:
+            progress(i / n_groups, f"{i:,}/{n_groups:,} 주문")
+
+    return combination_counts, combination_counts_upsell
+
+
+def load_pair_lines(cache_key: str, report: dict = None):
+    """캐시된 업로드 → 총 주문 금액이 양수인 조합 집계용 라인아이템 (워커에서 메모리 맵으로 직접 읽음).
+
+    report: parsing 참고.
+    """
+    data = load_frame(cache_key, PAIR_COLUMNS)
+    return data[parse_amounts(data['총 주문 금액'], report) > 0]
+
+
+def count_upload_pairs(cache_key: str, progress=None):
+    """캐시된 업로드의 count_pairs (프레임 대신 캐시 키만 워커로 넘김)."""
+    return count_pairs(load_pair_lines(cache_key), progress)
+
+
+def upload_products(cache_key: str, progress=None) -> dict:
+    """워커에서 업로드의 상품 목록과 주문 수 집계 (페이지 세션은 프레임 대신 이 결과만 받음).
+
+    반환: {'products'(정렬된 상품명), 'upsell_products'(업셀 라인의 상품명), 'product_orders'(상품별 주문 수 Counter),
+           'n_orders', 'report'(금액 변환 실패 보고)}
+    """
+    report = {}
+    data = load_pair_lines(cache_key, report)
+    names = data['상품명'].dropna()
+    return {
+        'products': sorted(names.unique()),
+        'upsell_products': set(data.loc[data['일반/업셀 구분'] == '업셀 상품', '상품명'].dropna()),
+        'product_orders': Counter(data.drop_duplicates(subset=['주문번호', '상품명'])['상품명']),
+        'n_orders': int(data['주문번호'].nunique()),
+        'report': report,
+    }
+
+
+def pair_preview(cache_key: str, k: int, progress=None) -> dict:
+    """워커에서 주문 k개 표본의 조합 수 집계: {'counts', 'counts_upsell', 'n_sampled', 'n_orders'}."""
+    sample, n_sampled, n_orders = sample_orders(load_pair_lines(cache_key), '주문번호', k)
+    counts, counts_upsell = count_pairs(sample) if n_sampled < n_orders else (Counter(), Counter())
+    return {'counts': counts, 'counts_upsell': counts_upsell, 'n_sampled': n_sampled, 'n_orders': n_orders}
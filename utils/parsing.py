@@ -0,0 +1,114 @@
+"""주문 내보내기 필드 파서: 금액("12,000원", "₩1,200", "3000 KRW")과 날짜("2025.08.21 14:03", "2025-08-21 오후 2:03:00").
+
+표본으로 형식을 한 번 판별한 뒤 열 전체를 명시적 형식으로 벡터 변환한다 (행마다 형식 추론 없음).
+판별한 형식으로 안 되는 행만 느린 범용 변환을 다시 시도하고, 그래도 안 되는 행은 거부 건수로 보고한다.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+SAMPLE_ROWS = 1000
+AMOUNT_JUNK = r"[,\s원₩]|KRW"       # 천 단위 구분자·통화 표기
+NUMBER = r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?"
+
+# 흔한 한국 커머스 내보내기 날짜 형식 (오전/오후는 AM/PM으로 바꾼 뒤 %p 형식으로 판별)
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S",
+    "%Y.%m.%d %H:%M:%S", "%Y.%m.%d %H:%M", "%Y.%m.%d",
+    "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d",
+    "%Y. %m. %d. %H:%M:%S", "%Y. %m. %d. %H:%M", "%Y. %m. %d.",
+    "%Y년 %m월 %d일 %H:%M", "%Y년 %m월 %d일",
+    "%Y%m%d%H%M%S", "%Y%m%d",
+    "%Y-%m-%d %I:%M:%S %p", "%Y-%m-%d %I:%M %p",
+    "%Y.%m.%d %I:%M:%S %p", "%Y.%m.%d %I:%M %p",
+    "%Y. %m. %d. %I:%M:%S %p", "%Y. %m. %d. %I:%M %p",
+]
+MERIDIEM = r"(오전|오후)\s*(\d{1,2}:\d{2}(?::\d{2})?)"
+
+
+def _text(values: pd.Series) -> pd.Series:
+    """열 → Arrow 문자열 (문자열 연산이 파이썬 루프 대신 Arrow 커널로 실행됨). 앞뒤 공백 제거."""
+    return values.astype(pd.ArrowDtype(pa.string())).str.strip()
+
+
+def _sample(text: pd.Series) -> pd.Series:
+    """빈 값을 뺀 고른 간격 표본 (정렬된 파일에서도 앞부분만 보지 않도록)."""
+    text = text[text.notna() & (text != "")]
+    step = max(len(text) // SAMPLE_ROWS, 1)
+    return text.iloc[::step].head(SAMPLE_ROWS)
+
+
+def _report(report, name, fmt, text, parsed):
+    """빈 값이 아닌데 변환되지 않은 행 수와 예시를 report[name]에 기록."""
+    if report is None:
+        return
+    rejected = parsed.isna().to_numpy() & (text.notna() & (text != "")).to_numpy(dtype=bool, na_value=False)
+    report[name] = {"format": fmt, "rejected": int(rejected.sum()),
+                    "examples": text[rejected].drop_duplicates().head(5).tolist()}
+
+
+def parse_amounts(values: pd.Series, report: dict = None) -> pd.Series:
+    """금액 열 → 숫자. 숫자 열은 그대로, 문자열은 구분자·통화 표기를 지운 뒤 변환 (실패는 NaN).
+
+    report(dict)를 주면 report[열 이름] = {'format', 'rejected', 'examples'}를 기록.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        _report(report, values.name, "numeric", values.iloc[:0], values.iloc[:0])
+        return values
+    raw = _text(values)
+    text = raw
+    if not _sample(text).str.fullmatch(NUMBER).all():
+        fmt = "korean"
+        text = text.str.replace(AMOUNT_JUNK, "", regex=True)
+    else:
+        fmt = "plain"
+    # 숫자 모양이 아닌 값은 null로 만든 뒤 Arrow 캐스트 (행 단위 파이썬 변환 없음)
+    numbers = text.where(text.str.fullmatch(NUMBER).fillna(False)).astype(pd.ArrowDtype(pa.float64()))
+    parsed = pd.Series(numbers.to_numpy(dtype="float64", na_value=np.nan), index=values.index, name=values.name)
+    _report(report, values.name, fmt, raw, parsed)
+    return parsed
+
+
+def detect_date_format(text: pd.Series):
+    """표본에서 가장 많이 변환되는 DATE_FORMATS 형식 (없으면 None)."""
+    sample = _sample(text).to_numpy(dtype=object)
+    if not len(sample):
+        return None
+    scores = [(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum(), -i, fmt)
+              for i, fmt in enumerate(DATE_FORMATS)]
+    best, _, fmt = max(scores)
+    return fmt if best else None
+
+
+def parse_dates(values: pd.Series, report: dict = None) -> pd.Series:
+    """날짜 열 → datetime64. 표본으로 형식을 정해 한 번에 변환하고, 안 맞는 행만 범용 변환으로 재시도.
+
+    report(dict)를 주면 report[열 이름] = {'format', 'rejected', 'examples'}를 기록.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        _report(report, values.name, "datetime", values.iloc[:0], values.iloc[:0])
+        return values
+    raw = _text(values)
+    text = raw
+    if _sample(text).str.contains("오전|오후", regex=True).any():
+        text = (text.str.replace(MERIDIEM, r"\2 \1", regex=True)
+                .str.replace("오전", "AM").str.replace("오후", "PM"))
+    fmt = detect_date_format(text)
+    strings = text.to_numpy(dtype=object, na_value=None)
+    parsed = pd.Series(pd.to_datetime(strings, format=fmt, errors="coerce") if fmt
+                       else pd.to_datetime(strings, format="mixed", errors="coerce"),
+                       index=values.index, name=values.name)
+    retry = parsed.isna().to_numpy() & (text.notna() & (text != "")).to_numpy(dtype=bool, na_value=False)
+    if fmt and retry.any():
+        parsed[retry] = pd.to_datetime(strings[retry], format="mixed", errors="coerce")
+    _report(report, values.name, fmt or "mixed", raw, parsed)
+    return parsed
+
+
+def warn_rejected(report: dict):
+    """변환하지 못한 행이 있으면 열별 건수와 예시를 경고로 표시."""
+    lines = [f"- `{name}`: {info['rejected']:,}행 (예: {', '.join(map(repr, info['examples']))})"
+             for name, info in report.items() if info["rejected"]]
+    if lines:
+        st.warning("숫자/날짜로 읽지 못한 값은 빈 값으로 처리했습니다 (금액·날짜가 빈 행은 집계에서 제외).\n" + "\n".join(lines))
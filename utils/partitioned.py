@@ -0,0 +1,126 @@
+"""주문번호 해시 파티션 map-reduce: 큰 업로드의 주문 집계를 공유 프로세스 풀의 여러 코어로 나눠 실행.
+
+1단계: 행 구간별로 주문번호를 해시해 파티션 번호 배열(.npy)을 채운다 (워커마다 겹치지 않는 구간을 기록).
+2단계: 파티션마다 워커가 자기 행만 골라 부분 집계를 만든다. 같은 주문의 라인은 항상 같은 파티션에
+있으므로 부분 집계를 더하면 단일 패스와 같은 숫자가 된다.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.jobs import get_runner, input_key
+from utils.upload_cache import CACHE_DIR, arrow_table, load_frame
+
+N_PARTITIONS = min(os.cpu_count() or 1, 16)
+PARALLEL_MIN_ROWS = int(os.environ.get("TOOLKIT_PARALLEL_MIN_ROWS", 300_000))  # 이보다 작은 업로드는 작업 하나로 충분
+
+
+def _parts_path(cache_key: str, column: str, n_partitions: int) -> str:
+    return os.path.join(CACHE_DIR, f"{input_key(cache_key, column, n_partitions)}.parts.npy")
+
+
+def hash_partitions(values, n_partitions: int) -> np.ndarray:
+    """키 값 → 파티션 번호 (문자열로 통일 후 해시하므로 숫자/문자 주문번호가 섞여도 같은 주문은 같은 파티션)."""
+    hashed = pd.util.hash_array(pd.Series(values).astype(str).to_numpy(object))
+    return (hashed % np.uint64(n_partitions)).astype(np.uint8)
+
+
+def _fill_partitions(cache_key, column, n_partitions, path, start, stop, progress=None):
+    """1단계 워커: [start, stop) 행의 파티션 번호를 공유 .npy 파일에 기록."""
+    values = arrow_table(cache_key, [column]).column(0).slice(start, stop - start).to_pandas()
+    parts = np.load(path, mmap_mode="r+")
+    parts[start:stop] = hash_partitions(values, n_partitions)
+    parts.flush()
+
+
+def _map_partition(fn, cache_key, columns, path, part, *args, progress=None):
+    """2단계 워커: 파티션 part의 행만 메모리 맵에서 골라 fn(lines, *args) 실행."""
+    rows = np.flatnonzero(np.load(path, mmap_mode="r") == part)
+    return fn(load_frame(cache_key, columns, rows), *args, progress=progress)
+
+
+class PartitionedJob:
+    """파티션 작업 묶음 (Job과 같은 done/progress/result 인터페이스).
+
+    해시 단계 작업이 모두 끝나면 그 완료 콜백에서 파티션별 집계 작업을 제출하므로, 기다리는 세션이 없어도 진행된다.
+    done()은 상태만 읽으므로 실행기가 완료 여부를 확인할 때 호출해도 안전.
+    """
+
+    def __init__(self, runner, key, fn, merge, cache_key, columns, args, column, n_partitions):
+        self.key = key
+        self.submitted_at = time.time()
+        self._runner = runner
+        self._fn, self._merge, self._args = fn, merge, args
+        self._cache_key, self._columns = cache_key, columns
+        self._n = n_partitions
+        self._path = _parts_path(cache_key, column, n_partitions)
+        self._lock = threading.Lock()
+        self._maps = None
+        self._result = None
+        self._hashes = []
+        if os.path.exists(self._path):
+            self._advance()
+            return
+        n_rows = arrow_table(cache_key).num_rows
+        self._tmp = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        np.lib.format.open_memmap(self._tmp, mode="w+", dtype=np.uint8, shape=(n_rows,)).flush()
+        bounds = np.linspace(0, n_rows, n_partitions + 1).astype(np.int64)
+        self._hashes = [
+            runner.submit(input_key("hash_partitions", self._tmp, start), _fill_partitions,
+                          cache_key, column, n_partitions, self._tmp, int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for job in self._hashes:
+            job.future.add_done_callback(lambda _: self._advance())
+
+    def _advance(self):
+        """해시 단계가 모두 끝났으면 (한 번만) 파티션별 집계 작업 제출. 해시 단계가 실패하면 집계 없이 종료."""
+        with self._lock:
+            if self._maps is not None or not all(job.done() for job in self._hashes):
+                return
+            if any(job.future.exception() is not None for job in self._hashes):
+                self._maps = []
+                return
+            if self._hashes:
+                os.replace(self._tmp, self._path)
+            self._maps = [
+                self._runner.submit(input_key(self.key, part), _map_partition, self._fn, self._cache_key,
+                                    self._columns, self._path, part, *self._args)
+                for part in range(self._n)
+            ]
+
+    def done(self) -> bool:
+        return self._maps is not None and all(job.done() for job in self._maps)
+
+    def progress(self):
+        if self._maps is None:
+            return 0.1 * sum(job.done() for job in self._hashes) / max(len(self._hashes), 1), "파티션 나누는 중"
+        finished = sum(job.done() for job in self._maps)
+        partial = sum(job.progress()[0] for job in self._maps)
+        return 0.1 + 0.9 * partial / max(self._n, 1), f"파티션 {finished}/{self._n} 완료"
+
+    def result(self):
+        with self._lock:
+            if self._result is None:
+                for job in self._hashes:
+                    job.result()    # 해시 단계 실패는 여기서 그대로 올림
+                self._result = self._merge([job.result() for job in self._maps])
+            return self._result
+
+
+def submit(op: str, fn, merge, cache_key: str, columns, *args, column: str = "주문번호",
+           n_partitions: int = N_PARTITIONS) -> PartitionedJob:
+    """fn(파티션 라인아이템, *args, progress=...)을 파티션마다 실행하고 merge(부분 결과 목록)로 합치는 작업.
+
+    columns: 워커가 읽을 컬럼 (None이면 전체). column: 파티션을 나눌 키 컬럼.
+
+    공유 실행기(jobs.JobRunner)에 등록하므로 같은 op·업로드·인자의 작업은 세션 간에 공유되고,
+    실행 중인 작업은 내보내지 않는다. 결과는 jobs.wait로 기다림.
+    """
+    key = input_key("partitioned", op, cache_key, n_partitions, *args)
+    runner = get_runner()
+    return runner.register(key, lambda: PartitionedJob(runner, key, fn, merge, cache_key, columns, args,
+                                                       column, n_partitions))
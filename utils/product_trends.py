@@ -0,0 +1,78 @@
+"""상품 × 일자 판매 시계열 (상품별 성과 분석)."""
+import numpy as np
+import pandas as pd
+
+from utils.parsing import parse_amounts, parse_dates
+
+WINDOWS = (7, 28)       # 롤링 합계 기간(일)
+SPARK_WEEKS = 26        # 스파크라인에 표시할 최근 주 수
+
+
+def growth_rate(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """직전 기간 대비 증감률(%). 직전 기간 판매가 없으면 NaN."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(previous > 0, (current / previous - 1) * 100.0, np.nan)
+
+
+def window_sum(product: np.ndarray, age: np.ndarray, values: np.ndarray, n_products: int,
+               start: int, stop: int) -> np.ndarray:
+    """마지막 날 기준 age가 [start, stop)일 전인 판매만 상품별로 합산."""
+    mask = (age >= start) & (age < stop)
+    return np.bincount(product[mask], weights=values[mask], minlength=n_products)
+
+
+def product_trends(df: pd.DataFrame, keys, date_col: str, qty_col: str, amount_col: str):
+    """라인아이템 → 상품별 일별 수량·매출 시계열과 추이 지표.
+
+    상품 × 일자 그리드는 판매가 있는 칸만 담은 희소 형태(한 번의 groupby)로 만들어
+    상품 수만 수만 개여도 (상품 수 × 일수) 크기의 밀집 행렬을 만들지 않는다.
+    반환: (추이 지표 프레임(keys 정렬 순서), 일별 판매 프레임(상품 번호·일자 정렬), 일자 인덱스)
+    추이 지표: 최근 7/28일 수량·매출 합계와 직전 같은 기간 대비 증감률, 주별 매출 스파크라인.
+    """
+    grouped = df.groupby(keys, sort=True)
+    index = grouped.size().index
+    n_products = len(index)
+    dates = parse_dates(df[date_col]).dt.normalize()
+    lines = pd.DataFrame({
+        '상품 번호': grouped.ngroup().to_numpy(),
+        '일자': dates.to_numpy(),
+        '수량': parse_amounts(df[qty_col]).fillna(0).to_numpy(dtype=np.float64),
+        '매출': parse_amounts(df[amount_col]).fillna(0).to_numpy(dtype=np.float64),
+    })
+    lines = lines[(lines['상품 번호'] >= 0) & lines['일자'].notna()]
+    daily = lines.groupby(['상품 번호', '일자'], sort=True).sum().reset_index()
+
+    if daily.empty:
+        return pd.DataFrame(index=index), daily, pd.DatetimeIndex([])
+
+    first, last = daily['일자'].min(), daily['일자'].max()
+    product = daily['상품 번호'].to_numpy(dtype=np.int64)
+    age = (last - daily['일자']).dt.days.to_numpy(dtype=np.int64)  # 마지막 날로부터 며칠 전인지
+
+    trends = {}
+    for window in WINDOWS:
+        for label in ('수량', '매출'):
+            values = daily[label].to_numpy()
+            current = window_sum(product, age, values, n_products, 0, window)
+            previous = window_sum(product, age, values, n_products, window, 2 * window)
+            trends[f'최근 {window}일 {label}'] = current
+            trends[f'{window}일 {label} 증감률(%)'] = growth_rate(current, previous)
+
+    # 마지막 날 기준 7일 단위 주별 매출 (LineChartColumn 용 리스트)
+    n_weeks = min(SPARK_WEEKS, int(age.max()) // 7 + 1)
+    recent = age < n_weeks * 7
+    week = n_weeks - 1 - age[recent] // 7
+    weekly = np.bincount(product[recent] * n_weeks + week, weights=daily['매출'].to_numpy()[recent],
+                         minlength=n_products * n_weeks).reshape(n_products, n_weeks)
+    trends['주별 매출 추이'] = weekly.tolist()
+
+    day_index = pd.date_range(first, last, freq='D')
+    return pd.DataFrame(trends, index=index), daily, day_index
+
+
+def daily_series(daily: pd.DataFrame, product_no: int, day_index: pd.DatetimeIndex) -> pd.DataFrame:
+    """희소 일별 판매 프레임에서 한 상품의 일별 수량·매출을 전체 기간(판매 없는 날 0)으로 펼침."""
+    codes = daily['상품 번호'].to_numpy()
+    lo, hi = np.searchsorted(codes, [product_no, product_no + 1])
+    rows = daily.iloc[lo:hi].set_index('일자')[['수량', '매출']]
+    return rows.reindex(day_index, fill_value=0)
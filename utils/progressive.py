@@ -0,0 +1,49 @@
+"""대용량 업로드용 표본 기반 미리보기 (정확한 계산은 백그라운드에서 이어서 수행)."""
+import numpy as np
+import pandas as pd
+
+SAMPLE_ORDERS = 20000   # 미리보기 표본 주문 수
+Z_95 = 1.96
+
+
+def sample_orders(df: pd.DataFrame, order_col: str, k: int = SAMPLE_ORDERS, seed: int = 0):
+    """주문 단위 균등 표본 (bottom-k: 주문번호 해시가 가장 작은 k개 → 리저버 샘플과 같은 분포).
+
+    주문의 모든 라인을 함께 뽑으므로 주문당 상품 수·조합도 그대로 유지된다.
+    반환: (표본 라인 프레임, 표본 주문 수, 전체 주문 수)
+    """
+    codes, uniques = pd.factorize(df[order_col])
+    n_orders = len(uniques)
+    if n_orders <= k:
+        return df, n_orders, n_orders
+    order_hash = pd.util.hash_array(np.asarray(uniques.astype(str), dtype=object), hash_key=f"{seed:016d}")
+    picked = np.zeros(n_orders, dtype=bool)
+    picked[np.argpartition(order_hash, k)[:k]] = True
+    return df[picked[codes]], k, n_orders
+
+
+def finite_population_correction(n: int, total: int) -> float:
+    return float(np.sqrt(max(total - n, 0) / max(total - 1, 1)))
+
+
+def mean_ci(values, total: int):
+    """표본 평균과 95% 신뢰구간 반폭."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < 2:
+        return float(values.mean()) if n else float("nan"), float("nan")
+    half = Z_95 * values.std(ddof=1) / np.sqrt(n) * finite_population_correction(n, total)
+    return float(values.mean()), float(half)
+
+
+def proportion_ci(counts, n: int, total: int):
+    """표본 건수 → (비율, 95% 신뢰구간 반폭)."""
+    p = np.asarray(counts, dtype=np.float64) / max(n, 1)
+    half = Z_95 * np.sqrt(p * (1 - p) / max(n, 1)) * finite_population_correction(n, total)
+    return p, half
+
+
+def count_ci(counts, n: int, total: int):
+    """표본 건수 → 전체 규모로 환산한 건수와 95% 신뢰구간 반폭."""
+    p, half = proportion_ci(counts, n, total)
+    return p * total, half * total
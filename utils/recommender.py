@@ -0,0 +1,104 @@
+"""상품 × 상품 동시구매 유사도 기반 업셀 추천 (모든 상품의 top-k를 한 번에 계산)."""
+import numpy as np
+import pandas as pd
+
+METRICS = {"코사인": "cosine", "자카드": "jaccard", "리프트": "lift"}
+SHRINKAGE = 10          # 동시구매 주문 수가 적은 쌍의 점수를 co / (co + SHRINKAGE) 만큼 줄임
+TWO_HOP_FANOUT = 20     # 2단계 연관에 쓰는 상품별 상위 이웃 수
+TOP_K = 5
+
+# 근거 우선순위: 직접 함께 구매된 후보 → 이웃의 이웃 → 인기 업셀 (새 상품·저판매 상품용)
+SOURCES = ["함께 구매", "2단계 연관", "인기 업셀"]
+
+
+def similarity(co, n_a, n_b, n_orders: int, metric: str = "cosine", shrinkage: float = SHRINKAGE):
+    """동시구매 주문 수와 각 상품의 주문 수 → 정규화 유사도 (shrinkage 적용)."""
+    co, n_a, n_b = (np.asarray(x, dtype=np.float64) for x in (co, n_a, n_b))
+    if metric == "cosine":
+        score = co / np.sqrt(n_a * n_b)
+    elif metric == "jaccard":
+        score = co / (n_a + n_b - co)
+    elif metric == "lift":
+        score = co * n_orders / (n_a * n_b)
+    else:
+        raise ValueError(f"지원하지 않는 유사도: {metric}")
+    return score * (co / (co + shrinkage))
+
+
+def _edges(product_orders: pd.Series, combination_counts, n_orders: int, metric: str, shrinkage: float):
+    """조합 Counter → 양방향 간선 프레임 (src, dst, co, score). 상품은 product_orders 순서의 정수 코드."""
+    codes = pd.Series(np.arange(len(product_orders)), index=product_orders.index)
+    pairs = pd.DataFrame(list(combination_counts.keys()), columns=["a", "b"])
+    co = np.fromiter(combination_counts.values(), dtype=np.float64, count=len(pairs))
+    a = codes.reindex(pairs["a"]).to_numpy()
+    b = codes.reindex(pairs["b"]).to_numpy()
+    keep = ~(np.isnan(a) | np.isnan(b)) if len(pairs) else np.zeros(0, dtype=bool)
+    a, b, co = a[keep].astype(np.int64), b[keep].astype(np.int64), co[keep]
+    n = product_orders.to_numpy(dtype=np.float64)
+    score = similarity(co, n[a], n[b], n_orders, metric, shrinkage)
+    return pd.DataFrame({
+        "src": np.concatenate([a, b]), "dst": np.concatenate([b, a]),
+        "co": np.concatenate([co, co]), "score": np.concatenate([score, score]),
+    })
+
+
+def recommend(product_orders: pd.Series, combination_counts, n_orders: int, candidates,
+              k: int = TOP_K, metric: str = "cosine", shrinkage: float = SHRINKAGE, progress=None) -> pd.DataFrame:
+    """모든 상품의 추천 업셀 top-k.
+
+    product_orders: 상품명 → 그 상품이 포함된 주문 수
+    combination_counts: (상품A, 상품B) → 함께 구매된 주문 수 (count_pairs 결과)
+    candidates: 추천 대상이 될 수 있는 업셀 상품명
+    직접 함께 구매된 후보가 k개 미만이면 이웃의 이웃(2단계), 그래도 모자라면 인기 업셀로 채운다.
+    반환 컬럼: 상품명, 순위, 추천 업셀 상품, 유사도, 함께 구매 주문 수, 근거
+    """
+    if progress is not None:
+        progress(0.1, "유사도 계산 중")
+    product_orders = product_orders[product_orders > 0]
+    is_candidate = product_orders.index.isin(list(candidates))
+    edges = _edges(product_orders, combination_counts, n_orders, metric, shrinkage)
+
+    direct = edges[is_candidate[edges["dst"].to_numpy()]].assign(tier=0)
+
+    if progress is not None:
+        progress(0.4, "2단계 연관 탐색 중")
+    # 2단계 (직접 후보가 k개 미만인 상품만): src의 상위 이웃 m → m의 상위 후보
+    # 점수는 두 간선 점수의 곱 중 최댓값. 양쪽 모두 상위 TWO_HOP_FANOUT개로 잘라 조인 크기를 제한
+    def top(frame):
+        return (frame.sort_values(["src", "score"], ascending=[True, False])
+                .groupby("src", sort=False).head(TWO_HOP_FANOUT)[["src", "dst", "score"]])
+    n_direct = np.bincount(direct["src"].to_numpy(), minlength=len(product_orders))
+    sparse = edges[n_direct[edges["src"].to_numpy()] < k]
+    hop = top(sparse).merge(top(direct), left_on="dst", right_on="src", suffixes=("", "_2"))
+    hop = (hop.assign(dst=hop["dst_2"], score=hop["score"] * hop["score_2"])
+           .loc[lambda d: d["dst"] != d["src"], ["src", "dst", "score"]]
+           .groupby(["src", "dst"], as_index=False)["score"].max()
+           .assign(co=0.0, tier=1))
+
+    # 인기 업셀: 주문 수 상위 후보 (자기 자신 제외를 위해 k+1개)
+    popular = np.flatnonzero(is_candidate)[np.argsort(-product_orders.to_numpy()[is_candidate], kind="stable")][:k + 1]
+    n_products = len(product_orders)
+    fallback = pd.DataFrame({
+        "src": np.repeat(np.arange(n_products), len(popular)),
+        "dst": np.tile(popular, n_products),
+        "score": np.tile(product_orders.to_numpy(dtype=np.float64)[popular] / max(n_orders, 1), n_products),
+        "co": 0.0, "tier": 2,
+    })
+
+    if progress is not None:
+        progress(0.8, "상품별 top-k 정렬 중")
+    ranked = (pd.concat([direct, hop, fallback], ignore_index=True)
+              .loc[lambda d: d["src"] != d["dst"]]
+              .sort_values(["src", "tier", "score"], ascending=[True, True, False], kind="stable")
+              .drop_duplicates(["src", "dst"])
+              .groupby("src", sort=False).head(k))
+
+    names = product_orders.index.to_numpy()
+    return pd.DataFrame({
+        "상품명": names[ranked["src"].to_numpy()],
+        "순위": ranked.groupby("src", sort=False).cumcount().to_numpy() + 1,
+        "추천 업셀 상품": names[ranked["dst"].to_numpy()],
+        "유사도": np.where(ranked["tier"] < 2, ranked["score"], np.nan),
+        "함께 구매 주문 수": ranked["co"].to_numpy().astype(np.int64),
+        "근거": np.asarray(SOURCES)[ranked["tier"].to_numpy()],
+    })
@@ -0,0 +1,151 @@
+"""업로드 CSV 컬럼 매핑 프로필: 헤더만 읽어 쇼핑몰 플랫폼을 판별하고 표준 컬럼명으로 정리.
+
+페이지는 항상 표준 컬럼명(카페24 주문 내보내기 기준)으로 데이터를 다룬다.
+플랫폼별 원본 컬럼명은 PROFILES에 두고, 추가 프로필은 PROFILE_DIR의 JSON 파일로 등록한다.
+
+    {"name": "my-shop", "columns": {"주문번호": "Order No", "주문일": ["Order Date", "주문일시"], ...}}
+
+한 표준 컬럼에 여러 원본 이름(별칭)을 리스트로 줄 수 있다.
+"""
+import glob
+import json
+import os
+from io import BytesIO
+
+import pandas as pd
+
+from utils.jobs import APP_ROOT
+from utils.upload_cache import cache_upload, load_frame
+
+PROFILE_DIR = os.environ.get("TOOLKIT_PROFILE_DIR", os.path.join(APP_ROOT, "column_profiles"))
+
+# 표준 컬럼명 → 설명
+CANONICAL_COLUMNS = {
+    "주문번호": "주문 식별자 (라인아이템마다 반복)",
+    "주문일": "주문 일시",
+    "주문자 아이디": "회원 아이디 (비회원은 빈 값)",
+    "총 주문 금액": "주문 총액 (주문별 동일 값)",
+    "총 상품수": "주문당 상품 수",
+    "일반/업셀 구분": "라인 구분 (\"일반 상품\" / \"업셀 상품\")",
+    "상품명": "상품명",
+    "상품 코드": "상품 코드",
+    "구매 수량": "라인 수량",
+    "상품 단가": "라인 단가 (판매가)",
+    "상품 구매 금액": "라인 금액 (단가 × 수량)",
+}
+
+# 플랫폼별 원본 컬럼명 (일반/업셀 구분은 알파업셀 내보내기에서 추가되는 컬럼)
+PROFILES = {
+    "cafe24": {col: col for col in CANONICAL_COLUMNS},
+    "smartstore": {
+        "주문번호": "주문번호",
+        "주문일": ["주문일시", "결제일"],
+        "주문자 아이디": "구매자ID",
+        "총 주문 금액": "총 주문금액",
+        "일반/업셀 구분": "일반/업셀 구분",
+        "상품명": "상품명",
+        "상품 코드": "상품번호",
+        "구매 수량": "수량",
+        "상품 단가": "상품가격",
+        "상품 구매 금액": "최종 상품별 총 주문금액",
+    },
+    "godomall": {
+        "주문번호": "주문번호",
+        "주문일": ["주문일자", "주문일시"],
+        "주문자 아이디": "회원아이디",
+        "총 주문 금액": "총 결제금액",
+        "총 상품수": "총 상품수량",
+        "일반/업셀 구분": "일반/업셀 구분",
+        "상품명": "상품명",
+        "상품 코드": "상품코드",
+        "구매 수량": "수량",
+        "상품 단가": "판매가",
+    },
+    "imweb": {
+        "주문번호": "주문번호",
+        "주문일": "주문일",
+        "주문자 아이디": "주문자 아이디",
+        "총 주문 금액": "최종주문금액",
+        "일반/업셀 구분": "일반/업셀 구분",
+        "상품명": "상품명",
+        "상품 코드": "상품고유번호",
+        "구매 수량": "구매수량",
+        "상품 단가": "판매가",
+    },
+}
+
+
+class SchemaError(ValueError):
+    """업로드 헤더가 어떤 프로필과도 맞지 않음 (전체 파싱 전에 발생)."""
+
+
+def _normalize(name) -> str:
+    return str(name).replace("\ufeff", "").strip()
+
+
+def load_profiles() -> dict:
+    """기본 프로필 + PROFILE_DIR의 JSON 프로필 (같은 이름이면 JSON이 우선)."""
+    profiles = dict(PROFILES)
+    for path in sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        profiles[spec.get("name") or os.path.splitext(os.path.basename(path))[0]] = spec["columns"]
+    return profiles
+
+
+def read_header(uploaded_file) -> list:
+    """CSV 첫 줄만 파싱해 컬럼명 목록 반환."""
+    return [_normalize(c) for c in pd.read_csv(BytesIO(uploaded_file.getvalue()), nrows=0).columns]
+
+
+def resolve(profile: dict, header) -> dict:
+    """프로필 → {원본 컬럼: 표준 컬럼} (헤더에 있는 컬럼만)."""
+    present = set(header)
+    mapping = {}
+    for canonical, sources in profile.items():
+        for source in [sources] if isinstance(sources, str) else sources:
+            if _normalize(source) in present:
+                mapping[_normalize(source)] = canonical
+                break
+    return mapping
+
+
+def detect_profile(header, required):
+    """필수 표준 컬럼을 모두 제공하는 프로필 중 가장 많은 컬럼이 맞는 것을 선택.
+
+    반환: (프로필 이름, {원본 컬럼: 표준 컬럼}). 맞는 프로필이 없으면 SchemaError.
+    """
+    header = [_normalize(c) for c in header]
+    best, best_missing = None, None
+    for name, profile in load_profiles().items():
+        mapping = resolve(profile, header)
+        missing = [col for col in required if col not in mapping.values()]
+        if not missing and (best is None or len(mapping) > len(best[1])):
+            best = (name, mapping)
+        if best_missing is None or len(missing) < len(best_missing[1]):
+            best_missing = (name, missing)
+    if best is None:
+        name, missing = best_missing
+        raise SchemaError(
+            f"업로드한 CSV의 컬럼 구성을 인식하지 못했습니다. "
+            f"가장 가까운 형식({name}) 기준 누락 컬럼: {', '.join(missing)}"
+        )
+    return best
+
+
+def open_upload(uploaded_file, required, optional=()):
+    """헤더로 프로필을 판별한 뒤 매핑된 컬럼만 파싱·캐시.
+
+    같은 파일·프로필이면 어느 페이지에서 열어도 한 번만 파싱된다.
+    반환: (캐시 키, 프로필 이름, 이 페이지가 쓸 수 있는 표준 컬럼 목록)
+    """
+    name, mapping = detect_profile(read_header(uploaded_file), required)
+    key = cache_upload(uploaded_file, mapping)
+    available = set(mapping.values())
+    return key, name, [col for col in dict.fromkeys([*required, *optional]) if col in available]
+
+
+def read_mapped(uploaded_file, required, optional=()) -> pd.DataFrame:
+    """open_upload + 필요한 표준 컬럼만 로드."""
+    key, _, columns = open_upload(uploaded_file, required, optional)
+    return load_frame(key, columns)
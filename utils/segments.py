@@ -0,0 +1,74 @@
+"""세그먼트 × 임계값 이용 전후 비교 (이용 전후 비교)."""
+import numpy as np
+import pandas as pd
+
+TOP_PRODUCTS = 5
+
+
+def order_segments(lines: pd.DataFrame, order_ids, top_products: int = TOP_PRODUCTS) -> pd.DataFrame:
+    """라인아이템 → 주문별 세그먼트 소속 (bool 프레임, 행 순서는 order_ids).
+
+    '전체'는 항상 포함. 컬럼이 있으면 회원/비회원, 업셀/일반 주문, 주문 수 상위 상품 포함 주문을 추가.
+    """
+    segments = {"전체": np.ones(len(order_ids), dtype=bool)}
+    grouped = lines.groupby("주문번호", sort=False)
+
+    if "주문자 아이디" in lines.columns:
+        buyer = grouped["주문자 아이디"].first().reindex(order_ids)
+        member = (buyer.notna() & (buyer.astype(str).str.strip() != "")).to_numpy()
+        segments["회원"], segments["비회원"] = member, ~member
+
+    if "일반/업셀 구분" in lines.columns:
+        is_upsell = (lines["일반/업셀 구분"] == "업셀 상품").groupby(lines["주문번호"], sort=False).any()
+        upsell = is_upsell.reindex(order_ids, fill_value=False).to_numpy(dtype=bool)
+        segments["업셀 주문"], segments["일반 주문"] = upsell, ~upsell
+
+    if "상품명" in lines.columns and top_products:
+        pairs = lines[["주문번호", "상품명"]].drop_duplicates()
+        top = pairs["상품명"].value_counts().head(top_products).index
+        pairs = pairs[pairs["상품명"].isin(top)]
+        contains = (pd.crosstab(pairs["주문번호"], pairs["상품명"]) > 0).reindex(order_ids, fill_value=False)
+        for product in top:
+            segments[f"상품: {product}"] = contains[product].to_numpy(dtype=bool)
+
+    return pd.DataFrame(segments)
+
+
+def threshold_grid(values, is_after, membership: pd.DataFrame, thresholds) -> pd.DataFrame:
+    """모든 세그먼트 × 임계값의 '임계값 이상 주문 비중'을 이전/이후 기간별로 한 번에 계산.
+
+    주문을 세그먼트 소속 패턴(고유 조합)으로 묶고, (패턴, 기간, 임계값 구간)별 건수를 bincount 한 번으로 센 뒤
+    구간 축 역누적합으로 '임계값 이상' 건수를 만든다. 세그먼트 값은 패턴 건수의 행렬곱으로 합산.
+    반환 컬럼: 세그먼트, 임계값, 이전 비중, 이후 비중, 변화(%p), 이전 주문 수, 이후 주문 수
+    """
+    values = np.asarray(values, dtype=np.float64)
+    period = np.asarray(is_after, dtype=np.int64)
+    thresholds = np.asarray(sorted(thresholds), dtype=np.float64)
+    n_bins = len(thresholds) + 1
+
+    patterns, pattern = np.unique(membership.to_numpy(dtype=bool), axis=0, return_inverse=True)
+    pattern = pattern.ravel()
+    # 구간 = 값 이하인 임계값 개수 → 값 >= thresholds[t] ⇔ 구간 > t
+    bins = np.searchsorted(thresholds, values, side="right")
+    bins[np.isnan(values)] = 0      # 변환 실패(NaN)는 (x >= t)와 같이 모든 임계값 미만으로 셈 (searchsorted는 맨 위 구간)
+    counts = np.bincount((pattern * 2 + period) * n_bins + bins,
+                         minlength=len(patterns) * 2 * n_bins).reshape(len(patterns), 2, n_bins)
+    at_least = np.cumsum(counts[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:]   # (패턴, 기간, 임계값)
+    totals = counts.sum(axis=2)                                              # (패턴, 기간)
+
+    weights = patterns.T.astype(np.int64)                                    # (세그먼트, 패턴)
+    seg_at_least = np.einsum("sp,pkt->skt", weights, at_least)
+    seg_totals = weights @ totals                                            # (세그먼트, 기간)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = seg_at_least / seg_totals[:, :, None]
+
+    n_seg, n_thr = len(membership.columns), len(thresholds)
+    return pd.DataFrame({
+        "세그먼트": np.repeat(membership.columns.to_numpy(), n_thr),
+        "임계값": np.tile(thresholds, n_seg),
+        "이전 비중": shares[:, 0, :].ravel(),
+        "이후 비중": shares[:, 1, :].ravel(),
+        "변화(%p)": (shares[:, 1, :] - shares[:, 0, :]).ravel() * 100,
+        "이전 주문 수": np.repeat(seg_totals[:, 0], n_thr),
+        "이후 주문 수": np.repeat(seg_totals[:, 1], n_thr),
+    })
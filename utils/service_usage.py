@@ -0,0 +1,147 @@
+"""타사 서비스 사용 현황 집계 (스냅샷 간 이동 흐름)."""
+import numpy as np
+import pandas as pd
+
+NEW_LABEL = "(신규 도입)"
+DROP_LABEL = "(이용 중단)"
+
+
+def _sorted_isin(values: np.ndarray, sorted_keys: np.ndarray) -> np.ndarray:
+    """정렬된 정수 키 배열에 대한 멤버십 검사 (이진 탐색)."""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(sorted_keys, values)
+    pos = np.minimum(pos, len(sorted_keys) - 1)
+    return sorted_keys[pos] == values
+
+
+def _rank_in_group(groups: np.ndarray) -> np.ndarray:
+    """정렬된 그룹 번호 배열 → 그룹 안에서의 순번 (0, 1, ...)."""
+    return np.arange(len(groups)) - np.searchsorted(groups, groups, side='left')
+
+
+def service_transitions(df: pd.DataFrame) -> pd.DataFrame:
+    """연속 스냅샷 사이의 shop별 서비스 이동(A→B), 신규 도입, 이용 중단 목록.
+
+    (snapshot, shop, service)를 하나의 정수 키로 인코딩해 정렬한 뒤
+    다음/이전 스냅샷 키를 이진 탐색으로 조인한다.
+    같은 shop이 한 구간에 서비스 m개를 중단하고 n개를 도입하면 서비스 이름 순으로 하나씩 짝지어
+    min(m, n)건은 이동, 남는 중단·도입은 각각 이용 중단·신규 도입으로 센다 (shop당 max(m, n)행).
+    """
+    snap_codes, snapshots = pd.factorize(df['snapshot_date'], sort=True)
+    shop_codes, shops = pd.factorize(df['shop_id'], sort=True)
+    svc_codes, services = pd.factorize(df['service_name'], sort=True)
+    n_shop, n_svc = max(len(shops), 1), max(len(services), 1)
+    step = np.int64(n_shop) * n_svc  # 스냅샷 1칸 = step
+
+    keys = np.unique((snap_codes.astype(np.int64) * n_shop + shop_codes) * n_svc + svc_codes)
+    key_snap = keys // step
+
+    # 다음 스냅샷에 같은 (shop, service)가 없으면 중단, 이전 스냅샷에 없으면 도입
+    current = keys[key_snap < len(snapshots) - 1]
+    dropped = current[~_sorted_isin(current + step, keys)]
+    following = keys[key_snap > 0]
+    added = following[~_sorted_isin(following - step, keys)] - step
+
+    flows = pd.merge(
+        pd.DataFrame({'pair': dropped // n_svc, 'rank': _rank_in_group(dropped // n_svc), 'from_code': dropped % n_svc}),
+        pd.DataFrame({'pair': added // n_svc, 'rank': _rank_in_group(added // n_svc), 'to_code': added % n_svc}),
+        on=['pair', 'rank'], how='outer', sort=True,
+    )
+    service_labels = np.asarray(services, dtype=object)
+    from_code = flows['from_code'].to_numpy()
+    to_code = flows['to_code'].to_numpy()
+    from_snap = (flows['pair'].to_numpy() // n_shop).astype(np.int64)
+    return pd.DataFrame({
+        'from_snapshot': np.asarray(snapshots)[from_snap],
+        'to_snapshot': np.asarray(snapshots)[from_snap + 1],
+        'shop_id': np.asarray(shops)[flows['pair'].to_numpy() % n_shop],
+        'from_service': np.where(np.isnan(from_code), NEW_LABEL,
+                                 service_labels[np.nan_to_num(from_code).astype(np.int64)]),
+        'to_service': np.where(np.isnan(to_code), DROP_LABEL,
+                               service_labels[np.nan_to_num(to_code).astype(np.int64)]),
+    })
+
+
+def transition_matrix(flows: pd.DataFrame) -> pd.DataFrame:
+    """이동 목록 → 출발 서비스 × 도착 서비스 shop 수 행렬."""
+    return pd.crosstab(flows['from_service'], flows['to_service'])
+
+
+def service_bitsets(df: pd.DataFrame) -> dict:
+    """(스냅샷, shop)별 사용 서비스 집합 → 비트셋 (서비스 i = 비트 i, 64개마다 uint64 한 칸).
+
+    반환: {'snapshots', 'shops', 'services', 'snapshot': 행별 스냅샷 번호, 'shop': 행별 shop 번호,
+           'masks': (행 수, 칸 수) uint64}. 행은 서비스를 하나 이상 쓰는 (스냅샷, shop)만, 스냅샷·shop 순.
+    """
+    snap_codes, snapshots = pd.factorize(df['snapshot_date'], sort=True)
+    shop_codes, shops = pd.factorize(df['shop_id'], sort=True)
+    svc_codes, services = pd.factorize(df['service_name'], sort=True)
+    n_shop, n_svc = max(len(shops), 1), max(len(services), 1)
+    n_words = (n_svc + 63) // 64
+
+    # (스냅샷·shop, 서비스) 중복 제거 후 정렬 → 같은 행의 비트는 서로 달라서 합 = OR
+    keys = np.sort((snap_codes.astype(np.int64) * n_shop + shop_codes) * n_svc + svc_codes)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    pair, svc = keys // n_svc, keys % n_svc
+    starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]])
+    bits = np.left_shift(np.uint64(1), (svc % 64).astype(np.uint64))
+    masks = np.zeros((len(starts), n_words), dtype=np.uint64)
+    for word in range(n_words):
+        if len(starts):
+            masks[:, word] = np.add.reduceat(np.where(svc // 64 == word, bits, np.uint64(0)), starts)
+    return {
+        'snapshots': snapshots, 'shops': shops, 'services': services,
+        'snapshot': pair[starts] // n_shop, 'shop': pair[starts] % n_shop, 'masks': masks,
+    }
+
+
+def has_service(masks: np.ndarray, service: int) -> np.ndarray:
+    """비트셋 행마다 서비스 번호 service를 쓰는지 (bool 배열)."""
+    word, bit = divmod(service, 64)
+    return (masks[:, word] >> np.uint64(bit)) & np.uint64(1) == 1
+
+
+def _unpack(masks: np.ndarray, n_services: int) -> np.ndarray:
+    """비트셋 → (행 수, 서비스 수) 0/1 행렬."""
+    return np.unpackbits(np.ascontiguousarray(masks).view(np.uint8), axis=1, bitorder='little')[:, :n_services]
+
+
+def co_usage(bitsets: dict) -> dict:
+    """스냅샷별 서비스 쌍 동시 사용 shop 수와 단독 사용 shop 수.
+
+    shop 행을 그대로 곱하지 않고 스냅샷별 고유 서비스 조합(np.unique)과 그 shop 수로 계산한다
+    (조합 수는 shop 수보다 훨씬 적음).
+    반환: {'pairs': (스냅샷, 서비스, 서비스) 배열 — [t, i, j] = 스냅샷 t에 i와 j를 함께 쓰는 shop 수 (대각선 = i 사용 shop 수),
+           'exclusive': (스냅샷, 서비스) 배열 — i만 쓰는 shop 수, 'multi': 스냅샷별 2개 이상 쓰는 shop 수}
+    """
+    n_snap, n_svc = len(bitsets['snapshots']), len(bitsets['services'])
+    rows = pd.DataFrame(np.column_stack([bitsets['snapshot'].astype(np.uint64), bitsets['masks']]))
+    patterns = rows.value_counts(sort=False)     # 해시 집계 (np.unique(axis=0)의 행 정렬보다 빠름)
+    order = np.argsort(patterns.index.get_level_values(0).to_numpy(), kind='stable')
+    counts = patterns.to_numpy()[order]
+    snap = patterns.index.get_level_values(0).to_numpy()[order].astype(np.int64)
+    used = _unpack(np.column_stack([patterns.index.get_level_values(k).to_numpy()[order]
+                                    for k in range(1, rows.shape[1])]).astype(np.uint64), n_svc).astype(np.float64)
+    n_used = used.sum(axis=1).astype(np.int64)
+
+    pairs = np.zeros((n_snap, n_svc, n_svc), dtype=np.int64)
+    bounds = np.searchsorted(snap, np.arange(n_snap + 1))
+    for t in range(n_snap):
+        block = used[bounds[t]:bounds[t + 1]]
+        pairs[t] = np.rint((block * counts[bounds[t]:bounds[t + 1], None]).T @ block)   # float 행렬곱 (BLAS)
+    exclusive = np.zeros((n_snap, n_svc), dtype=np.int64)
+    single = n_used == 1
+    np.add.at(exclusive, (snap[single], used[single].argmax(axis=1)), counts[single])
+    multi = np.bincount(snap[n_used >= 2], weights=counts[n_used >= 2], minlength=n_snap).astype(np.int64)
+    return {'pairs': pairs, 'exclusive': exclusive, 'multi': multi}
+
+
+def target_shops(bitsets: dict, snapshot: int, uses: int, not_uses: int = None) -> np.ndarray:
+    """스냅샷 snapshot에서 서비스 uses는 쓰고 not_uses는 쓰지 않는 shop_id 목록."""
+    in_snap = bitsets['snapshot'] == snapshot
+    masks = bitsets['masks'][in_snap]
+    hit = has_service(masks, uses)
+    if not_uses is not None:
+        hit &= ~has_service(masks, not_uses)
+    return np.asarray(bitsets['shops'])[bitsets['shop'][in_snap][hit]]
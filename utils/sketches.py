@@ -0,0 +1,216 @@
+"""근사 집계용 스케치 (HyperLogLog 고유값 카운트, t-digest 분위수)."""
+import numpy as np
+import pandas as pd
+
+# 정밀도 p → 레지스터 2**p개, 상대 표준오차 ≈ 1.04 / sqrt(2**p)
+DEFAULT_PRECISION = 12
+
+
+def hash_values(values) -> np.ndarray:
+    """임의의 값 배열을 64비트 해시(uint64)로 변환."""
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(dtype=np.uint64)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """uint64 배열의 비트 길이(정수 연산만 사용, 부동소수 반올림 오차 없음)."""
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        m = x >= np.uint64(1 << shift)
+        n[m] += shift
+        x[m] >>= np.uint64(shift)
+    n += (x > 0).astype(np.uint8)
+    return n
+
+
+def _index_and_rank(hashes: np.ndarray, p: int):
+    """해시 → (레지스터 번호, 첫 1비트 위치) 분해."""
+    tail_bits = 64 - p
+    idx = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+    tail = hashes & np.uint64((1 << tail_bits) - 1)
+    rank = (tail_bits + 1 - _bit_length(tail).astype(np.int16)).astype(np.uint8)
+    return idx, rank
+
+
+def relative_error(p: int = DEFAULT_PRECISION) -> float:
+    """정밀도 p 스케치의 상대 표준오차."""
+    return 1.04 / np.sqrt(1 << p)
+
+
+def estimate(registers: np.ndarray) -> np.ndarray:
+    """레지스터 배열(마지막 축 = 레지스터)로부터 고유값 수 추정."""
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.power(2.0, -registers.astype(np.float64)).sum(axis=-1)
+    zeros = (registers == 0).sum(axis=-1)
+    # 작은 카디널리티 구간은 linear counting으로 보정
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class HyperLogLog:
+    """병합 가능한 HyperLogLog 고유값 스케치."""
+
+    def __init__(self, p: int = DEFAULT_PRECISION, registers=None):
+        self.p = p
+        self.registers = (np.zeros(1 << p, dtype=np.uint8) if registers is None
+                          else np.asarray(registers, dtype=np.uint8))
+
+    @classmethod
+    def from_values(cls, values, p: int = DEFAULT_PRECISION):
+        sketch = cls(p)
+        sketch.add(values)
+        return sketch
+
+    def add(self, values):
+        hashes = hash_values(values)
+        if len(hashes):
+            idx, rank = _index_and_rank(hashes, self.p)
+            np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("정밀도(p)가 다른 스케치는 병합할 수 없습니다.")
+        return HyperLogLog(self.p, np.maximum(self.registers, other.registers))
+
+    def count(self) -> float:
+        return float(estimate(self.registers))
+
+    @property
+    def error(self) -> float:
+        return relative_error(self.p)
+
+
+def grouped_registers(values, groups, n_groups: int, p: int = DEFAULT_PRECISION) -> np.ndarray:
+    """그룹 코드(0..n_groups-1)별 HLL 레지스터를 한 번에 생성 → (n_groups, 2**p)."""
+    registers = np.zeros((n_groups, 1 << p), dtype=np.uint8)
+    hashes = hash_values(values)
+    if len(hashes):
+        idx, rank = _index_and_rank(hashes, p)
+        np.maximum.at(registers, (np.asarray(groups, dtype=np.int64), idx), rank)
+    return registers
+
+
+def merge_registers(registers: np.ndarray, groups, n_groups: int) -> np.ndarray:
+    """기존 스케치들을 새 그룹(예: 일→주/월) 단위로 병합. 원본 행은 다시 보지 않음."""
+    groups = np.asarray(groups, dtype=np.int64)
+    merged = np.zeros((n_groups, registers.shape[1]), dtype=np.uint8)
+    if len(groups):
+        order = np.argsort(groups, kind="stable")
+        sorted_groups = groups[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+        merged[sorted_groups[starts]] = np.maximum.reduceat(registers[order], starts, axis=0)
+    return merged
+
+
+class TDigest:
+    """병합 가능한 t-digest 분위수 스케치 (배치 단위 벡터 압축)."""
+
+    def __init__(self, compression: float = 200, means=None, weights=None, vmin=np.inf, vmax=-np.inf):
+        self.compression = compression
+        self.means = np.asarray([] if means is None else means, dtype=np.float64)
+        self.weights = np.asarray([] if weights is None else weights, dtype=np.float64)
+        self.min = float(vmin)
+        self.max = float(vmax)
+
+    @classmethod
+    def from_values(cls, values, compression: float = 200):
+        return cls(compression).update(values)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values, weights=None):
+        """값 배치를 추가. 큰 파일은 청크마다 호출하면 스트리밍으로 동작."""
+        values = np.asarray(values, dtype=np.float64)
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64)
+        keep = np.isfinite(values)
+        values, weights = values[keep], weights[keep]
+        if len(values):
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self._compress(np.r_[self.means, values], np.r_[self.weights, weights])
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        merged = TDigest(self.compression, vmin=min(self.min, other.min), vmax=max(self.max, other.max))
+        merged._compress(np.r_[self.means, other.means], np.r_[self.weights, other.weights])
+        return merged
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        if total <= 0:
+            self.means, self.weights = means[:0], weights[:0]
+            return
+        # k1 스케일 함수: 꼬리(0, 1 근처)일수록 centroid를 잘게 유지
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        buckets = np.floor(k - k[0]).astype(np.int64)
+        new_weights = np.bincount(buckets, weights=weights)
+        new_sums = np.bincount(buckets, weights=means * weights)
+        nonzero = new_weights > 0
+        self.weights = new_weights[nonzero]
+        self.means = new_sums[nonzero] / self.weights
+
+    def _support(self):
+        total = self.count
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return (np.r_[0.0, centers, total], np.r_[self.min, self.means, self.max], total)
+
+    def quantile(self, q):
+        """분위수 추정 (q: 0~1 스칼라 또는 배열)."""
+        if not len(self.weights):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        positions, values, total = self._support()
+        result = np.interp(np.asarray(q, dtype=np.float64) * total, positions, values)
+        return result if np.ndim(q) else float(result)
+
+    def cdf(self, x):
+        """x 이하 비율 추정."""
+        if not len(self.weights):
+            return np.zeros(np.shape(x))
+        positions, values, total = self._support()
+        return np.interp(np.asarray(x, dtype=np.float64), values, positions) / total
+
+    def bin_edges(self, n_bins: int = 10, round_to: float = None) -> np.ndarray:
+        """분위수 기반 적응형 구간 경계 (가격대와 무관하게 구간별 건수가 고르게)."""
+        if not len(self.weights):
+            return np.array([])
+        edges = self.quantile(np.linspace(0, 1, n_bins + 1))
+        if round_to is None:
+            # 구간 폭 규모에 맞춘 1/2/5 × 10^n 단위로 반올림
+            gaps = np.diff(edges)
+            gaps = gaps[gaps > 0]
+            raw_step = max(gaps.min() / 2 if len(gaps) else 1.0, 1.0)
+            base = 10 ** np.floor(np.log10(raw_step))
+            round_to = base * min((m for m in (1, 2, 5, 10) if base * m >= raw_step), default=10)
+        edges = np.round(edges / round_to) * round_to
+        edges[0] = np.floor(self.min / round_to) * round_to
+        edges[-1] = max(edges[-1], np.ceil(self.max / round_to) * round_to)
+        edges = np.unique(edges)
+        if len(edges) == 1:
+            edges = np.r_[edges, edges[0] + round_to]
+        return edges
+
+    def histogram(self, edges) -> np.ndarray:
+        """구간별 건수 추정 (원본 재스캔 없이 스케치만으로 계산)."""
+        if len(edges) < 2:
+            return np.zeros(0)
+        cdf = self.cdf(edges)
+        cdf[-1] = 1.0
+        cdf[0] = 0.0
+        return np.diff(cdf) * self.count
+
+    def to_dict(self) -> dict:
+        return {"compression": self.compression, "means": self.means.tolist(),
+                "weights": self.weights.tolist(), "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TDigest":
+        return cls(data["compression"], data["means"], data["weights"], data["min"], data["max"])
@@ -0,0 +1,83 @@
+"""일/주 단위 추이 집계와 차트용 다운샘플링."""
+import altair as alt
+import numpy as np
+import pandas as pd
+
+MAX_CHART_POINTS = 400
+FREQ_OPTIONS = {"일": "D", "주": "W"}
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: 모양(피크/골)을 보존하는 다운샘플 인덱스."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 다음 버킷의 평균점을 세 번째 꼭짓점으로 사용
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), np.nanmean(y[nlo:nhi]) if nhi > nlo else y[-1]
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        picked[i + 1] = prev
+    return picked
+
+
+def downsample(frame: pd.DataFrame, x_col: str, value_cols, max_points: int = MAX_CHART_POINTS) -> pd.DataFrame:
+    """시계열 프레임 → 차트용 long 포맷(metric, x, value). 계열별로 LTTB 적용."""
+    frame = frame.sort_values(x_col)
+    xs = frame[x_col]
+    x_num = xs.astype("int64").to_numpy() if np.issubdtype(xs.dtype, np.datetime64) else xs.to_numpy()
+    parts = []
+    for col in value_cols:
+        values = frame[col].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(values))
+        idx = valid[lttb_indices(x_num[valid], values[valid], max_points)]
+        parts.append(pd.DataFrame({"metric": col, x_col: xs.to_numpy()[idx], "value": values[idx]}))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["metric", x_col, "value"])
+
+
+def order_trend(orders: pd.DataFrame, date_col: str, amount_col: str, items_col: str,
+                freq: str = "D", amount_threshold=None, items_threshold=None) -> pd.DataFrame:
+    """주문 단위 프레임 → 기간별 주문 수, 객단가, 주문당 상품수, 임계값 이상 비중."""
+    period = orders[date_col].dt.to_period(freq).dt.start_time.rename("기간")
+    metrics = {
+        "주문 수": orders[amount_col].notna(),
+        "객단가": orders[amount_col],
+        "주문당 상품수": orders[items_col],
+    }
+    if items_threshold is not None:
+        metrics[f"{items_threshold}개 이상 비중"] = orders[items_col] >= items_threshold
+    if amount_threshold is not None:
+        metrics[f"{amount_threshold:,}원 이상 비중"] = orders[amount_col] >= amount_threshold
+    grouped = pd.DataFrame(metrics).groupby(period)
+    trend = grouped.mean()
+    trend["주문 수"] = grouped["주문 수"].sum()
+    return trend.reset_index()
+
+
+def trend_chart(series: pd.DataFrame, x_col: str, title: str, y_format: str = ",.0f", rule_at=None):
+    """다운샘플된 long 포맷 시계열 → Altair 라인 차트(브라우저에서 렌더링)."""
+    base = (
+        alt.Chart(series)
+        .mark_line(point=alt.OverlayMarkDef(size=12))
+        .encode(
+            x=alt.X(f"{x_col}:T", title=None),
+            y=alt.Y("value:Q", title=None, axis=alt.Axis(format=y_format)),
+            color=alt.Color("metric:N", title=None, legend=alt.Legend(orient="bottom")),
+            tooltip=[alt.Tooltip(f"{x_col}:T"), "metric:N", alt.Tooltip("value:Q", format=y_format)],
+        )
+        .properties(title=title, height=260)
+    )
+    if rule_at is not None:
+        rule = alt.Chart(pd.DataFrame({x_col: [pd.Timestamp(rule_at)]})).mark_rule(
+            strokeDash=[4, 4], color="gray"
+        ).encode(x=f"{x_col}:T")
+        base = base + rule
+    return base
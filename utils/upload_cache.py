@@ -0,0 +1,190 @@
+"""업로드 CSV를 내용 해시 기준 Arrow 파일로 보관하고, 모든 세션이 메모리 맵으로 공유."""
+import functools
+import multiprocessing
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from utils.jobs import input_key
+
+CACHE_DIR = os.environ.get("TOOLKIT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "toolkit-salad-uploads"))
+MAX_CACHE_BYTES = int(os.environ.get("TOOLKIT_CACHE_MAX_BYTES", 8 * 1024 ** 3))
+SAMPLE_CHUNK_ROWS = 200_000     # 표본 저장 시 한 번에 읽는 행 수
+
+_write_locks = {}      # 키 → [락, 사용 중인 요청 수] (쓰기가 끝나고 기다리는 요청이 없으면 제거)
+_write_locks_guard = threading.Lock()
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.arrow")
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """DataFrame → Arrow 테이블. 타입이 섞인 object 컬럼은 문자열로 통일."""
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _evict(keep: str):
+    """캐시 용량 초과 시 오래 쓰지 않은 파일부터 삭제 (열려 있는 맵은 OS가 유지)."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".arrow") and name != os.path.basename(keep):
+            full = os.path.join(CACHE_DIR, name)
+            stat = os.stat(full)
+            entries.append((stat.st_atime, stat.st_size, full))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    for _, size, full in sorted(entries):
+        if total <= MAX_CACHE_BYTES:
+            break
+        try:
+            os.remove(full)
+            total -= size
+        except OSError:
+            pass
+
+
+@contextmanager
+def _write_lock(key: str):
+    """같은 키의 동시 쓰기는 한 번만 처리되도록 키별 락을 잡음. 마지막 사용자가 나가면 락을 지워 목록이 쌓이지 않음."""
+    with _write_locks_guard:
+        entry = _write_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _write_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _write_locks[key]
+
+
+def _clean_column(c) -> str:
+    return str(c).replace("\ufeff", "").strip()
+
+
+def store_csv(raw: bytes, key: str, mapping=None) -> str:
+    """CSV 바이트를 한 번만 파싱해 비압축 Arrow IPC 파일로 저장 (동일 키 동시 요청은 한 번만 처리).
+
+    mapping({원본 컬럼: 표준 컬럼})이 있으면 그 컬럼만 파싱해 표준 컬럼명으로 저장.
+    """
+    path = _path(key)
+    with _write_lock(key):
+        if not os.path.exists(path):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            if mapping:
+                df = pd.read_csv(BytesIO(raw), usecols=lambda c: _clean_column(c) in mapping)
+                df.columns = [mapping[_clean_column(c)] for c in df.columns]
+            else:
+                df = pd.read_csv(BytesIO(raw))
+            table = _to_arrow(df)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+            _evict(path)
+    return path
+
+
+def store_sampled_csv(raw: bytes, key: str, mapping: dict, column: str, rate: float) -> str:
+    """CSV를 청크 단위로 읽으며 column(표준 컬럼명) 해시가 rate 비율 안에 드는 행만 Arrow 파일로 저장.
+
+    전체 프레임을 만들지 않으므로 메모리는 청크 크기만큼만 쓴다. 같은 키 값(주문)의 행은 함께 남거나 빠진다.
+    값은 모두 문자열로 저장 (청크마다 추론 타입이 달라지지 않도록. 숫자·날짜 변환은 utils.parsing).
+    """
+    path = _path(key)
+    threshold = np.uint64(min(int(rate * 2.0 ** 64), 2 ** 64 - 1))
+    with _write_lock(key):
+        if not os.path.exists(path):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            chunks = pd.read_csv(BytesIO(raw), usecols=lambda c: _clean_column(c) in mapping, dtype=str,
+                                 chunksize=SAMPLE_CHUNK_ROWS)
+            # 헤더만 있는 파일은 청크가 없으므로 스키마는 매핑된 표준 컬럼으로 미리 정함
+            schema = pa.schema([(c, pa.string()) for c in dict.fromkeys(mapping.values())])
+            try:
+                with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                    for chunk in chunks:
+                        chunk.columns = [mapping[_clean_column(c)] for c in chunk.columns]
+                        keys = chunk[column].astype(str).to_numpy(dtype=object)
+                        chunk = chunk[pd.util.hash_array(keys) < threshold]
+                        writer.write_table(pa.Table.from_pandas(chunk[schema.names], schema=schema,
+                                                                preserve_index=False))
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            _evict(path)
+    return path
+
+
+def _read_table(path: str) -> pa.Table:
+    """Arrow 파일을 메모리 맵으로 열기 (복사 없음)."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _open_table(path: str) -> pa.Table:
+    """메모리 맵으로 연 테이블 (프로세스 내 모든 세션이 같은 버퍼를 공유)."""
+    return _read_table(path)
+
+
+@functools.lru_cache(maxsize=8)
+def _open_worker_table(path: str) -> pa.Table:
+    """풀 워커용: Streamlit 런타임 밖이므로 st.cache_resource 대신 프로세스 안 LRU (내용 해시 키라 파일이 바뀌지 않음)."""
+    return _read_table(path)
+
+
+def cache_upload(uploaded_file, mapping=None) -> str:
+    """업로드 파일을 캐시에 보관하고 내용(+컬럼 매핑) 해시 키를 반환."""
+    key = input_key("upload", uploaded_file, sorted(mapping.items())) if mapping else input_key("upload", uploaded_file)
+    if not os.path.exists(_path(key)):
+        store_csv(uploaded_file.getvalue(), key, mapping)
+    return key
+
+
+def cache_sampled_upload(uploaded_file, mapping: dict, column: str, rate: float) -> str:
+    """업로드에서 column 해시 표본(rate 비율)만 스트리밍으로 캐시하고 키를 반환 (전체 캐시와 다른 키)."""
+    key = input_key("upload-sample", uploaded_file, sorted(mapping.items()), column, rate)
+    if not os.path.exists(_path(key)):
+        store_sampled_csv(uploaded_file.getvalue(), key, mapping, column, rate)
+    return key
+
+
+def arrow_table(key: str, columns=None) -> pa.Table:
+    """캐시된 업로드의 메모리 맵 Arrow 테이블 (DuckDB 등이 복사 없이 바로 스캔)."""
+    path = _path(key)
+    if multiprocessing.parent_process() is not None:
+        table = _open_worker_table(path)
+    else:
+        try:
+            table = _open_table(path)
+        except FileNotFoundError:
+            _open_table.clear()
+            raise
+    return table.select(list(columns)) if columns is not None else table
+
+
+def load_frame(key: str, columns=None, rows=None) -> pd.DataFrame:
+    """캐시된 업로드 → DataFrame (rows: 읽을 행 번호, 없으면 전체).
+
+    read_csv와 같은 dtype(숫자는 numpy, 문자열은 pandas 기본 str)으로 변환. 복사 없는 공유는 Arrow 테이블까지이고
+    DataFrame은 호출마다 새로 만들어지므로, 집계는 풀 워커 작업(입력 키로 세션 간 한 번만 실행)에서 부르고
+    페이지 세션에서는 arrow_table로 필요한 값만 읽는다.
+    """
+    table = arrow_table(key, columns)
+    if rows is not None:
+        table = table.take(rows)
+    return table.to_pandas()
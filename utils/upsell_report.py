@@ -0,0 +1,265 @@
+"""알파업셀 보고서 집계 (객단가 분석2)."""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from utils.parsing import parse_amounts, parse_dates
+from utils.sketches import TDigest, grouped_registers
+from utils.upload_cache import arrow_table, load_frame
+
+PRICE_BIN = 10000       # 만원 단위 구간
+PRICE_CAP = 200000      # 20만원 이상은 한 구간으로
+DAILY_LEVELS = ["day", "upsell", "items", "price_bin"]
+
+
+def prepare_orders(df: pd.DataFrame, cols: dict, report: dict = None) -> pd.DataFrame:
+    """업로드 라인아이템 → 타입 보정·취소주문 제외·라인금액이 붙은 프레임. report: parsing 참고."""
+    df = df.copy()
+    df[cols["order_total"]] = parse_amounts(df[cols["order_total"]], report)
+    df[cols["order_date"]] = parse_dates(df[cols["order_date"]], report)
+    df = df[(df[cols["order_total"]] > 0) & df[cols["order_date"]].notna()].copy()
+
+    # 라인금액 확보
+    if cols["line_amount"] and (cols["line_amount"] in df.columns):
+        df["_라인금액"] = parse_amounts(df[cols["line_amount"]], report)
+    elif (cols["line_price"] in df.columns) and (cols["line_qty"] in df.columns):
+        df["_라인금액"] = (parse_amounts(df[cols["line_price"]], report)
+                        * parse_amounts(df[cols["line_qty"]], report))
+    else:
+        # 라인금액이 없으면 업셀 금액은 추정이 불가 → 업셀 라인 금액 표시는 스킵하되 전환주문 금액은 가능
+        df["_라인금액"] = np.nan
+    return df
+
+
+def filter_period(df: pd.DataFrame, cols: dict, start_date, end_date) -> pd.DataFrame:
+    """분석 기간(시작일~종료일) 필터."""
+    mask = (df[cols["order_date"]] >= pd.to_datetime(start_date)) & (df[cols["order_date"]] <= pd.to_datetime(end_date))
+    return df[mask].copy()
+
+
+def _parsed_columns(cache_key: str, cols: dict) -> list:
+    """prepare_orders가 변환하는 컬럼 중 업로드에 있는 것 (금액·주문일·라인금액/단가/수량)."""
+    names = arrow_table(cache_key).column_names
+    return [c for c in dict.fromkeys([cols["order_total"], cols["order_date"], cols["line_amount"],
+                                      cols["line_price"], cols["line_qty"]]) if c and c in names]
+
+
+def order_period(cache_key: str, cols: dict, progress=None) -> dict:
+    """워커에서 변환 대상 컬럼만 읽어 분석 가능 기간과 변환 실패 보고 산출: {'start', 'end', 'report'}."""
+    report = {}
+    df = prepare_orders(load_frame(cache_key, _parsed_columns(cache_key, cols)), cols, report)
+    return {'start': df[cols["order_date"]].min(), 'end': df[cols["order_date"]].max(), 'report': report}
+
+
+def daily_order_sketches(cache_key: str, cols: dict, progress=None):
+    """일별 주문번호 HLL 레지스터 → (일자 DatetimeIndex, 레지스터 배열). 주/월 집계는 스케치 병합으로 처리."""
+    orders = prepare_orders(load_frame(cache_key, [cols["order_id"], cols["order_total"], cols["order_date"]]), cols)
+    day_codes, days = pd.factorize(orders[cols["order_date"]].dt.normalize(), sort=True)
+    return pd.DatetimeIndex(days), grouped_registers(orders[cols["order_id"]].to_numpy(), day_codes, len(days))
+
+
+def summarize_upload(cache_key: str, cols: dict, start_date=None, end_date=None, progress=None) -> dict:
+    """캐시된 업로드를 워커에서 직접 메모리 맵으로 읽어 요약 (프레임을 프로세스 간에 복사하지 않음)."""
+    if progress is not None:
+        progress(0.05, "데이터 준비 중")
+    df = prepare_orders(load_frame(cache_key), cols)
+    if start_date is not None:
+        df = filter_period(df, cols, start_date, end_date)
+    return summarize_orders(df, cols, progress)
+
+
+def summary_partial(df: pd.DataFrame, cols: dict, progress=None) -> dict:
+    """기간 필터가 적용된 라인아이템(주문이 쪼개지지 않은 일부) → 그대로 더해 합칠 수 있는 합계·건수."""
+    order_id, order_total = cols["order_id"], cols["order_total"]
+
+    # 업셀 전환주문 판별
+    if progress is not None:
+        progress(0.1, "업셀 주문 판별 중")
+    df = df.assign(_is_upsell_line=df[cols["upsell_flag"]].astype(str).str.strip() == cols["upsell_value"])
+    upsell_orders = df.groupby(order_id)["_is_upsell_line"].any()  # 주문단위 True/False
+    upsell_order_ids = upsell_orders[upsell_orders].index
+
+    # 주문 단위 집계(중복 주문번호→1행)
+    if progress is not None:
+        progress(0.4, "주문 단위 집계 중")
+    orders = df.sort_values([cols["upsell_flag"]], ascending=False).drop_duplicates(subset=[order_id], keep="last")
+    upsell_orders_only = orders[orders[order_id].isin(upsell_order_ids)]
+
+    # 주문당 상품 수(전체 vs 업셀전환주문)
+    if progress is not None:
+        progress(0.8, "주문당 상품 수 집계 중")
+    items_per_order = df.groupby(order_id).size()
+
+    # 최근 기간 집계용 일별 분포: 주문을 마지막 라인의 주문일로 묶어 (일자, 업셀 여부, 상품 수, 만원대 구간)별 주문 수
+    order_days = df.groupby(order_id)[cols["order_date"]].max().dt.normalize()
+    daily = pd.DataFrame({
+        "day": order_days.reindex(orders[order_id]).to_numpy(),
+        "upsell": orders[order_id].isin(upsell_order_ids).to_numpy(),
+        "items": items_per_order.reindex(orders[order_id]).to_numpy(),
+        "price_bin": ((orders[order_total] // PRICE_BIN) * PRICE_BIN).clip(upper=PRICE_CAP).to_numpy(np.float64),
+        "amount": orders[order_total].to_numpy(np.float64),
+    })
+    return {
+        "upsell_order_ids": upsell_order_ids,
+        "orders_total_sum": float(orders[order_total].sum()),
+        "orders_cnt": int(orders.shape[0]),
+        "upsell_conv_amount": float(upsell_orders_only[order_total].sum()),
+        "upsell_orders_cnt": int(upsell_orders_only.shape[0]),
+        "has_line_amount": bool(df["_라인금액"].notna().any()),
+        "upsell_together_amount": float(df.loc[df["_is_upsell_line"], "_라인금액"].sum()),
+        "item_orders": int(len(items_per_order)),
+        "items_all": int(items_per_order.sum()),
+        "items_upsell": int(items_per_order.loc[items_per_order.index.isin(upsell_order_ids)].sum()),
+        "daily_orders": daily.groupby(DAILY_LEVELS).size(),
+        "daily_digests": {key: TDigest.from_values(amounts)
+                          for key, amounts in daily.groupby(["day", "upsell"])["amount"]},
+    }
+
+
+def merge_summaries(parts) -> dict:
+    """summary_partial 결과들 → summarize_orders와 같은 업셀 성과 요약 지표."""
+    upsell_order_ids = (parts[0]["upsell_order_ids"].append([part["upsell_order_ids"] for part in parts[1:]])
+                        .sort_values())
+    orders_total_sum, orders_cnt, upsell_conv_amount, upsell_orders_cnt, item_orders, items_all, items_upsell = (
+        sum(part[name] for part in parts)
+        for name in ("orders_total_sum", "orders_cnt", "upsell_conv_amount", "upsell_orders_cnt",
+                     "item_orders", "items_all", "items_upsell"))
+    aov_all = orders_total_sum / orders_cnt if orders_cnt else 0.0
+    aov_upsell_orders = upsell_conv_amount / upsell_orders_cnt if upsell_orders_cnt else 0.0
+
+    # 함께구매주문금액(라인합계)
+    if any(part["has_line_amount"] for part in parts):
+        upsell_together_amount = float(sum(part["upsell_together_amount"] for part in parts))
+    else:
+        upsell_together_amount = None  # 표시 불가
+
+    items_all_avg = items_all / item_orders if item_orders else 0.0
+    items_upsell_avg = items_upsell / len(upsell_order_ids) if len(upsell_order_ids) else 0.0
+
+    # 비율계산
+    ratio_upsell_conv = (upsell_conv_amount / orders_total_sum * 100.0) if orders_total_sum else 0.0
+    ratio_upsell_together = ((upsell_together_amount / orders_total_sum * 100.0)
+                             if (orders_total_sum and upsell_together_amount is not None) else None)
+
+    return {
+        "upsell_order_ids": upsell_order_ids,
+        "orders_total_sum": float(orders_total_sum),
+        "orders_cnt": int(orders_cnt),
+        "upsell_conv_amount": float(upsell_conv_amount),
+        "upsell_orders_cnt": int(upsell_orders_cnt),
+        "aov_all": float(aov_all),
+        "aov_upsell_orders": float(aov_upsell_orders),
+        "upsell_together_amount": upsell_together_amount,
+        "items_all_avg": float(items_all_avg),
+        "items_upsell_avg": float(items_upsell_avg),
+        "ratio_upsell_conv": ratio_upsell_conv,
+        "ratio_upsell_together": ratio_upsell_together,
+        "daily_orders": (pd.concat([part["daily_orders"] for part in parts])
+                         .groupby(level=DAILY_LEVELS).sum().sort_index()),
+        "daily_digests": {key: reduce(TDigest.merge, [part["daily_digests"][key] for part in parts
+                                                      if key in part["daily_digests"]])
+                          for key in sorted({key for part in parts for key in part["daily_digests"]})},
+    }
+
+
+def summarize_orders(df: pd.DataFrame, cols: dict, progress=None) -> dict:
+    """기간 필터가 적용된 라인아이템 프레임 → 업셀 성과 요약 지표.
+
+    daily_orders·daily_digests: 일별 주문 분포와 (일자, 업셀 여부)별 객단가 t-digest (recent_window로 최근 기간 집계)
+    """
+    return merge_summaries([summary_partial(df, cols, progress)])
+
+
+def recent_window(summary: dict, days: int = 30) -> dict:
+    """요약의 일별 분포에서 마지막 주문일 포함 days일(일 단위 경계) 집계.
+
+    반환: {'start', 'end', 'orders'(주문 수), 'items'(상품 수별 주문 수), 'price_bins'(전체 만원대 구간별),
+           'upsell_price_bins'(업셀 전환주문 구간별), 'digests'({'전체주문', '[업셀] 함께구매주문'(있으면)})}
+    """
+    daily = summary["daily_orders"]
+    price_range = [i * PRICE_BIN for i in range(PRICE_CAP // PRICE_BIN + 1)]
+    if daily.empty:
+        return {'start': None, 'end': None, 'orders': 0, 'items': daily.groupby(level="items").sum(),
+                'price_bins': pd.Series(0, index=price_range), 'upsell_price_bins': pd.Series(0, index=price_range),
+                'digests': {"전체주문": TDigest()}}
+    end = daily.index.get_level_values("day").max()
+    start = end - pd.Timedelta(days=days - 1)
+    recent = daily[daily.index.get_level_values("day") >= start]
+    upsell = recent[recent.index.get_level_values("upsell")]
+    digests = {"전체주문": reduce(TDigest.merge, [d for (day, _), d in summary["daily_digests"].items() if day >= start])}
+    upsell_digests = [d for (day, is_upsell), d in summary["daily_digests"].items() if is_upsell and day >= start]
+    if upsell_digests:
+        digests["[업셀] 함께구매주문"] = reduce(TDigest.merge, upsell_digests)
+    return {
+        'start': start, 'end': end, 'orders': int(recent.sum()),
+        'items': recent.groupby(level="items").sum().sort_index(),
+        'price_bins': recent.groupby(level="price_bin").sum().reindex(price_range, fill_value=0),
+        'upsell_price_bins': upsell.groupby(level="price_bin").sum().reindex(price_range, fill_value=0),
+        'digests': digests,
+    }
+
+
+def summarize_partition(lines: pd.DataFrame, cols: dict, start_date=None, end_date=None, progress=None) -> dict:
+    """해시 파티션 하나의 라인아이템 → summary_partial (partitioned.submit용)."""
+    df = prepare_orders(lines, cols)
+    if start_date is not None:
+        df = filter_period(df, cols, start_date, end_date)
+    return summary_partial(df, cols, progress)
+
+
+def _key_hash(frame: pd.DataFrame, keys) -> np.ndarray:
+    """조인 키 컬럼들 → uint64 해시 (문자열/숫자 키 타입 차이 흡수)."""
+    return pd.util.hash_pandas_object(frame[keys].astype(str), index=False).to_numpy()
+
+
+def attribute_upload(cache_key: str, cols: dict, wdf: pd.DataFrame, widget_col: str, aov_all: float,
+                     items_all_avg: float, start_date=None, end_date=None, progress=None):
+    """캐시된 업로드를 워커에서 직접 읽어 attribute_widgets 실행 (위젯 CSV만 함께 넘김)."""
+    df = prepare_orders(load_frame(cache_key), cols)
+    if start_date is not None:
+        df = filter_period(df, cols, start_date, end_date)
+    return attribute_widgets(df, wdf, cols, widget_col, aov_all, items_all_avg)
+
+
+def attribute_widgets(df: pd.DataFrame, wdf: pd.DataFrame, cols: dict, widget_col: str,
+                      aov_all: float, items_all_avg: float):
+    """위젯별 성과 CSV를 주문 CSV의 업셀 라인과 조인해 위젯별 전환 성과 산출.
+
+    위젯 CSV의 상품 키(상품 코드/상품명)와, 있으면 주문번호까지 해시 키로 묶어
+    업셀 라인을 한 번만 훑어 조인한다. 조인 가능한 키가 없으면 None.
+    """
+    order_id, order_total = cols["order_id"], cols["order_total"]
+    product_keys = [c for c in (cols.get("product_code"), cols.get("product_name"))
+                    if c and c in wdf.columns and c in df.columns][:1]
+    if widget_col not in wdf.columns or not product_keys:
+        return None
+    keys = ([order_id] if order_id in wdf.columns else []) + product_keys
+
+    is_upsell_line = df[cols["upsell_flag"]].astype(str).str.strip() == cols["upsell_value"]
+    lines = df.loc[is_upsell_line, list(dict.fromkeys([order_id, order_total, "_라인금액"] + keys))]
+    widget_index = pd.DataFrame({"_key": _key_hash(wdf, keys), "위젯명": wdf[widget_col].astype(str)}).drop_duplicates()
+    joined = lines.assign(_key=_key_hash(lines, keys)).merge(widget_index, on="_key", how="inner")
+    if joined.empty:
+        return pd.DataFrame(columns=["위젯명", "전환주문수", "전환주문금액", "함께구매주문금액",
+                                     "객단가", "객단가 상승률(%)", "주문당 상품수", "상품수 상승(개)"])
+
+    items_per_order = df.groupby(order_id).size()
+    per_order = (joined.groupby(["위젯명", order_id], sort=False)
+                 .agg(total=(order_total, "first"), together=("_라인금액", "sum")))
+    per_order["items"] = items_per_order.reindex(per_order.index.get_level_values(order_id)).to_numpy()
+
+    result = per_order.groupby(level="위젯명").agg(
+        전환주문수=("total", "size"),
+        전환주문금액=("total", "sum"),
+        함께구매주문금액=("together", "sum"),
+        객단가=("total", "mean"),
+        주문당_상품수=("items", "mean"),
+    ).rename(columns={"주문당_상품수": "주문당 상품수"})
+    if joined["_라인금액"].isna().all():
+        result["함께구매주문금액"] = np.nan  # 라인금액 미제공
+    result["객단가 상승률(%)"] = (result["객단가"] / aov_all - 1) * 100.0 if aov_all else np.nan
+    result["상품수 상승(개)"] = result["주문당 상품수"] - items_all_avg
+    result = result.sort_values("전환주문금액", ascending=False).reset_index()
+    return result[["위젯명", "전환주문수", "전환주문금액", "함께구매주문금액",
+                   "객단가", "객단가 상승률(%)", "주문당 상품수", "상품수 상승(개)"]]
@@ -0,0 +1,128 @@
+"""타사 서비스 사용 현황 로컬 미러 (SQLite). 원격 MySQL은 스냅샷 단위 동기화에만 쓰고, 대시보드는 미러를 조회."""
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from utils.cooccurrence_store import BUSY_TIMEOUT, STORE_DIR
+
+MIRROR_PATH = os.environ.get("TOOLKIT_USAGE_MIRROR", os.path.join(STORE_DIR, "service_usage.sqlite3"))
+FETCH_BATCH = 50_000    # 원격에서 한 번에 가져올 행 수
+RESYNC_LATEST = 1       # 마지막 스냅샷은 원격에서 아직 적재 중일 수 있어 동기화 때마다 다시 받음
+
+# 원격과 같은 테이블·컬럼 이름 (id 컬럼은 원격 타입을 그대로 보관하도록 타입 미지정)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    service_id PRIMARY KEY, service_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id PRIMARY KEY, snapshot_date TEXT NOT NULL, synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mall_service_usage (
+    snapshot_id NOT NULL, shop_id NOT NULL, service_id NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mall_service_usage_snapshot ON mall_service_usage (snapshot_id);
+"""
+
+USAGE_QUERY = """
+SELECT
+    msu.shop_id,
+    s.service_name,
+    snap.snapshot_date
+FROM mall_service_usage msu
+JOIN services s ON msu.service_id = s.service_id
+JOIN snapshots snap ON msu.snapshot_id = snap.snapshot_id
+"""
+
+
+def connect(path: str = MIRROR_PATH) -> sqlite3.Connection:
+    """미러 연결 (없으면 생성). isolation_level=None → 트랜잭션은 직접 BEGIN/COMMIT."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def status(path: str = MIRROR_PATH) -> dict:
+    """미러 상태: {'snapshots', 'last_snapshot', 'synced_at'} (비어 있으면 0 / None)."""
+    if not os.path.exists(path):
+        return {'snapshots': 0, 'last_snapshot': None, 'synced_at': None}
+    conn = connect(path)
+    try:
+        n, last, synced_at = conn.execute(
+            "SELECT COUNT(*), MAX(snapshot_date), MAX(synced_at) FROM snapshots").fetchone()
+    finally:
+        conn.close()
+    return {'snapshots': n, 'last_snapshot': last, 'synced_at': synced_at}
+
+
+def load(path: str = MIRROR_PATH) -> pd.DataFrame:
+    """미러에서 shop_id, service_name, snapshot_date 조회 (원격 대시보드 쿼리와 같은 결과)."""
+    conn = connect(path)
+    try:
+        return pd.read_sql(USAGE_QUERY, conn)
+    finally:
+        conn.close()
+
+
+def _replace_snapshot(conn, cursor, snapshot_id, snapshot_date) -> int:
+    """스냅샷 하나의 사용 행을 원격에서 받아 교체 (한 트랜잭션 → 중단돼도 반쯤 받은 스냅샷이 남지 않음)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM mall_service_usage WHERE snapshot_id = ?", (snapshot_id,))
+        cursor.execute("SELECT snapshot_id, shop_id, service_id FROM mall_service_usage WHERE snapshot_id = %s",
+                       (snapshot_id,))
+        n_rows = 0
+        while rows := cursor.fetchmany(FETCH_BATCH):
+            conn.executemany("INSERT INTO mall_service_usage VALUES (?, ?, ?)", rows)
+            n_rows += len(rows)
+        conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                     (snapshot_id, str(snapshot_date), time.time()))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return n_rows
+
+
+def sync(remote, progress=None, path: str = MIRROR_PATH) -> dict:
+    """원격 DB(DB-API 연결)에서 미러에 없는 스냅샷만 받아옴.
+
+    서비스 목록은 매번 통째로 갱신하고, 마지막 RESYNC_LATEST개 스냅샷은 다시 받는다.
+    원격에서 사라진 스냅샷은 미러에서도 지운다.
+    반환: {'new_snapshots', 'rows', 'total_snapshots'}
+    """
+    cursor = remote.cursor()
+    cursor.execute("SELECT service_id, service_name FROM services")
+    services = cursor.fetchall()
+    cursor.execute("SELECT snapshot_id, snapshot_date FROM snapshots ORDER BY snapshot_date")
+    remote_snapshots = cursor.fetchall()
+
+    conn = connect(path)
+    try:
+        local = [sid for (sid,) in conn.execute("SELECT snapshot_id FROM snapshots ORDER BY snapshot_date")]
+        complete = set(local[:len(local) - RESYNC_LATEST] if RESYNC_LATEST else local)
+        pending = [(sid, date) for sid, date in remote_snapshots if sid not in complete]
+        removed = set(local) - {sid for sid, _ in remote_snapshots}
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM services")
+        conn.executemany("INSERT INTO services VALUES (?, ?)", services)
+        for sid in removed:
+            conn.execute("DELETE FROM mall_service_usage WHERE snapshot_id = ?", (sid,))
+            conn.execute("DELETE FROM snapshots WHERE snapshot_id = ?", (sid,))
+        conn.execute("COMMIT")
+
+        n_rows = 0
+        for i, (sid, date) in enumerate(pending):
+            if progress is not None:
+                progress(i / len(pending), f"스냅샷 {date} ({i + 1}/{len(pending)})")
+            n_rows += _replace_snapshot(conn, cursor, sid, date)
+        total = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+    finally:
+        conn.close()
+        cursor.close()
+    return {'new_snapshots': len(set(sid for sid, _ in pending) - set(local)), 'rows': n_rows,
+            'total_snapshots': total}